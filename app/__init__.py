@@ -3,7 +3,14 @@ import secrets
 
 from flask import Flask
 
-from .routes import bp
+from .routes import MAX_TEXT_FILE_SIZE, UPLOAD_FORM_OVERHEAD, bp
+
+
+def _env_flag(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in {"1", "true", "yes"}
 
 
 def create_app():
@@ -28,6 +35,84 @@ def create_app():
     app.config["GOOGLE_APPLICATION_CREDENTIALS"] = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS", "")
     app.config["GCP_PROJECT"] = os.environ.get("GCP_PROJECT", "")
 
+    # Repeat uploads of the same evidence reuse stored provider results.
+    app.config["RESULT_CACHE_ENABLED"] = _env_flag("ANSIMTALK_RESULT_CACHE", True)
+    app.config["RESULT_CACHE_PATH"] = os.environ.get("ANSIMTALK_RESULT_CACHE_PATH", "")
+    app.config["RESULT_CACHE_TTL_SECONDS"] = int(os.environ.get("ANSIMTALK_RESULT_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60))
+    app.config["RESULT_CACHE_MAX_ENTRIES"] = int(os.environ.get("ANSIMTALK_RESULT_CACHE_MAX_ENTRIES", 5000))
+
+    # Identical concurrent analyses share one provider call, across workers via a SQLite lease file.
+    app.config["SINGLE_FLIGHT_ENABLED"] = _env_flag("ANSIMTALK_SINGLE_FLIGHT", True)
+    app.config["SINGLE_FLIGHT_PATH"] = os.environ.get("ANSIMTALK_SINGLE_FLIGHT_PATH", "")
+    app.config["SINGLE_FLIGHT_LEASE_SECONDS"] = int(os.environ.get("ANSIMTALK_SINGLE_FLIGHT_LEASE_SECONDS", 300))
+    app.config["SINGLE_FLIGHT_WAIT_SECONDS"] = int(os.environ.get("ANSIMTALK_SINGLE_FLIGHT_WAIT_SECONDS", 300))
+
+    # Analysis results live server-side; the session cookie only holds a result id.
+    app.config["RESULT_STORE_PATH"] = os.environ.get("ANSIMTALK_RESULT_STORE_PATH", "")
+    app.config["RESULT_STORE_TTL_SECONDS"] = int(os.environ.get("ANSIMTALK_RESULT_STORE_TTL_SECONDS", 24 * 60 * 60))
+
+    # Conversations with fewer offline risk signals than this are not sent to Gemini.
+    app.config["TRIAGE_ENABLED"] = _env_flag("ANSIMTALK_TRIAGE", True)
+    app.config["TRIAGE_MIN_SIGNALS"] = int(os.environ.get("ANSIMTALK_TRIAGE_MIN_SIGNALS", 1))
+    # Messages the local classifier scores at or above the threshold also count as risk signals.
+    app.config["TEXT_CLASSIFIER_ENABLED"] = _env_flag("ANSIMTALK_TEXT_CLASSIFIER", True)
+    app.config["TEXT_CLASSIFIER_PATH"] = os.environ.get("ANSIMTALK_TEXT_CLASSIFIER_PATH", "")
+    app.config["TEXT_CLASSIFIER_THRESHOLD"] = float(os.environ.get("ANSIMTALK_TEXT_CLASSIFIER_THRESHOLD", 0.5))
+    app.config["SCORE_WINDOW_MINUTES"] = int(os.environ.get("ANSIMTALK_SCORE_WINDOW_MINUTES", 60))
+    # API clients may ask for the offline result first; Gemini's result replaces it in the background.
+    app.config["PROVISIONAL_RESULTS_ENABLED"] = _env_flag("ANSIMTALK_PROVISIONAL_RESULTS", True)
+
+    # Upload requests must answer within this budget; provider calls get what is left of it.
+    app.config["REQUEST_DEADLINE_SECONDS"] = float(os.environ.get("ANSIMTALK_REQUEST_DEADLINE_SECONDS", 90))
+
+    # Web analyses run in the background; the results page follows them over a Server-Sent Events stream.
+    app.config["PROGRESS_LOG_PATH"] = os.environ.get("ANSIMTALK_PROGRESS_LOG_PATH", "")
+    app.config["PROGRESS_STREAM_SECONDS"] = int(os.environ.get("ANSIMTALK_PROGRESS_STREAM_SECONDS", 120))
+    # Opt-in: render the report PDF into the cache after the analysis completes.
+    app.config["PDF_PRERENDER_ENABLED"] = _env_flag("ANSIMTALK_PDF_PRERENDER", False)
+
+    # Providers that keep failing are skipped for a while; transient errors are retried first.
+    app.config["CIRCUIT_BREAKER_ENABLED"] = _env_flag("ANSIMTALK_CIRCUIT_BREAKER", True)
+    app.config["CIRCUIT_BREAKER_PATH"] = os.environ.get("ANSIMTALK_CIRCUIT_BREAKER_PATH", "")
+    app.config["CIRCUIT_BREAKER_FAILURE_THRESHOLD"] = int(os.environ.get("ANSIMTALK_CIRCUIT_BREAKER_FAILURES", 5))
+    app.config["CIRCUIT_BREAKER_RESET_SECONDS"] = int(os.environ.get("ANSIMTALK_CIRCUIT_BREAKER_RESET_SECONDS", 30))
+    app.config["PROVIDER_RETRY_ATTEMPTS"] = int(os.environ.get("ANSIMTALK_PROVIDER_RETRY_ATTEMPTS", 3))
+
+    # Long conversations are sent to Gemini in token-bounded windows, a few at a time.
+    app.config["GEMINI_WINDOW_TOKENS"] = int(os.environ.get("ANSIMTALK_GEMINI_WINDOW_TOKENS", 6000))
+    app.config["GEMINI_WINDOW_OVERLAP_MESSAGES"] = int(os.environ.get("ANSIMTALK_GEMINI_WINDOW_OVERLAP_MESSAGES", 5))
+    app.config["GEMINI_MAX_CONCURRENCY"] = int(os.environ.get("ANSIMTALK_GEMINI_MAX_CONCURRENCY", 4))
+    app.config["GEMINI_TIMEOUT_SECONDS"] = int(os.environ.get("ANSIMTALK_GEMINI_TIMEOUT_SECONDS", 120))
+
+    # Rendered PDF reports are reused until they age out or the cache is full.
+    app.config["PDF_CACHE_DIR"] = os.environ.get("ANSIMTALK_PDF_CACHE_DIR", "")
+    app.config["PDF_CACHE_MAX_BYTES"] = int(os.environ.get("ANSIMTALK_PDF_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+    app.config["PDF_CACHE_MAX_AGE_SECONDS"] = int(os.environ.get("ANSIMTALK_PDF_CACHE_MAX_AGE_SECONDS", 24 * 60 * 60))
+
+    # Page-width JPEG renditions of evidence images embedded in reports, cached by SHA-256.
+    app.config["REPORT_IMAGE_CACHE_DIR"] = os.environ.get("ANSIMTALK_REPORT_IMAGE_CACHE_DIR", "")
+
+    # Cached NanumGothic subsets embedded in PDF reports.
+    app.config["FONT_CACHE_DIR"] = os.environ.get("ANSIMTALK_FONT_CACHE_DIR", "")
+
+    # "weasyprint", "fpdf", or "auto" (fpdf2 for text-only cyberbullying reports).
+    app.config["PDF_BACKEND"] = os.environ.get("ANSIMTALK_PDF_BACKEND", "weasyprint")
+
+    # WeasyPrint runs in a pool of pre-warmed processes; set to "inline" to render in the web worker.
+    app.config["PDF_RENDERER"] = os.environ.get("ANSIMTALK_PDF_RENDERER", "pool")
+    app.config["PDF_RENDER_PROCESSES"] = int(os.environ.get("ANSIMTALK_PDF_RENDER_PROCESSES", 1))
+    app.config["PDF_RENDER_MAX_PENDING"] = int(os.environ.get("ANSIMTALK_PDF_RENDER_MAX_PENDING", 4))
+    app.config["PDF_RENDER_TIMEOUT_SECONDS"] = int(os.environ.get("ANSIMTALK_PDF_RENDER_TIMEOUT_SECONDS", 60))
+
+    # Werkzeug refuses larger request bodies before they are spooled, so uploads never reach disk twice.
+    app.config["MAX_CONTENT_LENGTH"] = MAX_TEXT_FILE_SIZE + UPLOAD_FORM_OVERHEAD
+
+    # Background analysis jobs for /api/jobs, queued in a local SQLite file.
+    app.config["JOB_STORE_PATH"] = os.environ.get("ANSIMTALK_JOB_STORE_PATH", "")
+    app.config["JOB_WORKERS"] = int(os.environ.get("ANSIMTALK_JOB_WORKERS", 2))
+    app.config["JOB_QUEUE_MAX_DEPTH"] = int(os.environ.get("ANSIMTALK_JOB_QUEUE_MAX_DEPTH", 20))
+    app.config["JOB_RETRY_AFTER_SECONDS"] = int(os.environ.get("ANSIMTALK_JOB_RETRY_AFTER_SECONDS", 10))
+
     app.register_blueprint(bp)
     return app
 
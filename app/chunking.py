@@ -0,0 +1,69 @@
+import re
+from collections import namedtuple
+
+
+DEFAULT_WINDOW_TOKENS = 6000
+DEFAULT_OVERLAP_MESSAGES = 5
+
+# Ordered from least to most serious; Korean labels are what Gemini tends to answer with.
+RISK_LEVELS = (
+    ("none", ("none", "no risk", "없음")),
+    ("low", ("low", "낮음", "경미")),
+    ("medium", ("medium", "moderate", "present", "중간", "보통")),
+    ("high", ("high", "높음")),
+    ("severe", ("severe", "critical", "매우 높음", "심각")),
+)
+
+# ``context`` holds the overlapping messages from the previous window; only ``lines`` are analyzed.
+ConversationWindow = namedtuple("ConversationWindow", ["start", "context", "lines"])
+
+
+def estimate_tokens(text):
+    """Roughly estimate LLM tokens: about four ASCII characters or one Hangul character per token."""
+    ascii_count = sum(1 for character in text if character < "\x80")
+    return (ascii_count + 3) // 4 + (len(text) - ascii_count)
+
+
+def split_conversation_windows(lines, max_tokens=DEFAULT_WINDOW_TOKENS, overlap=DEFAULT_OVERLAP_MESSAGES):
+    """Split conversation lines into windows of at most ``max_tokens`` each.
+
+    Every line is analyzed in exactly one window. Each window after the first
+    also carries the previous ``overlap`` lines as read-only context, so a
+    message is never judged without the one it answers. A single line longer
+    than the budget gets a window of its own.
+    """
+    lines = [line for line in lines if line.strip()]
+    windows = []
+    start = 0
+    while start < len(lines):
+        end = start
+        used = 0
+        while end < len(lines):
+            cost = estimate_tokens(lines[end])
+            if end > start and used + cost > max_tokens:
+                break
+            used += cost
+            end += 1
+        windows.append(ConversationWindow(start, lines[max(0, start - overlap):start], lines[start:end]))
+        start = end
+    return windows
+
+
+def risk_rank(label):
+    """Return the index of ``label`` in ``RISK_LEVELS``, or -1 when it is not recognised."""
+    value = re.sub(r"\s+", " ", str(label or "")).strip().lower()
+    # Check the most serious levels first so "매우 높음" is not read as "높음".
+    for rank in range(len(RISK_LEVELS) - 1, -1, -1):
+        if any(alias in value for alias in RISK_LEVELS[rank][1]):
+            return rank
+    return -1
+
+
+def highest_risk(labels):
+    """Return the most serious recognised label, keeping the first one on ties."""
+    best_label, best_rank = None, -1
+    for label in labels:
+        rank = risk_rank(label)
+        if rank > best_rank:
+            best_label, best_rank = label, rank
+    return best_label
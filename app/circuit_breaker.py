@@ -0,0 +1,191 @@
+import random
+import time
+
+from flask import current_app
+
+from .deadline import DeadlineExceeded, current_deadline
+from .sqlite_store import SQLiteStore, get_app_store
+
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_SECONDS = 30
+DEFAULT_RETRY_ATTEMPTS = 3
+DEFAULT_BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 4
+PROBE_SECONDS = 60
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, provider, retry_after):
+        super().__init__(f"{provider} is unavailable after repeated failures; retry in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def is_transient(exc):
+    """Return whether a provider error is worth retrying: timeouts, connection errors, 408/429/5xx."""
+    status = getattr(exc, "code", None)
+    if not isinstance(status, int):
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 429) or status >= 500
+    import requests
+
+    # Not every OSError: requests' JSONDecodeError and FileNotFoundError are OSErrors too, and an
+    # unreadable answer means the provider did respond.
+    return isinstance(exc, (TimeoutError, ConnectionError, requests.Timeout, requests.ConnectionError))
+
+
+class CircuitBreaker(SQLiteStore):
+    """Per-provider circuit breakers whose state is shared by all workers through SQLite.
+
+    After ``failure_threshold`` consecutive transient failures a provider's
+    circuit opens, and calls fail immediately with ``CircuitOpenError`` for
+    ``reset_seconds``. Then one caller is let through as a half-open probe.
+    If it succeeds the circuit closes; if it fails the circuit opens again.
+    Transient errors are retried with jittered exponential backoff, but only
+    while the provider has no recent failures, so retries do not pile onto
+    a provider that is already struggling.
+    """
+
+    autocommit = True
+
+    def __init__(
+        self,
+        path,
+        failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+        reset_seconds=DEFAULT_RESET_SECONDS,
+        retry_attempts=DEFAULT_RETRY_ATTEMPTS,
+        backoff_seconds=DEFAULT_BACKOFF_SECONDS,
+    ):
+        super().__init__(path)
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.retry_attempts = retry_attempts
+        self.backoff_seconds = backoff_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS circuits ("
+                " provider TEXT PRIMARY KEY,"
+                " state TEXT NOT NULL,"
+                " failures INTEGER NOT NULL,"
+                " opened_at REAL NOT NULL,"
+                " probe_until REAL NOT NULL)"
+            )
+
+    def state(self, provider):
+        """Return ``(state, consecutive_failures)`` for ``provider``."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT state, failures FROM circuits WHERE provider = ?", (provider,)).fetchone()
+        return row or ("closed", 0)
+
+    def _admit(self, provider):
+        """Return ``(attempts, healthy)`` for a call made now, or raise ``CircuitOpenError``.
+
+        ``healthy`` means the circuit is closed with no recent failures, so a
+        success does not need to be written back.
+        """
+        now = time.time()
+        retry_after = None
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT state, failures, opened_at, probe_until FROM circuits WHERE provider = ?", (provider,)
+                ).fetchone()
+                state, failures, opened_at, probe_until = row or ("closed", 0, 0.0, 0.0)
+                if state == "closed":
+                    attempts = self.retry_attempts if failures == 0 else 1
+                elif now < opened_at + self.reset_seconds or (state == "half_open" and now < probe_until):
+                    retry_after = max(opened_at + self.reset_seconds - now, 1)
+                else:
+                    # Let exactly one caller probe; the rest keep failing fast until it reports back.
+                    conn.execute(
+                        "UPDATE circuits SET state = 'half_open', probe_until = ? WHERE provider = ?",
+                        (now + PROBE_SECONDS, provider),
+                    )
+                    attempts = 1
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if retry_after is not None:
+            raise CircuitOpenError(provider, retry_after)
+        return attempts, state == "closed" and failures == 0
+
+    def _record(self, provider, outcome):
+        """Write back a call's ``outcome``: ``"success"``, ``"failure"`` or ``"unknown"``."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT state, failures FROM circuits WHERE provider = ?", (provider,)).fetchone()
+                state, failures = row or ("closed", 0)
+                if outcome == "success":
+                    conn.execute("UPDATE circuits SET state = 'closed', failures = 0 WHERE provider = ?", (provider,))
+                elif outcome == "unknown":
+                    # The caller gave up without an answer; let the next caller probe instead.
+                    conn.execute("UPDATE circuits SET probe_until = 0 WHERE provider = ?", (provider,))
+                else:
+                    failures += 1
+                    opens = state == "half_open" or failures >= self.failure_threshold
+                    conn.execute(
+                        "INSERT INTO circuits (provider, state, failures, opened_at, probe_until)"
+                        " VALUES (?, ?, ?, ?, 0)"
+                        " ON CONFLICT (provider) DO UPDATE SET"
+                        " state = excluded.state, failures = excluded.failures,"
+                        " opened_at = CASE WHEN excluded.state = 'open' THEN excluded.opened_at ELSE opened_at END",
+                        (provider, "open" if opens else "closed", failures, now),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def call(self, provider, func, *args, **kwargs):
+        """Call ``func`` through ``provider``'s circuit, retrying transient errors."""
+        attempts, healthy = self._admit(provider)
+        for attempt in range(attempts):
+            try:
+                result = func(*args, **kwargs)
+            except Exception as exc:
+                if isinstance(exc, DeadlineExceeded):
+                    # This request ran out of time; that says nothing about the provider.
+                    if not healthy:
+                        self._record(provider, "unknown")
+                    raise
+                if not is_transient(exc):
+                    # The provider answered; bad input or an invalid response says nothing about its health.
+                    if not healthy:
+                        self._record(provider, "success")
+                    raise
+                delay = min(self.backoff_seconds * 2**attempt, MAX_BACKOFF_SECONDS) * random.uniform(0.5, 1.0)
+                deadline = current_deadline()
+                if attempt + 1 == attempts or (deadline is not None and deadline.remaining() <= delay):
+                    self._record(provider, "failure")
+                    raise
+                time.sleep(delay)
+            else:
+                if not healthy:
+                    self._record(provider, "success")
+                return result
+
+
+def get_circuit_breaker():
+    """Return the app's circuit breaker, or ``None`` when it is disabled."""
+    app = current_app._get_current_object()
+    if not app.config.get("CIRCUIT_BREAKER_ENABLED", True):
+        return None
+    return get_app_store(
+        "ansimtalk_circuit_breaker",
+        "CIRCUIT_BREAKER_PATH",
+        "circuit_breaker.sqlite3",
+        lambda app, path: CircuitBreaker(
+            path,
+            failure_threshold=app.config.get("CIRCUIT_BREAKER_FAILURE_THRESHOLD", DEFAULT_FAILURE_THRESHOLD),
+            reset_seconds=app.config.get("CIRCUIT_BREAKER_RESET_SECONDS", DEFAULT_RESET_SECONDS),
+            retry_attempts=app.config.get("PROVIDER_RETRY_ATTEMPTS", DEFAULT_RETRY_ATTEMPTS),
+        ),
+    )
@@ -0,0 +1,173 @@
+import hashlib
+import os
+from functools import lru_cache
+
+from .lexicon import _quick_normalize
+
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "models", "text_classifier.npz")
+DEFAULT_DIMENSION = 1 << 18
+DEFAULT_NGRAM_RANGE = (1, 4)
+DEFAULT_THRESHOLD = 0.5
+# Messages hashed per pass when scoring; bounds the n-gram arrays on long chats.
+PREDICT_BATCH_SIZE = 4096
+
+# Mark the start and end of each message so n-grams at the edges differ from those inside.
+_START = "\x02"
+_END = "\x03"
+_HASH_MULTIPLIER = 0x100000001B3
+_HASH_MIX = 0x9E3779B97F4A7C15
+
+
+def _ngram_buckets(texts, dimension, ngram_range):
+    """Hash the character n-grams of every text in one vectorized pass.
+
+    Texts are normalized like the keyword matcher (jamo, no separators, no
+    stretched letters), so the same obfuscations collapse onto the same
+    n-grams. Returns ``(message_ids, buckets)``: one entry per n-gram.
+    """
+    import numpy as np
+
+    # Normalize every message in one string so the per-message Python work is a single join.
+    # NUL separates messages, so a NUL inside one (an upload can contain any byte) is dropped first.
+    joined = "\x00".join(text.replace("\x00", "") for text in texts)
+    joined = joined.replace(_START, "").replace(_END, "").replace("\x00", _END + _START)
+    normalized = _quick_normalize(_START + joined + _END)
+    codes = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    owners = np.cumsum(codes == ord(_START)) - 1
+    shift = np.uint64(64 - (dimension.bit_length() - 1))
+
+    message_ids = []
+    buckets = []
+    # hashed[i] is the hash of the n-gram starting at i, extended by one character per size.
+    hashed = np.zeros(len(codes), dtype=np.uint64)
+    for size in range(1, ngram_range[1] + 1):
+        count = len(codes) - size + 1
+        if count <= 0:
+            break
+        hashed = (hashed[:count] * np.uint64(_HASH_MULTIPLIER)) ^ codes[size - 1 :]
+        if size < ngram_range[0]:
+            continue
+        # Keep only n-grams that start and end inside the same message.
+        inside = owners[:count] == owners[size - 1 :]
+        mixed = ((hashed[inside] ^ np.uint64(size)) * np.uint64(_HASH_MIX)) >> shift
+        message_ids.append(owners[:count][inside])
+        buckets.append(mixed.astype(np.int64))
+    if not message_ids:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(message_ids), np.concatenate(buckets)
+
+
+def _features(texts, dimension, ngram_range):
+    """Return ``(message_ids, buckets, scale)`` with each message scaled to unit length."""
+    import numpy as np
+
+    message_ids, buckets = _ngram_buckets(texts, dimension, ngram_range)
+    counts = np.bincount(message_ids, minlength=len(texts))
+    scale = 1.0 / np.sqrt(np.maximum(counts, 1))
+    return message_ids, buckets, scale
+
+
+def _sigmoid(values):
+    import numpy as np
+
+    return 1.0 / (1.0 + np.exp(-np.clip(values, -30.0, 30.0)))
+
+
+class TextClassifier:
+    """Logistic regression over hashed character n-grams of single messages.
+
+    Scoring a conversation hashes messages in batches and sums the weights
+    with ``numpy.bincount``, so thousands of messages are scored in a few
+    milliseconds on a CPU without the n-gram arrays growing with the chat.
+    """
+
+    def __init__(self, weights, bias=0.0, ngram_range=DEFAULT_NGRAM_RANGE):
+        dimension = len(weights)
+        if dimension < 2 or dimension & (dimension - 1):
+            raise ValueError("Classifier dimension must be a power of two.")
+        self.weights = weights
+        self.bias = float(bias)
+        self.ngram_range = tuple(int(size) for size in ngram_range)
+        self.version = "hashed-ngram-lr-" + hashlib.sha256(weights.tobytes()).hexdigest()[:12]
+
+    @property
+    def dimension(self):
+        return len(self.weights)
+
+    def predict_proba(self, texts):
+        """Return the probability that each text is harmful, as a float array."""
+        import numpy as np
+
+        texts = list(texts)
+        if not texts:
+            return np.zeros(0)
+        probabilities = []
+        for start in range(0, len(texts), PREDICT_BATCH_SIZE):
+            batch = texts[start : start + PREDICT_BATCH_SIZE]
+            message_ids, buckets, scale = _features(batch, self.dimension, self.ngram_range)
+            logits = np.bincount(message_ids, weights=self.weights[buckets], minlength=len(batch))
+            probabilities.append(_sigmoid(self.bias + logits * scale))
+        return np.concatenate(probabilities)
+
+    def save(self, path):
+        import numpy as np
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as handle:
+            np.savez_compressed(
+                handle,
+                weights=self.weights.astype(np.float32),
+                bias=np.float64(self.bias),
+                ngram_range=np.array(self.ngram_range, dtype=np.int64),
+            )
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+
+        with np.load(path) as data:
+            return cls(data["weights"], float(data["bias"]), tuple(data["ngram_range"]))
+
+
+def train_classifier(
+    texts,
+    labels,
+    dimension=DEFAULT_DIMENSION,
+    ngram_range=DEFAULT_NGRAM_RANGE,
+    epochs=300,
+    learning_rate=2.0,
+    l2=1e-4,
+):
+    """Fit a ``TextClassifier`` with full-batch gradient descent.
+
+    ``labels`` are 1 for harmful messages and 0 otherwise. Both classes are
+    weighted equally regardless of how many examples each has.
+    """
+    import numpy as np
+
+    texts = list(texts)
+    targets = np.asarray(labels, dtype=np.float64)
+    if len(texts) != len(targets) or not len(texts):
+        raise ValueError("Training needs one label per text.")
+    positives = targets.sum()
+    if positives in (0, len(targets)):
+        raise ValueError("Training needs both harmful and harmless examples.")
+
+    message_ids, buckets, scale = _features(texts, dimension, ngram_range)
+    sample_weights = np.where(targets == 1, 0.5 / positives, 0.5 / (len(targets) - positives))
+    weights = np.zeros(dimension)
+    bias = 0.0
+    for _ in range(epochs):
+        logits = np.bincount(message_ids, weights=weights[buckets], minlength=len(texts)) * scale + bias
+        residual = (_sigmoid(logits) - targets) * sample_weights
+        gradient = np.bincount(buckets, weights=(residual * scale)[message_ids], minlength=dimension)
+        weights -= learning_rate * (gradient + l2 * weights)
+        bias -= learning_rate * residual.sum()
+    return TextClassifier(weights.astype(np.float32), bias, ngram_range)
+
+
+@lru_cache(maxsize=4)
+def load_classifier(path=DEFAULT_MODEL_PATH):
+    """Load a serialized classifier once per process."""
+    return TextClassifier.load(path)
@@ -0,0 +1,57 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+
+_current = contextvars.ContextVar("ansimtalk_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request has no time left for another provider call."""
+
+
+class Deadline:
+    """A fixed point in time by which a request must have answered."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+@contextmanager
+def request_deadline(seconds):
+    """Give every provider call made inside the block one shared budget of ``seconds``.
+
+    A falsy ``seconds`` leaves the block without a deadline.
+    """
+    token = _current.set(Deadline(seconds) if seconds else None)
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def current_deadline():
+    """Return the active ``Deadline``, or ``None`` outside ``request_deadline``."""
+    return _current.get()
+
+
+def budget(limit=None):
+    """Return the timeout for one call: ``limit`` capped by the request's remaining time.
+
+    Raises ``DeadlineExceeded`` when the request has no time left. Without an
+    active deadline ``limit`` is returned unchanged.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return limit
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded.")
+    return remaining if limit is None else min(limit, remaining)
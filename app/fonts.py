@@ -0,0 +1,129 @@
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from flask import current_app, has_app_context
+
+
+FONT_DIR = Path(__file__).resolve().parent / "static" / "fonts"
+FONT_FILES = {
+    "regular": "NanumGothic.ttf",
+    "bold": "NanumGothic-Bold.ttf",
+}
+REPORT_FONT_FAMILY = "AnsimTalk NanumGothic"
+SUBSET_CACHE_LIMIT = 256
+
+
+def _common_characters():
+    """Printable ASCII, Hangul jamo, common punctuation and the 2,350 KS X 1001 syllables."""
+    characters = {chr(code) for code in range(0x20, 0x7F)}
+    characters.update(chr(code) for code in range(0x3131, 0x318F))
+    characters.update("·…‘’“”•※←→↑↓○●□■△▲▽▼◆◇★☆。、「」『』《》〈〉【】～")
+    # KS X 1001 puts its Hangul syllables in rows 0xB0-0xC8 of EUC-KR.
+    characters.update(
+        bytes((lead, trail)).decode("euc_kr") for lead in range(0xB0, 0xC9) for trail in range(0xA1, 0xFF)
+    )
+    return frozenset(characters)
+
+
+COMMON_CHARACTERS = _common_characters()
+
+
+def _font_cache_dir():
+    configured = current_app.config.get("FONT_CACHE_DIR") if has_app_context() else ""
+    return Path(configured or os.path.join(os.getcwd(), "tmp", "font_cache"))
+
+
+def _write_subset(source, characters, target):
+    from fontTools import subset
+
+    options = subset.Options()
+    options.hinting = False
+    options.notdef_outline = True
+    options.name_IDs = ["*"]
+    options.layout_features = ["*"]
+    font = subset.load_font(str(source), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=sorted(ord(character) for character in characters))
+    subsetter.subset(font)
+
+    handle, temp_path = tempfile.mkstemp(dir=target.parent, suffix=".ttf.partial")
+    os.close(handle)
+    try:
+        subset.save_font(font, temp_path, options)
+        os.replace(temp_path, target)
+    finally:
+        Path(temp_path).unlink(missing_ok=True)
+
+
+def _evict_subsets(directory, keep):
+    entries = []
+    for path in directory.glob("*.ttf"):
+        try:
+            entries.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    for _, path in sorted(entries, reverse=True)[SUBSET_CACHE_LIMIT:]:
+        if path != keep:
+            path.unlink(missing_ok=True)
+
+
+def subset_font(weight, characters):
+    """Return a bundled NanumGothic font reduced to ``characters``.
+
+    Subsets are cached by a hash of the glyph set, so each distinct set is only
+    built once. The full font is returned if subsetting fails.
+    """
+    source = FONT_DIR / FONT_FILES[weight]
+    glyph_key = hashlib.sha256("".join(sorted(characters)).encode("utf-8")).hexdigest()[:16]
+    directory = _font_cache_dir()
+    target = directory / f"{source.stem}-{glyph_key}.ttf"
+    if characters < COMMON_CHARACTERS:
+        # Cutting down the cached common subset is several times faster than the full font.
+        source = Path(subset_font(weight, COMMON_CHARACTERS))
+    try:
+        # Refresh the mtime so frequently used subsets survive eviction.
+        os.utime(target)
+        return str(target)
+    except FileNotFoundError:
+        pass
+    directory.mkdir(parents=True, exist_ok=True)
+    try:
+        _write_subset(source, characters, target)
+    except Exception:
+        return str(source)
+    _evict_subsets(directory, keep=target)
+    return str(target)
+
+
+def report_font_paths(text):
+    """Return regular/bold font files covering ``text`` for a PDF backend.
+
+    The fonts hold printable ASCII plus exactly the characters in ``text``, which
+    keeps font parsing in fpdf2 cheap; repeat renders of a report reuse the subset.
+    """
+    characters = set(text) - {"\n", "\r", "\t"}
+    characters |= {chr(code) for code in range(0x20, 0x7F)}
+    return {weight: subset_font(weight, characters) for weight in FONT_FILES}
+
+
+@lru_cache(maxsize=8)
+def _font_face_css(cache_dir):
+    rules = []
+    for weight, css_weight in (("regular", "normal"), ("bold", "bold")):
+        common = Path(subset_font(weight, COMMON_CHARACTERS)).resolve().as_uri()
+        full = (FONT_DIR / FONT_FILES[weight]).resolve().as_uri()
+        rules.append(
+            f'@font-face {{ font-family: "{REPORT_FONT_FAMILY}"; font-weight: {css_weight}; src: url("{common}"); }}'
+        )
+        rules.append(
+            f'@font-face {{ font-family: "{REPORT_FONT_FAMILY} Full"; font-weight: {css_weight}; src: url("{full}"); }}'
+        )
+    return "\n".join(rules)
+
+
+def report_font_face_css():
+    """Return @font-face rules for the common subset, with the full fonts as fallback."""
+    return _font_face_css(str(_font_cache_dir()))
@@ -0,0 +1,170 @@
+import json
+import os
+from html.parser import HTMLParser
+
+from fpdf import FPDF
+from fpdf.enums import WrapMode, XPos, YPos
+
+from .fonts import report_font_paths
+from .report_images import report_image_path
+from .services import CYBERBULLYING_FINDING_FIELDS, cyberbullying_summary_text
+
+
+FONT_FAMILY = "NanumGothic"
+REVIEW_BOUNDARY = "AI-assisted output is a draft signal and requires human review before action."
+
+
+class _TableRowParser(HTMLParser):
+    """Collect cell text from the analysis HTML table produced by the analyzers."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._row = []
+        elif tag in {"td", "th"} and self._row is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in {"td", "th"} and self._cell is not None:
+            self._row.append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            if self._row:
+                self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def table_rows(table):
+    """Return table rows from an HTML or pipe-delimited analysis table."""
+    table = str(table or "")
+    if table.lstrip().startswith("<"):
+        parser = _TableRowParser()
+        parser.feed(table)
+        return parser.rows
+    rows = []
+    for line in table.splitlines():
+        line = line.strip()
+        if not line.startswith("|"):
+            continue
+        cells = [cell.strip() for cell in line.split("|")[1:-1]]
+        if cells and not all(set(cell) <= {"-", ":"} for cell in cells):
+            rows.append(cells)
+    return rows
+
+
+class _ReportPDF(FPDF):
+    def __init__(self, font_paths):
+        super().__init__(format="A4")
+        self.add_font(FONT_FAMILY, "", font_paths["regular"])
+        self.add_font(FONT_FAMILY, "B", font_paths["bold"])
+        self.set_auto_page_break(auto=True, margin=15)
+        self.add_page()
+
+    def heading(self, text, size=14):
+        self.set_font(FONT_FAMILY, "B", size)
+        self.set_text_color(17, 24, 39)
+        self.multi_cell(0, size * 0.6, text, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.ln(2)
+
+    def paragraph(self, text, wrapmode=WrapMode.WORD):
+        self.set_font(FONT_FAMILY, "", 10)
+        self.set_text_color(31, 41, 55)
+        self.multi_cell(0, 6, text, new_x=XPos.LMARGIN, new_y=YPos.NEXT, wrapmode=wrapmode)
+        self.ln(1)
+
+    def field(self, label, value):
+        self.set_font(FONT_FAMILY, "B", 10)
+        self.set_text_color(31, 41, 55)
+        self.cell(self.get_string_width(label + ": ") + 1, 6, label + ":")
+        self.set_font(FONT_FAMILY, "", 10)
+        self.multi_cell(0, 6, str(value), new_x=XPos.LMARGIN, new_y=YPos.NEXT, wrapmode=WrapMode.CHAR)
+
+
+def generate_fpdf_report(analysis_result, pdf_path, analysis_type=None):
+    """Render the same sections as ``generate_report_html`` directly with fpdf2."""
+    analysis_type = analysis_type or analysis_result.get("analysis_type", "unknown")
+    file_info = analysis_result.get("file_info", {})
+    sha256 = str(analysis_result.get("sha256", "N/A"))
+    fields = [
+        ("Analysis type", str(analysis_type)),
+        ("Filename", str(file_info.get("filename", "N/A"))),
+        ("SHA-256", sha256),
+        ("Timestamp", str(analysis_result.get("analysis_timestamp", "N/A"))),
+    ]
+    summary = cyberbullying_summary_text(analysis_result)
+    if "cyberbullying_findings" in analysis_result:
+        findings = analysis_result["cyberbullying_findings"]
+        rows = [list(CYBERBULLYING_FINDING_FIELDS)] if findings else []
+        rows += [[str(finding.get(field, "-")) for field in CYBERBULLYING_FINDING_FIELDS] for finding in findings]
+    else:
+        rows = table_rows(analysis_result.get("cyberbullying_analysis"))
+    deepfake = analysis_result.get("deepfake_analysis")
+    deepfake_text = json.dumps(deepfake, ensure_ascii=False, indent=2) if deepfake else ""
+
+    image_path = analysis_result.get("file_path") or analysis_result.get("original_image_path")
+    rendition_path = image_caption = ""
+    if image_path and os.path.exists(image_path) and image_path.lower().endswith((".png", ".jpg", ".jpeg")):
+        rendition_path = report_image_path(image_path, analysis_result.get("sha256", ""))
+        if rendition_path != image_path:
+            original_name = file_info.get("filename") or os.path.basename(image_path)
+            image_caption = (
+                f"Downscaled copy for this report. The untouched original is {original_name} (SHA-256 {sha256})."
+            )
+
+    # Every string drawn below, so the embedded font only has to cover these glyphs.
+    report_text = "".join(
+        [
+            "AnsimTalk Evidence Report Case Metadata Original Evidence Image Analysis Summary Review Boundary",
+            "No table rows. No summary.",
+            REVIEW_BOUNDARY,
+            image_caption,
+            summary,
+            deepfake_text,
+            *(label + ": " + value for label, value in fields),
+            *(cell for row in rows for cell in row),
+        ]
+    )
+
+    pdf = _ReportPDF(report_font_paths(report_text))
+    pdf.heading("AnsimTalk Evidence Report", size=20)
+    pdf.heading("Case Metadata")
+    for label, value in fields:
+        pdf.field(label, value)
+    pdf.ln(4)
+
+    if rendition_path:
+        pdf.heading("Original Evidence Image")
+        pdf.image(rendition_path, w=pdf.epw)
+        if image_caption:
+            pdf.paragraph(image_caption)
+        pdf.ln(4)
+
+    pdf.heading("Analysis")
+    if rows:
+        pdf.set_font(FONT_FAMILY, "", 9)
+        with pdf.table(line_height=5, wrapmode=WrapMode.CHAR, padding=1.5) as table:
+            for row in rows:
+                table_row = table.row()
+                for cell in row:
+                    table_row.cell(cell)
+        pdf.ln(2)
+    else:
+        pdf.paragraph("No table rows.")
+    if deepfake_text:
+        pdf.paragraph(deepfake_text, wrapmode=WrapMode.CHAR)
+
+    pdf.heading("Summary")
+    pdf.paragraph(summary or "No summary.")
+    pdf.heading("Review Boundary")
+    pdf.paragraph(REVIEW_BOUNDARY)
+    pdf.output(pdf_path)
+    return pdf_path
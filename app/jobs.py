@@ -0,0 +1,219 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from .sqlite_store import SQLiteStore, get_app_store, serializer
+
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_DEPTH = 20
+DEFAULT_RETRY_AFTER_SECONDS = 10
+DEFAULT_RESULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_STALE_SECONDS = 10 * 60
+POLL_INTERVAL_SECONDS = 1.0
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue already holds its maximum number of pending jobs."""
+
+    def __init__(self, retry_after):
+        super().__init__("The analysis queue is full. Try again later.")
+        self.retry_after = retry_after
+
+
+class JobStore(SQLiteStore):
+    """SQLite-backed job table shared by every worker process on the host."""
+
+    autocommit = True
+
+    def __init__(self, path):
+        super().__init__(path)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created_at ON jobs (status, created_at)")
+
+    def enqueue(self, payload, max_depth):
+        """Insert a queued job, refusing when ``max_depth`` jobs are already pending."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                (pending,) = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+                ).fetchone()
+                if pending >= max_depth:
+                    conn.execute("ROLLBACK")
+                    return None
+                conn.execute(
+                    "INSERT INTO jobs (id, status, payload, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+                    (job_id, serializer.dumps(payload), now, now),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def pending_count(self):
+        with self._connect() as conn:
+            (pending,) = conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()
+        return pending
+
+    def claim(self, stale_seconds=DEFAULT_STALE_SECONDS):
+        """Atomically move the oldest queued job to ``running`` and return it."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs left running by a worker that died are handed out again.
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+                    (now, now - stale_seconds),
+                )
+                row = conn.execute(
+                    "SELECT id, payload FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (now, row[0]))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"id": row[0], "payload": serializer.loads(row[1])}
+
+    def finish(self, job_id, result=None, error=None):
+        status = "failed" if error else "done"
+        result_payload = None if result is None else serializer.dumps(result)
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, result_payload, error, time.time(), job_id),
+            )
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, status, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, status, result, error, created_at, updated_at = row
+        return {
+            "job_id": job_id,
+            "status": status,
+            "result": None if result is None else serializer.loads(result),
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def purge(self, ttl_seconds):
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - ttl_seconds,),
+            )
+
+
+class JobQueue:
+    """Runs queued analysis jobs on background threads of the current worker process.
+
+    ``runner`` receives a job payload and returns the JSON-serializable result.
+    Worker threads start on first use, so each gunicorn worker starts its own
+    after forking. Every process claims from the shared SQLite store, so a job
+    may run in any worker.
+    """
+
+    def __init__(self, app, store, runner, workers, max_depth, retry_after, result_ttl):
+        self.app = app
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.max_depth = max_depth
+        self.retry_after = retry_after
+        self.result_ttl = result_ttl
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Threads do not survive a fork; start fresh in this process.
+                self._pid = os.getpid()
+                self._threads = []
+                self._wakeup = threading.Event()
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name="ansimtalk-job-worker", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, payload):
+        job_id = self.store.enqueue(payload, self.max_depth)
+        if job_id is None:
+            raise QueueFullError(self.retry_after)
+        self._ensure_workers()
+        self._wakeup.set()
+        return job_id
+
+    def check_capacity(self):
+        if self.store.pending_count() >= self.max_depth:
+            raise QueueFullError(self.retry_after)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _work(self):
+        while True:
+            try:
+                job = self.store.claim()
+            except sqlite3.Error:
+                self.app.logger.exception("Failed to claim an analysis job")
+                job = None
+            if job is None:
+                self._wakeup.wait(POLL_INTERVAL_SECONDS)
+                self._wakeup.clear()
+                continue
+            try:
+                with self.app.app_context():
+                    result = self.runner(job["payload"])
+                self.store.finish(job["id"], result=result)
+            except Exception as exc:
+                self.app.logger.exception("Analysis job %s failed", job["id"])
+                self.store.finish(job["id"], error=f"Analysis failed: {exc}")
+            self.store.purge(self.result_ttl)
+
+
+def get_job_queue(runner):
+    """Return the app's job queue, creating it with ``runner`` on first use."""
+    return get_app_store(
+        "ansimtalk_job_queue",
+        "JOB_STORE_PATH",
+        "jobs.sqlite3",
+        lambda app, path: JobQueue(
+            app,
+            JobStore(path),
+            runner,
+            workers=app.config.get("JOB_WORKERS", DEFAULT_WORKERS),
+            max_depth=app.config.get("JOB_QUEUE_MAX_DEPTH", DEFAULT_MAX_DEPTH),
+            retry_after=app.config.get("JOB_RETRY_AFTER_SECONDS", DEFAULT_RETRY_AFTER_SECONDS),
+            result_ttl=app.config.get("JOB_RESULT_TTL_SECONDS", DEFAULT_RESULT_TTL_SECONDS),
+        ),
+    )
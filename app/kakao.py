@@ -0,0 +1,136 @@
+import codecs
+import re
+from datetime import datetime
+
+
+ENCODING_SNIFF_BYTES = 64 * 1024
+
+_WHITESPACE = re.compile(r"\s+")
+_TIME = re.compile(r"^(?:AM|PM|am|pm|오전|오후)?\s?\d{1,2}:\d{2}$")
+_DATE_TIME = re.compile(r"^\d{4}[./-]\s?\d{1,2}[./-]\s?\d{1,2}(?:\s+(?:AM|PM|am|pm)?\s?\d{1,2}:\d{2})?$")
+_POSSIBLE_NAME = re.compile(r"^[\w가-힣]{1,16}$")
+
+_CLOCK = r"(?:(?:오전|오후|AM|PM) ?\d{1,2}:\d{2}|\d{1,2}:\d{2}(?: ?[AP]M)?)"
+_KOREAN_DATE = r"\d{4}년 \d{1,2}월 \d{1,2}일"
+_DOTTED_DATE = r"\d{4}\. ?\d{1,2}\. ?\d{1,2}\.?"
+
+# PC export: "--------------- 2024년 5월 1일 수요일 ---------------" then "[민수] [오후 3:21] 안녕".
+_DESKTOP_DATE = re.compile(rf"^-+ ?(?P<date>{_KOREAN_DATE})(?: \S+)? ?-+$")
+_DESKTOP_MESSAGE = re.compile(rf"^\[(?P<speaker>[^\]]+)\] \[(?P<time>{_CLOCK})\] ?(?P<text>.*)$")
+# Mobile export: "2024년 5월 1일 수요일" then "2024년 5월 1일 오후 3:21, 민수 : 안녕" (iOS uses "2024. 5. 1.").
+_MOBILE_DATE = re.compile(rf"^(?P<date>{_KOREAN_DATE}|{_DOTTED_DATE})(?: \S+요일)?$")
+_MOBILE_MESSAGE = re.compile(
+    rf"^(?P<date>{_KOREAN_DATE}|{_DOTTED_DATE}),? (?P<time>{_CLOCK}), (?P<speaker>[^:]+?) : (?P<text>.*)$"
+)
+# Joins, leaves and other notices carry a timestamp but no speaker.
+_MOBILE_EVENT = re.compile(rf"^(?:{_KOREAN_DATE}|{_DOTTED_DATE}),? {_CLOCK}[,:] ")
+_EXPORT_HEADERS = ("저장한 날짜", "Date Saved")
+_EXPORT_TITLE = "카카오톡 대화"
+_SKIPPED_TEXT = {"photo", "image", "사진", "동영상", "이모티콘", "emoticon"}
+_DATE_PARTS = re.compile(r"(\d{4})\D+(\d{1,2})\D+(\d{1,2})")
+_CLOCK_PARTS = re.compile(r"(오전|오후|AM|PM|am|pm)? ?(\d{1,2}):(\d{2}) ?([AP]M)?")
+
+
+def detect_encoding(prefix):
+    """Guess the encoding of a chat export from its first bytes (UTF-8, UTF-16 or CP949)."""
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        # Incremental decoding tolerates a multi-byte character cut off at the end of the prefix.
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp949"
+
+
+def iter_text_lines(file_path):
+    """Yield lines from a text file, decoding with the encoding detected from its prefix."""
+    with open(file_path, "rb") as handle:
+        encoding = detect_encoding(handle.read(ENCODING_SNIFF_BYTES))
+    with open(file_path, encoding=encoding, errors="replace") as handle:
+        yield from handle
+
+
+def _message(speaker, text, line_number, date=None, time=None):
+    return {"speaker": speaker or "-", "text": text, "date": date, "time": time, "line": line_number}
+
+
+def iter_chat_messages(lines):
+    """Yield one message record per chat message from KakaoTalk exports or OCR text.
+
+    PC and mobile export formats are recognised, including their date headers
+    and multi-line messages. Other lines fall back to the OCR heuristics:
+    ``speaker: text`` lines and a lone name line followed by its message.
+    Records are ``{"speaker", "text", "date", "time", "line"}``. Only the
+    message being assembled is kept in memory.
+    """
+    current = None
+    pending_speaker = None
+    date = None
+    for line_number, raw_line in enumerate(lines, start=1):
+        line = _WHITESPACE.sub(" ", raw_line.strip())
+        if not line:
+            continue
+
+        match = _DESKTOP_MESSAGE.match(line) or _MOBILE_MESSAGE.match(line)
+        if match:
+            if current:
+                yield current
+            fields = match.groupdict()
+            date = fields.get("date") or date
+            current = _message(fields["speaker"].strip(), fields["text"], line_number, date, fields["time"])
+            if current["text"].strip().lower() in _SKIPPED_TEXT:
+                current = None
+            continue
+
+        header = _DESKTOP_DATE.match(line) or _MOBILE_DATE.match(line)
+        if header or _MOBILE_EVENT.match(line) or line.startswith(_EXPORT_HEADERS) or line.endswith(_EXPORT_TITLE):
+            if current:
+                yield current
+                current = None
+            if header:
+                date = header.group("date")
+            continue
+
+        if current:
+            # Exported messages continue on the following lines until the next timestamp.
+            current["text"] = f"{current['text']} {line}".strip()
+            continue
+
+        if _TIME.match(line) or _DATE_TIME.match(line) or line.lower() in _SKIPPED_TEXT:
+            continue
+        if ":" in line and not line.endswith(":"):
+            speaker, text = [part.strip() for part in line.split(":", 1)]
+            pending_speaker = None
+            yield _message(speaker, text, line_number, date)
+            continue
+        if _POSSIBLE_NAME.match(line):
+            pending_speaker = line
+            continue
+        yield _message(pending_speaker, line, line_number, date)
+        pending_speaker = None
+
+    if current:
+        yield current
+
+
+def message_datetime(message):
+    """Return the message's date and time as a naive ``datetime``, or ``None`` when either is missing."""
+    date = _DATE_PARTS.search(message.get("date") or "")
+    clock = _CLOCK_PARTS.search(message.get("time") or "")
+    if not date or not clock:
+        return None
+    hour = int(clock.group(2)) % 12 if clock.group(1) or clock.group(4) else int(clock.group(2))
+    if (clock.group(1) or clock.group(4) or "").upper() in {"오후", "PM"}:
+        hour += 12
+    try:
+        return datetime(int(date.group(1)), int(date.group(2)), int(date.group(3)), hour, int(clock.group(3)))
+    except ValueError:
+        return None
+
+
+def format_message(message):
+    """Return the ``speaker: text`` line used by the analyzers."""
+    return f"{message['speaker']}: {message['text']}"
@@ -0,0 +1,289 @@
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+
+
+# Categories in priority order: a message is labelled with the first category it hits.
+CATEGORIES = (
+    ("threat", "severe", "Threat or severe harm keyword detected."),
+    ("insult", "medium", "Insult or degrading keyword detected."),
+    ("exclusion", "low", "Exclusion-related keyword detected."),
+)
+
+KEYWORDS = {
+    "threat": (
+        "kill",
+        "die",
+        "destroy",
+        "threat",
+        "죽어",
+        "죽인다",
+        "협박",
+        "때린다",
+    ),
+    "insult": (
+        "stupid",
+        "idiot",
+        "ugly",
+        "hate",
+        "trash",
+        "바보",
+        "멍청",
+        "못생겼",
+        "싫어",
+        "꺼져",
+        "병신",
+        "시발",
+    ),
+    "exclusion": (
+        "ignore",
+        "exclude",
+        "leave out",
+        "따돌",
+        "빼",
+        "끼지마",
+        "무시",
+    ),
+}
+
+# Initials-only spellings that are established shorthand for a keyword, matched as that keyword.
+# Only curated ones: most keywords' initials ("ㅈㅇ", "ㅅㅇ") are everyday abbreviations of other words.
+ABBREVIATIONS = {
+    "시발": ("ㅅㅂ", "ㅆㅂ"),
+    "병신": ("ㅂㅅ",),
+    "꺼져": ("ㄲㅈ",),
+}
+
+
+# Invisible characters are always dropped before matching.
+_INVISIBLE_CHARACTERS = frozenset(
+    "\u00ad\u115f\u1160\u180e\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\u3164\ufeff\uffa0"
+)
+# Whitespace and the separators people put between letters to dodge filters ("바.보", "바_보").
+# They are dropped only between single Hangul letters; anywhere else they become one space,
+# so keywords never match across ordinary words ("도시 발전", "that eats").
+_SEPARATOR_CHARACTERS = frozenset(" \t\r\n\u00a0\u3000" ".,_-~*^'\"`/\\|+=·…")
+_HANGUL_LETTER = "[\uac00-\ud7a3\u3131-\u3163]"
+_SPLIT_LETTERS = re.compile(
+    f"(?<!{_HANGUL_LETTER})({_HANGUL_LETTER})"
+    f"([{re.escape(''.join(sorted(_SEPARATOR_CHARACTERS)))}]+)"
+    f"(?={_HANGUL_LETTER}(?!{_HANGUL_LETTER}))"
+)
+# Compatibility jamo clusters that only exist as final consonants, split into initials.
+_JAMO_CLUSTERS = {
+    "ㄳ": "ㄱㅅ",
+    "ㄵ": "ㄴㅈ",
+    "ㄶ": "ㄴㅎ",
+    "ㄺ": "ㄹㄱ",
+    "ㄻ": "ㄹㅁ",
+    "ㄼ": "ㄹㅂ",
+    "ㄽ": "ㄹㅅ",
+    "ㄾ": "ㄹㅌ",
+    "ㄿ": "ㄹㅍ",
+    "ㅀ": "ㄹㅎ",
+    "ㅄ": "ㅂㅅ",
+}
+_JUNGSEONG = range(0x1161, 0x1176)
+_SILENT_INITIAL = "\u110b"
+
+
+_REPEATED_CHARACTER = re.compile(r"([^\u1100-\u11ff])\1+")
+_STRETCHED_VOWEL = re.compile(r"([\u1161-\u1175])(?:\u110b\1)+")
+
+
+@lru_cache(maxsize=1)
+def _translation():
+    table = {character: "" for character in _INVISIBLE_CHARACTERS}
+    table.update({character: " " for character in _SEPARATOR_CHARACTERS})
+    for code in range(0xAC00, 0xD7A4):
+        # Syllables become conjoining jamo, so "바ㅂㅗ" and "바보" look the same.
+        table[chr(code)] = unicodedata.normalize("NFD", chr(code))
+    for code in range(0x3131, 0x3164):
+        # Typed consonants become initials and typed vowels become medials.
+        character = chr(code)
+        table[character] = unicodedata.normalize("NFKC", _JAMO_CLUSTERS.get(character, character))
+    return table
+
+
+@lru_cache(maxsize=1)
+def _ordinal_translation():
+    return {ord(character): replacement for character, replacement in _translation().items()}
+
+
+@lru_cache(maxsize=1)
+def _invisible_translation():
+    return {ord(character): None for character in _INVISIBLE_CHARACTERS}
+
+
+def _quick_normalize(text):
+    """``normalize_for_matching`` without offsets, using only C-level string operations."""
+    text = _SPLIT_LETTERS.sub(r"\1", text.translate(_invisible_translation()))
+    normalized = text.translate(_ordinal_translation()).lower()
+    return _STRETCHED_VOWEL.sub(r"\1", _REPEATED_CHARACTER.sub(r"\1", normalized))
+
+
+def normalize_for_matching(text):
+    """Return ``(normalized, offsets)`` for obfuscation-robust keyword matching.
+
+    Hangul is decomposed into conjoining jamo, compatibility jamo are mapped
+    onto initial/medial jamo, zero-width characters are dropped, whitespace and
+    separators are dropped between single Hangul letters ("바 보") and become
+    one space elsewhere, repeated non-Hangul characters and drawn-out vowels
+    ("바아아보") are collapsed, and the rest is lower-cased. ``offsets[i]`` is
+    the index in ``text`` that produced ``normalized[i]``.
+    """
+    translation = _translation()
+    visible = [index for index, character in enumerate(text) if character not in _INVISIBLE_CHARACTERS]
+    joined = "".join(text[index] for index in visible)
+    dropped = set()
+    for match in _SPLIT_LETTERS.finditer(joined):
+        dropped.update(visible[position] for position in range(*match.span(2)))
+    output = []
+    offsets = []
+    for index in visible:
+        if index in dropped:
+            continue
+        character = text[index]
+        replacement = translation.get(character)
+        if replacement is None:
+            replacement = character.lower()
+            if len(replacement) != 1:
+                replacement = character
+            translation[character] = replacement
+        for part in replacement:
+            if output:
+                previous = output[-1]
+                if part == previous and not 0x1100 <= ord(part) <= 0x11FF:
+                    continue
+                if (
+                    previous == _SILENT_INITIAL
+                    and len(output) > 1
+                    and output[-2] == part
+                    and ord(part) in _JUNGSEONG
+                ):
+                    # "아" after a syllable ending in the same vowel only stretches it.
+                    output.pop()
+                    offsets.pop()
+                    continue
+            output.append(part)
+            offsets.append(index)
+    return "".join(output), offsets
+
+
+def _keyword_variants(term):
+    """Return ``(pattern, initials_only)`` forms of ``term``, including its listed abbreviations."""
+    variants = {(normalize_for_matching(term)[0], False)}
+    for abbreviation in ABBREVIATIONS.get(term, ()):
+        variants.add((normalize_for_matching(abbreviation)[0], True))
+    return variants
+
+
+class KeywordAutomaton:
+    """Aho-Corasick matcher over a keyword -> category lexicon.
+
+    The automaton is built once; ``find`` then reports every occurrence of every
+    keyword in a single pass over the text, regardless of lexicon size.
+    Keywords and text both go through ``normalize_for_matching``, so letters
+    split apart ("바 보"), zero-width characters, case, stretched vowels and
+    the abbreviations in ``ABBREVIATIONS`` ("ㅂㅅ") still match. Like the original substring
+    checks, matches inside a word need no word boundary, but no match spans
+    two ordinary words. Spans refer to the original text.
+    """
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        for category, terms in keywords.items():
+            for term in terms:
+                for pattern, initials_only in _keyword_variants(term):
+                    self._add(pattern, term, category, initials_only)
+        self._link()
+
+    def _add(self, pattern, term, category, initials_only=False):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        entry = (len(pattern), term, category, initials_only)
+        if entry not in self._output[state]:
+            self._output[state] += (entry,)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def _has_match(self, normalized):
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in normalized:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                return True
+        return False
+
+    def find(self, text):
+        """Return ``(start, end, term, category)`` for every keyword occurrence in ``text``."""
+        # Most messages match nothing, so check the cheap offset-free form first.
+        if not self._has_match(_quick_normalize(text)):
+            return []
+        goto, fail, output = self._goto, self._fail, self._output
+        normalized, offsets = normalize_for_matching(text)
+        matches = set()
+        state = 0
+        for index, char in enumerate(normalized):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, term, category, initials_only in output[state]:
+                if initials_only and index + 1 < len(normalized) and ord(normalized[index + 1]) in _JUNGSEONG:
+                    # The last initial starts a real syllable ("ㅂ사"), so it is not an abbreviation.
+                    continue
+                matches.add((offsets[index + 1 - length], offsets[index] + 1, term, category))
+        return sorted(matches)
+
+
+@lru_cache(maxsize=1)
+def default_automaton():
+    return KeywordAutomaton(KEYWORDS)
+
+
+def classify_message(text, automaton=None):
+    """Return ``(category, risk, explanation, matches)`` for one chat message.
+
+    ``category`` and ``risk`` are ``None`` when no keyword matches.
+    """
+    matches = (automaton or default_automaton()).find(text)
+    hit_categories = {category for _, _, _, category in matches}
+    for category, risk, explanation in CATEGORIES:
+        if category in hit_categories:
+            return category, risk, explanation, matches
+    return None, None, "No keyword risk detected.", matches
+
+
+def merge_spans(matches):
+    """Collapse overlapping ``(start, end, ...)`` matches into ``(start, end)`` spans."""
+    spans = []
+    for start, end, *_ in sorted(matches):
+        if spans and start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+        else:
+            spans.append((start, end))
+    return spans
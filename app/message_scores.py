@@ -0,0 +1,192 @@
+from array import array
+from datetime import datetime, timedelta
+
+from .lexicon import CATEGORIES, classify_message
+
+
+MESSAGE_SCORES_VERSION = "message-scores-v2"
+DEFAULT_WINDOW_MINUTES = 60
+
+# Category ids used in the ``category`` column; 0 means no keyword hit.
+CATEGORY_NAMES = ("none",) + tuple(category for category, _, _ in CATEGORIES)
+# Used as the score when no classifier is available, by keyword category id.
+_KEYWORD_SCORES = (0.0, 1.0, 0.66, 0.33)
+_EPOCH = datetime(1970, 1, 1)
+
+
+class MessageScores:
+    """Per-message records for one conversation, one NumPy array per column.
+
+    ``speaker_id`` indexes ``speakers``, ``offset`` is the character offset of
+    the message line in the analyzed text, ``category`` indexes
+    ``CATEGORY_NAMES``, ``score`` is the harm score in ``[0, 1]``, and
+    ``minute`` is minutes since 1970-01-01 in the chat's local time (-1 when
+    the message has no timestamp). ``keyword_hits`` holds ``(line, speaker,
+    content, category, matches)`` for the messages with a keyword hit, so
+    findings can be built without matching the lexicon again.
+    """
+
+    def __init__(self, speakers, speaker_id, offset, category, score, minute, scorer, threshold, keyword_hits=()):
+        self.speakers = speakers
+        self.speaker_id = speaker_id
+        self.offset = offset
+        self.category = category
+        self.score = score
+        self.minute = minute
+        self.scorer = scorer
+        self.threshold = threshold
+        self.keyword_hits = list(keyword_hits)
+
+    def __len__(self):
+        return len(self.speaker_id)
+
+    def flagged(self):
+        """Return a boolean array: keyword hit or score at or above the threshold."""
+        return (self.category > 0) | (self.score >= self.threshold)
+
+    def to_json(self):
+        """Return the flagged rows only; ``index`` is each row's position among all ``messages``.
+
+        Unflagged rows are left out so a long chat export does not put one
+        row per message into the stored result and the API response; the
+        totals are in ``aggregate_scores``.
+        """
+        import numpy as np
+
+        rows = np.flatnonzero(self.flagged())
+        return {
+            "version": MESSAGE_SCORES_VERSION,
+            "scorer": self.scorer,
+            "threshold": self.threshold,
+            "speakers": self.speakers,
+            "categories": list(CATEGORY_NAMES),
+            "messages": len(self),
+            "index": rows.tolist(),
+            "speaker_id": self.speaker_id[rows].tolist(),
+            "offset": self.offset[rows].tolist(),
+            "category": self.category[rows].tolist(),
+            "score": [round(score, 4) for score in self.score[rows].tolist()],
+            "minute": self.minute[rows].tolist(),
+        }
+
+
+def score_messages(lines, timestamps=None, classifier=None, threshold=0.5):
+    """Score every ``speaker: text`` line of a conversation in one pass.
+
+    ``timestamps`` holds one ``datetime`` or ``None`` per line. Both may be
+    iterators, read in step, so a long chat export is never held in memory
+    as a whole. Keyword categories come from the lexicon; scores come from
+    ``classifier`` a batch of messages at a time, or from the keyword category
+    when there is no classifier. Blank lines are skipped but still counted in
+    offsets.
+    """
+    import numpy as np
+
+    from .classifier import PREDICT_BATCH_SIZE
+
+    speakers = {}
+    speaker_ids, offsets, categories, minutes = array("i"), array("q"), array("b"), array("q")
+    batch, scored = [], []
+    keyword_hits = []
+    moments = iter(timestamps if timestamps is not None else ())
+    position = 0
+    for index, line in enumerate(lines):
+        moment = next(moments, None)
+        if line.strip():
+            speaker, separator, content = line.partition(":")
+            if not separator:
+                speaker, content = "-", line
+            speaker, content = speaker.strip(), content.strip()
+            category, _, _, matches = classify_message(content)
+            if category:
+                keyword_hits.append((index, speaker, content, category, matches))
+            speaker_ids.append(speakers.setdefault(speaker, len(speakers)))
+            offsets.append(position)
+            categories.append(CATEGORY_NAMES.index(category) if category else 0)
+            minutes.append(int((moment - _EPOCH).total_seconds() // 60) if moment else -1)
+            if classifier is not None:
+                batch.append(content)
+                if len(batch) == PREDICT_BATCH_SIZE:
+                    scored.append(classifier.predict_proba(batch).astype(np.float32))
+                    batch = []
+        position += len(line) + 1
+
+    category_ids = np.array(categories, dtype=np.int8)
+    if classifier is not None:
+        if batch:
+            scored.append(classifier.predict_proba(batch).astype(np.float32))
+        scores = np.concatenate(scored) if scored else np.zeros(0, dtype=np.float32)
+        scorer = classifier.version
+    else:
+        scores = np.array(_KEYWORD_SCORES, dtype=np.float32)[category_ids]
+        scorer = "keywords"
+    return MessageScores(
+        list(speakers),
+        np.array(speaker_ids, dtype=np.int32),
+        np.array(offsets, dtype=np.int64),
+        category_ids,
+        scores,
+        np.array(minutes, dtype=np.int64),
+        scorer,
+        float(threshold),
+        keyword_hits,
+    )
+
+
+def _group_stats(group_ids, group_count, scores):
+    """Aggregate one grouping with bincounts: counts, flags, mean/max score and category counts."""
+    import numpy as np
+
+    counts = np.bincount(group_ids, minlength=group_count)
+    flagged = np.bincount(group_ids, weights=scores.flagged(), minlength=group_count)
+    totals = np.bincount(group_ids, weights=scores.score, minlength=group_count)
+    maxima = np.zeros(group_count)
+    np.maximum.at(maxima, group_ids, scores.score)
+    by_category = np.bincount(
+        group_ids * len(CATEGORY_NAMES) + scores.category, minlength=group_count * len(CATEGORY_NAMES)
+    ).reshape(group_count, len(CATEGORY_NAMES))
+    return [
+        {
+            "messages": int(counts[group]),
+            "flagged": int(flagged[group]),
+            "mean_score": round(float(totals[group] / counts[group]), 4) if counts[group] else 0.0,
+            "max_score": round(float(maxima[group]), 4),
+            "categories": {
+                name: int(by_category[group, index]) for index, name in enumerate(CATEGORY_NAMES) if index
+            },
+        }
+        for group in range(group_count)
+    ]
+
+
+def aggregate_scores(scores, window_minutes=DEFAULT_WINDOW_MINUTES):
+    """Return per-speaker and per-time-window aggregates of ``scores``.
+
+    Windows are ``window_minutes`` long, counted from 1970-01-01 00:00.
+    Messages without a timestamp are left out of the windows.
+    """
+    import numpy as np
+
+    speakers = [
+        {"speaker": speaker, **stats}
+        for speaker, stats in zip(scores.speakers, _group_stats(scores.speaker_id, len(scores.speakers), scores))
+    ]
+
+    windows = []
+    timed = scores.minute >= 0
+    if timed.any():
+        starts, window_ids = np.unique(scores.minute[timed] // window_minutes, return_inverse=True)
+        timed_scores = MessageScores(
+            scores.speakers,
+            scores.speaker_id[timed],
+            scores.offset[timed],
+            scores.category[timed],
+            scores.score[timed],
+            scores.minute[timed],
+            scores.scorer,
+            scores.threshold,
+        )
+        for start, stats in zip(starts.tolist(), _group_stats(window_ids.ravel(), len(starts), timed_scores)):
+            windows.append({"start": (_EPOCH + timedelta(minutes=start * window_minutes)).isoformat(), **stats})
+
+    return {"window_minutes": window_minutes, "speakers": speakers, "windows": windows}
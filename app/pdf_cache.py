@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from flask import current_app
+
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 24 * 60 * 60
+
+
+def report_digest(analysis_result, analysis_type, template_version):
+    """Return a stable digest of everything that determines a rendered report."""
+    canonical = json.dumps(
+        {"template": template_version, "analysis_type": analysis_type, "result": analysis_result},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    """Directory of rendered reports named by digest, evicted by age and total size."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, max_age_seconds=DEFAULT_MAX_AGE_SECONDS):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, digest):
+        return self.directory / f"{digest}.pdf"
+
+    def get(self, digest):
+        path = self.path_for(digest)
+        try:
+            if time.time() - path.stat().st_mtime > self.max_age_seconds:
+                return None
+            # Refresh the mtime so eviction treats the file as recently used.
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_render(self, digest, render):
+        """Return the cached PDF for ``digest``, calling ``render(path)`` on a miss."""
+        path = self.get(digest)
+        if path is not None:
+            return path
+
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".pdf.partial")
+        os.close(handle)
+        try:
+            render(temp_path)
+            os.replace(temp_path, self.path_for(digest))
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+        self.evict(keep=self.path_for(digest))
+        return self.path_for(digest)
+
+    def evict(self, keep=None):
+        now = time.time()
+        entries = []
+        for path in self.directory.glob("*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def get_pdf_cache():
+    app = current_app._get_current_object()
+    cache = app.extensions.get("ansimtalk_pdf_cache")
+    if cache is None:
+        directory = app.config.get("PDF_CACHE_DIR") or os.path.join(os.getcwd(), "tmp", "pdf_cache")
+        cache = PdfCache(
+            directory,
+            max_bytes=app.config.get("PDF_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+            max_age_seconds=app.config.get("PDF_CACHE_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS),
+        )
+        app.extensions["ansimtalk_pdf_cache"] = cache
+    return cache
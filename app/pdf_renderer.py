@@ -0,0 +1,155 @@
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+
+from flask import current_app, has_app_context
+
+
+DEFAULT_PROCESSES = 1
+DEFAULT_MAX_PENDING = 4
+DEFAULT_TIMEOUT_SECONDS = 60
+DEFAULT_RETRY_AFTER_SECONDS = 5
+
+# Per-process WeasyPrint state, filled by the first render and reused by every later one.
+_warm_state = {}
+
+
+class PdfRenderError(Exception):
+    """Base class for renderer failures surfaced to the PDF routes."""
+
+    retry_after = DEFAULT_RETRY_AFTER_SECONDS
+
+
+class RendererBusyError(PdfRenderError):
+    def __init__(self, retry_after=DEFAULT_RETRY_AFTER_SECONDS):
+        super().__init__("The PDF renderer is busy. Try again shortly.")
+        self.retry_after = retry_after
+
+
+class RenderTimeoutError(PdfRenderError):
+    def __init__(self, timeout):
+        super().__init__(f"PDF rendering did not finish within {timeout}s.")
+
+
+class RendererUnavailableError(PdfRenderError):
+    """WeasyPrint could not be loaded; raised from the render that needed it."""
+
+
+def _warm_renderer(stylesheets=()):
+    """Import WeasyPrint and build the shared font configuration and stylesheets."""
+    try:
+        from weasyprint import HTML
+        from weasyprint.text.fonts import FontConfiguration
+
+        font_config = FontConfiguration()
+    except (ImportError, OSError) as exc:
+        raise RendererUnavailableError(f"The PDF renderer could not start: {exc}") from None
+    _warm_state["font_config"] = font_config
+    _warm_state["HTML"] = HTML
+    _warm_state.setdefault("stylesheets", {})
+    for css_text in stylesheets:
+        _parsed_stylesheet(css_text)
+
+
+def _parsed_stylesheet(css_text):
+    from weasyprint import CSS
+
+    key = hashlib.sha256(css_text.encode("utf-8")).hexdigest()
+    stylesheets = _warm_state.setdefault("stylesheets", {})
+    if key not in stylesheets:
+        stylesheets[key] = CSS(string=css_text, font_config=_warm_state["font_config"])
+    return stylesheets[key]
+
+
+def _render_with_warm_state(html_content, pdf_path, css_text, stylesheets=()):
+    # Warming up here rather than in a pool initializer lets a failed WeasyPrint import
+    # fail this render at once; a failing initializer makes the pool respawn workers forever.
+    if "HTML" not in _warm_state:
+        _warm_renderer(stylesheets)
+    stylesheets = [_parsed_stylesheet(css_text)] if css_text else []
+    _warm_state["HTML"](string=html_content).write_pdf(
+        pdf_path,
+        stylesheets=stylesheets,
+        font_config=_warm_state["font_config"],
+    )
+    return pdf_path
+
+
+class PdfRendererPool:
+    """Pool of warm renderer processes with a bounded number of pending jobs.
+
+    The pool is started on first use in each worker process, and each
+    renderer process loads WeasyPrint on its first render. A render that
+    exceeds ``timeout`` terminates the pool so a stuck layout cannot hold a
+    renderer forever; the next render starts a fresh pool.
+    """
+
+    def __init__(self, processes, max_pending, timeout, stylesheets=()):
+        self.processes = processes
+        self.timeout = timeout
+        self.stylesheets = tuple(stylesheets)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                context = multiprocessing.get_context("spawn")
+                self._pool = context.Pool(processes=self.processes)
+                self._pid = os.getpid()
+            return self._pool
+
+    def render(self, html_content, pdf_path, css_text=""):
+        if not self._slots.acquire(blocking=False):
+            raise RendererBusyError()
+        try:
+            pending = self._get_pool().apply_async(
+                _render_with_warm_state, (html_content, pdf_path, css_text, self.stylesheets)
+            )
+            try:
+                return pending.get(timeout=self.timeout)
+            except multiprocessing.TimeoutError:
+                self.close()
+                raise RenderTimeoutError(self.timeout) from None
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.terminate()
+            self._pool = None
+
+
+def get_pdf_renderer():
+    """Return the app's renderer pool, or ``None`` to render in-process."""
+    if not has_app_context():
+        return None
+    app = current_app._get_current_object()
+    if app.config.get("PDF_RENDERER", "pool") != "pool":
+        return None
+    renderer = app.extensions.get("ansimtalk_pdf_renderer")
+    if renderer is None:
+        from .services import report_stylesheet
+
+        renderer = PdfRendererPool(
+            processes=app.config.get("PDF_RENDER_PROCESSES", DEFAULT_PROCESSES),
+            max_pending=app.config.get("PDF_RENDER_MAX_PENDING", DEFAULT_MAX_PENDING),
+            timeout=app.config.get("PDF_RENDER_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS),
+            stylesheets=(report_stylesheet(),),
+        )
+        atexit.register(renderer.close)
+        app.extensions["ansimtalk_pdf_renderer"] = renderer
+    return renderer
+
+
+def render_pdf(html_content, pdf_path, css_text=""):
+    """Render HTML to ``pdf_path`` in the renderer pool, or inline without one."""
+    renderer = get_pdf_renderer()
+    if renderer is None:
+        return _render_with_warm_state(html_content, pdf_path, css_text)
+    return renderer.render(html_content, pdf_path, css_text)
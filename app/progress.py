@@ -0,0 +1,137 @@
+import contextvars
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from .sqlite_store import SQLiteStore, get_app_store
+
+
+DEFAULT_TTL_SECONDS = 60 * 60
+DEFAULT_STREAM_SECONDS = 120
+POLL_INTERVAL_SECONDS = 0.25
+HEARTBEAT_SECONDS = 15
+RECONNECT_MILLISECONDS = 2000
+# Either event ends a progress stream; nothing more is published after it.
+TERMINAL_EVENTS = ("complete", "failed")
+
+_current = contextvars.ContextVar("ansimtalk_progress", default=None)
+
+
+class ProgressLog(SQLiteStore):
+    """Append-only stage events per result id, shared by all workers through SQLite.
+
+    Analyses publish events from whichever worker runs them, and the progress
+    stream reads them back by increasing event id, so a client can resume
+    from the last id it saw. Events are dropped ``ttl_seconds`` after they
+    were written.
+    """
+
+    autocommit = True
+
+    def __init__(self, path, ttl_seconds=DEFAULT_TTL_SECONDS):
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS progress_events ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " result_id TEXT NOT NULL,"
+                " event TEXT NOT NULL,"
+                " data TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS progress_events_result_id ON progress_events (result_id, id)")
+
+    def publish(self, result_id, event, data=None):
+        now = time.time()
+        with self._connect() as conn:
+            if event in TERMINAL_EVENTS:
+                conn.execute("DELETE FROM progress_events WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "INSERT INTO progress_events (result_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                (result_id, event, json.dumps(data or {}, ensure_ascii=False), now),
+            )
+
+    def events_after(self, result_id, after_id=0):
+        """Return ``(id, event, data)`` for the events of ``result_id`` newer than ``after_id``."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, event, data FROM progress_events WHERE result_id = ? AND id > ? ORDER BY id",
+                (result_id, after_id),
+            ).fetchall()
+        return [(event_id, event, json.loads(data)) for event_id, event, data in rows]
+
+
+@contextmanager
+def track_progress(log, result_id):
+    """Send ``report_progress`` events raised inside the block to ``result_id``'s stream."""
+    token = _current.set((log, result_id))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def report_progress(event, **data):
+    """Publish a stage event for the analysis being tracked; a no-op outside ``track_progress``."""
+    tracker = _current.get()
+    if tracker is None:
+        return
+    log, result_id = tracker
+    try:
+        log.publish(result_id, event, data)
+    except sqlite3.Error:
+        # Progress is informational; never fail an analysis over it.
+        pass
+
+
+def _format_event(event, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, ensure_ascii=False)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_events(log, result_id, last_id=0, settled=False, max_seconds=DEFAULT_STREAM_SECONDS):
+    """Yield ``result_id``'s events in Server-Sent Events format, from ``last_id`` on.
+
+    The stream ends after a terminal event. When the result was already
+    ``settled`` as the stream opened, the events published so far are
+    replayed and a ``complete`` event is added. Otherwise the stream closes
+    after ``max_seconds`` and the browser reconnects with ``Last-Event-ID``,
+    so one connection is held per waiting page rather than repeated polls.
+    """
+    yield f"retry: {RECONNECT_MILLISECONDS}\n\n"
+    ends_at = time.monotonic() + max_seconds
+    quiet_since = time.monotonic()
+    while True:
+        events = log.events_after(result_id, last_id)
+        for event_id, event, data in events:
+            last_id = event_id
+            yield _format_event(event, data, event_id)
+            if event in TERMINAL_EVENTS:
+                return
+        if settled:
+            yield _format_event("complete", {})
+            return
+        now = time.monotonic()
+        if now >= ends_at:
+            return
+        if events:
+            quiet_since = now
+        elif now - quiet_since >= HEARTBEAT_SECONDS:
+            # Comment lines keep proxies from closing an idle connection.
+            yield ": keep-alive\n\n"
+            quiet_since = now
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def get_progress_log():
+    return get_app_store(
+        "ansimtalk_progress_log",
+        "PROGRESS_LOG_PATH",
+        "progress.sqlite3",
+        lambda app, path: ProgressLog(
+            path, ttl_seconds=app.config.get("PROGRESS_LOG_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+        ),
+    )
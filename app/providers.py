@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+
+
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 16
+
+
+class ProviderClients:
+    """Long-lived provider clients shared by every request in one worker process.
+
+    Clients are created on first use, which under gunicorn happens after the
+    worker has forked, so no gRPC channel or TLS connection is shared across
+    processes. If the process forks anyway (``--preload``), the child drops the
+    inherited clients and builds its own.
+
+    The provider SDKs are imported on first use as well, so starting the app
+    (and serving ``/health``) does not pay for loading gRPC and protobuf.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._http_session = None
+        self._vision_clients = {}
+        self._gemini_clients = {}
+
+    def _after_fork(self):
+        # The parent's lock may have been held by another thread at fork time.
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _ensure_current_process(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def http_session(self):
+        with self._lock:
+            self._ensure_current_process()
+            if self._http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._http_session = session
+            return self._http_session
+
+    def vision_client(self, service_account_info="", credentials_path=""):
+        """Return a Vision client for the configured credentials, or ``None``."""
+        if service_account_info:
+            key = ("service_account", hashlib.sha256(service_account_info.encode("utf-8")).hexdigest())
+        elif credentials_path and os.path.exists(credentials_path):
+            key = ("credentials_path", credentials_path)
+        else:
+            return None
+
+        with self._lock:
+            self._ensure_current_process()
+            client = self._vision_clients.get(key)
+            if client is None:
+                from google.cloud import vision
+
+                if service_account_info:
+                    from google.oauth2 import service_account
+
+                    credentials = service_account.Credentials.from_service_account_info(
+                        json.loads(service_account_info)
+                    )
+                    client = vision.ImageAnnotatorClient(credentials=credentials)
+                else:
+                    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
+                    client = vision.ImageAnnotatorClient()
+                self._vision_clients[key] = client
+            return client
+
+    def gemini_client(self, api_key):
+        key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        with self._lock:
+            self._ensure_current_process()
+            client = self._gemini_clients.get(key)
+            if client is None:
+                from google import genai
+
+                client = genai.Client(api_key=api_key)
+                self._gemini_clients[key] = client
+            return client
+
+
+def vision_image(content):
+    """Wrap image bytes in the Vision request type."""
+    from google.cloud import vision
+
+    return vision.Image(content=content)
+
+
+_clients = ProviderClients()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_clients._after_fork)
+
+
+def get_provider_clients():
+    return _clients
@@ -0,0 +1,61 @@
+import os
+import tempfile
+from pathlib import Path
+
+from flask import current_app, has_app_context
+from PIL import Image, ImageOps
+
+
+# Roughly the printable width of an A4 page at 150 dpi.
+REPORT_IMAGE_MAX_SIZE = (1240, 1754)
+REPORT_IMAGE_QUALITY = 82
+
+
+def _cache_dir():
+    configured = current_app.config.get("REPORT_IMAGE_CACHE_DIR") if has_app_context() else ""
+    return Path(configured or os.path.join(os.getcwd(), "tmp", "report_images"))
+
+
+def _write_derivative(image_path, target):
+    with Image.open(image_path) as image:
+        if image.format == "JPEG":
+            # Let libjpeg decode at a reduced scale instead of the full resolution.
+            image.draft("RGB", REPORT_IMAGE_MAX_SIZE)
+        image = ImageOps.exif_transpose(image)
+        if image.mode in {"RGBA", "LA", "P"}:
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail(REPORT_IMAGE_MAX_SIZE, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+        handle, temp_path = tempfile.mkstemp(dir=target.parent, suffix=".jpg.partial")
+        os.close(handle)
+        try:
+            image.save(temp_path, "JPEG", quality=REPORT_IMAGE_QUALITY, optimize=True, progressive=True)
+            os.replace(temp_path, target)
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+
+
+def report_image_path(image_path, sha256):
+    """Return a page-width JPEG rendition of an evidence image for reports.
+
+    The rendition is cached under the original file's SHA-256, so repeat
+    reports of the same evidence reuse it. If the image cannot be decoded the
+    original path is returned unchanged.
+    """
+    if not sha256:
+        return image_path
+    width, height = REPORT_IMAGE_MAX_SIZE
+    target = _cache_dir() / f"{sha256}_{width}x{height}_q{REPORT_IMAGE_QUALITY}.jpg"
+    if target.exists():
+        return str(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        _write_derivative(image_path, target)
+    except Exception:
+        return image_path
+    return str(target)
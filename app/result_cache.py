@@ -0,0 +1,82 @@
+import time
+
+from flask import current_app
+
+from .sqlite_store import SQLiteStore, get_app_store, serializer
+
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 5000
+
+
+class ResultCache(SQLiteStore):
+    """Content-addressed analysis cache stored in a local SQLite file.
+
+    Entries expire after ``ttl_seconds`` and the least recently used entries are
+    evicted once more than ``max_entries`` are stored.
+    """
+
+    def __init__(self, path, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " cache_key TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at)")
+
+    def get(self, cache_key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM results WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+            if row is None:
+                return None
+            payload, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM results WHERE cache_key = ?", (cache_key,))
+                return None
+            conn.execute("UPDATE results SET accessed_at = ? WHERE cache_key = ?", (now, cache_key))
+        return serializer.loads(payload)
+
+    def set(self, cache_key, value):
+        now = time.time()
+        payload = serializer.dumps(value)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (cache_key, payload, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (cache_key, payload, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM results WHERE cache_key IN ("
+            " SELECT cache_key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+def get_result_cache():
+    """Return the app's result cache, or ``None`` when caching is disabled."""
+    app = current_app._get_current_object()
+    if not app.config.get("RESULT_CACHE_ENABLED", True):
+        return None
+    return get_app_store(
+        "ansimtalk_result_cache",
+        "RESULT_CACHE_PATH",
+        "result_cache.sqlite3",
+        lambda app, path: ResultCache(
+            path,
+            ttl_seconds=app.config.get("RESULT_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS),
+            max_entries=app.config.get("RESULT_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+        ),
+    )
@@ -0,0 +1,66 @@
+import time
+import uuid
+
+from .sqlite_store import SQLiteStore, get_app_store, serializer
+
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+class ResultStore(SQLiteStore):
+    """Server-side analysis results addressed by an opaque result id.
+
+    The browser session only carries the id, so large results never travel in
+    the signed cookie. Records expire ``ttl_seconds`` after their last write.
+    """
+
+    def __init__(self, path, ttl_seconds=DEFAULT_TTL_SECONDS):
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_results ("
+                " result_id TEXT PRIMARY KEY,"
+                " record TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS analysis_results_expires_at ON analysis_results (expires_at)"
+            )
+
+    def save(self, record, result_id=None):
+        """Insert or replace a record and return its result id."""
+        result_id = result_id or uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM analysis_results WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_results (result_id, record, expires_at) VALUES (?, ?, ?)",
+                (result_id, serializer.dumps(record), now + self.ttl_seconds),
+            )
+        return result_id
+
+    def get(self, result_id):
+        if not result_id:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT record FROM analysis_results WHERE result_id = ? AND expires_at >= ?",
+                (result_id, time.time()),
+            ).fetchone()
+        return None if row is None else serializer.loads(row[0])
+
+    def delete(self, result_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM analysis_results WHERE result_id = ?", (result_id,))
+
+
+def get_result_store():
+    return get_app_store(
+        "ansimtalk_result_store",
+        "RESULT_STORE_PATH",
+        "results.sqlite3",
+        lambda app, path: ResultStore(
+            path, ttl_seconds=app.config.get("RESULT_STORE_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+        ),
+    )
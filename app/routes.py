@@ -1,3 +1,4 @@
+import codecs
 import hashlib
 import os
 import re
@@ -6,16 +7,58 @@ import uuid
 from datetime import datetime
 from pathlib import Path
 
-from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, send_file, session, url_for
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    send_file,
+    session,
+    url_for,
+)
 from PIL import ExifTags, Image
-
-from .services import analyze_file, generate_pdf_report
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from .deadline import request_deadline
+from .jobs import QueueFullError, get_job_queue
+from .pdf_cache import get_pdf_cache, report_digest
+from .pdf_renderer import PdfRenderError
+from .progress import DEFAULT_STREAM_SECONDS, get_progress_log, stream_events, track_progress
+from .result_store import get_result_store
+from .services import (
+    REPORT_TEMPLATE_VERSION,
+    analyze_file,
+    complete_provisional_analysis,
+    cyberbullying_summary_text,
+    cyberbullying_table_html,
+    generate_pdf_report,
+    resolve_pdf_backend,
+)
 
 
 bp = Blueprint("main", __name__)
 
 ALLOWED_EXTENSIONS = {"txt", "png", "jpg", "jpeg"}
+ANALYSIS_TYPES = {"deepfake", "cyberbullying"}
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg"}
 MAX_FILE_SIZE = 5 * 1024 * 1024
+# Chat exports are parsed as a stream, so a whole semester of KakaoTalk history is fine.
+MAX_TEXT_FILE_SIZE = 50 * 1024 * 1024
+# Room for the multipart boundaries and the other form fields around the largest upload.
+UPLOAD_FORM_OVERHEAD = 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MAGIC_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpeg"),
+    # Byte order marks of the text encodings chat exports are read with; UTF-16 text contains NUL bytes.
+    (codecs.BOM_UTF8, "text"),
+    (codecs.BOM_UTF16_LE, "text"),
+    (codecs.BOM_UTF16_BE, "text"),
+)
 CLIENT_PATH_FIELD_NAMES = {
     "file_path",
     "uploaded_file_path",
@@ -57,12 +100,40 @@ def extract_metadata(image_path):
         return {"resolution": "unknown"}
 
 
-def get_file_sha256(filepath):
+def sniff_file_type(prefix):
+    """Return the upload kind implied by the first bytes of a file."""
+    for signature, kind in MAGIC_SIGNATURES:
+        if prefix.startswith(signature):
+            return kind
+    if b"\x00" in prefix:
+        return "binary"
+    return "text"
+
+
+def _stream_upload(file_storage, file_path, max_size=None):
+    """Write an upload to disk in one pass, returning its SHA-256, size and sniffed type."""
+    max_size = max_size or MAX_FILE_SIZE
     digest = hashlib.sha256()
-    with open(filepath, "rb") as handle:
-        for chunk in iter(lambda: handle.read(8192), b""):
-            digest.update(chunk)
-    return digest.hexdigest()
+    size_bytes = 0
+    detected_type = None
+    try:
+        with open(file_path, "wb") as handle:
+            for chunk in iter(lambda: file_storage.stream.read(UPLOAD_CHUNK_SIZE), b""):
+                if detected_type is None:
+                    detected_type = sniff_file_type(chunk)
+                size_bytes += len(chunk)
+                if size_bytes > max_size:
+                    raise ValueError(f"File is larger than {max_size // (1024 * 1024)}MB.")
+                digest.update(chunk)
+                handle.write(chunk)
+    except BaseException:
+        Path(file_path).unlink(missing_ok=True)
+        raise
+    return {
+        "sha256": digest.hexdigest(),
+        "size_bytes": size_bytes,
+        "detected_type": detected_type or "text",
+    }
 
 
 def _save_upload(file_storage):
@@ -71,12 +142,6 @@ def _save_upload(file_storage):
     if not allowed_file(file_storage.filename):
         raise ValueError("Unsupported file type.")
 
-    file_storage.seek(0, os.SEEK_END)
-    file_size = file_storage.tell()
-    file_storage.seek(0)
-    if file_size > MAX_FILE_SIZE:
-        raise ValueError("File is larger than 5MB.")
-
     original_filename = secure_korean_filename(file_storage.filename)
     extension = original_filename.rsplit(".", 1)[1].lower()
     upload_dir = Path(os.getcwd()) / "tmp"
@@ -84,24 +149,184 @@ def _save_upload(file_storage):
 
     filename = f"{uuid.uuid4().hex}_{datetime.now().strftime('%Y%m%d%H%M%S')}.{extension}"
     file_path = upload_dir / filename
-    file_storage.save(file_path)
-    return original_filename, extension, str(file_path)
-
-
-def _record_analysis_session(file_path, original_filename, file_extension, analysis_type, analysis_result):
-    session["uploaded_file_path"] = file_path
-    session["static_file_path"] = file_path
-    session["original_filename"] = original_filename
-    session["original_uploaded_filename"] = original_filename
-    session["file_extension"] = file_extension
-    session["file_stat"] = {"st_size": os.path.getsize(file_path)}
-    session["metadata"] = extract_metadata(file_path)
-    session["sha256"] = get_file_sha256(file_path)
-    session["analysis_type"] = analysis_type
-    session["analysis_result"] = analysis_result
-    session["last_analysis_file_path"] = file_path
-    session["last_analysis_filename"] = original_filename
-    session["last_analysis_type"] = analysis_type
+    max_size = MAX_FILE_SIZE if extension in IMAGE_EXTENSIONS else MAX_TEXT_FILE_SIZE
+    upload = _stream_upload(file_storage, file_path, max_size)
+
+    is_image = upload["detected_type"] in {"png", "jpeg"}
+    if is_image != (extension in IMAGE_EXTENSIONS) or upload["detected_type"] == "binary":
+        file_path.unlink(missing_ok=True)
+        raise ValueError("File content does not match its extension.")
+    return original_filename, extension, str(file_path), upload
+
+
+def _record_analysis_session(file_path, original_filename, file_extension, analysis_type, upload, analysis_result=None):
+    """Store the result server-side and keep only its opaque id in the session.
+
+    Without ``analysis_result`` the record is pending until a background job fills it in.
+    """
+    record = {
+        "file_path": file_path,
+        "original_filename": original_filename,
+        "file_extension": file_extension,
+        "file_stat": {"st_size": upload["size_bytes"]},
+        "metadata": extract_metadata(file_path),
+        "sha256": upload["sha256"],
+        "analysis_type": analysis_type,
+        "analysis_result": analysis_result,
+    }
+    session.clear()
+    session["result_id"] = get_result_store().save(record)
+    return session["result_id"]
+
+
+def _current_analysis_record():
+    return get_result_store().get(session.get("result_id"))
+
+
+def _analyze_saved_upload(analysis_type, original_filename, file_extension, file_path, upload, provisional=False):
+    analysis_result = analyze_file(
+        file_path,
+        analysis_type,
+        file_extension,
+        sha256=upload["sha256"],
+        size_bytes=upload["size_bytes"],
+        provisional=provisional,
+    )
+    analysis_result["original_filename"] = original_filename
+    analysis_result["file_path"] = file_path
+    analysis_result["upload_path"] = file_path
+    analysis_result["original_image_path"] = file_path
+    return analysis_result
+
+
+def _analyze_recorded_upload(result_id):
+    """Analyze the upload behind a pending result, publishing each stage to its progress stream."""
+    store = get_result_store()
+    record = store.get(result_id)
+    if record is None or record["analysis_result"] is not None or record.get("error"):
+        return record
+    progress = get_progress_log()
+    upload = {"sha256": record["sha256"], "size_bytes": record["file_stat"]["st_size"]}
+    # Someone is waiting on the results page, so the request deadline still applies.
+    deadline = request_deadline(current_app.config.get("REQUEST_DEADLINE_SECONDS"))
+    try:
+        with deadline, track_progress(progress, result_id):
+            record["analysis_result"] = _analyze_saved_upload(
+                record["analysis_type"],
+                record["original_filename"],
+                record["file_extension"],
+                record["file_path"],
+                upload,
+            )
+    except Exception as exc:
+        record["error"] = f"Analysis failed: {exc}"
+        store.save(record, result_id)
+        progress.publish(result_id, "failed", {"error": record["error"]})
+        raise
+    store.save(record, result_id)
+    progress.publish(result_id, "analysis_done")
+    progress.publish(result_id, "complete")
+    # The results page is already showing; the report is rendered afterwards so it never waits on PDF work.
+    _prerender_report_pdf(result_id, record)
+    return record
+
+
+def _prerender_report_pdf(result_id, record):
+    """Render the default report into the PDF cache when pre-rendering is turned on."""
+    if not current_app.config.get("PDF_PRERENDER_ENABLED", False):
+        return
+    try:
+        _render_report_pdf(
+            record["analysis_result"], record["analysis_type"], resolve_pdf_backend(record["analysis_type"])
+        )
+    except Exception as exc:
+        current_app.logger.warning("PDF pre-rendering failed for %s: %s", result_id, exc)
+
+
+def _complete_stored_result(result_id):
+    """Replace a stored provisional result with its final analysis, keeping the result id."""
+    store = get_result_store()
+    record = store.get(result_id)
+    if record is None or not (record["analysis_result"] or {}).get("provisional"):
+        return record
+    progress = get_progress_log()
+    provisional_result = record["analysis_result"]
+    try:
+        with track_progress(progress, result_id):
+            record["analysis_result"] = complete_provisional_analysis(provisional_result)
+    except Exception as exc:
+        # Settle on the offline result so pollers stop waiting for an upgrade that will not come.
+        record["analysis_result"] = {key: value for key, value in provisional_result.items() if key != "provisional"}
+        record["analysis_result"]["provider_error"] = f"Gemini analysis failed: {exc}"
+        store.save(record, result_id)
+        progress.publish(result_id, "failed", {"error": record["analysis_result"]["provider_error"]})
+        raise
+    store.save(record, result_id)
+    progress.publish(result_id, "analysis_done")
+    progress.publish(result_id, "complete")
+    return record
+
+
+def _run_analysis_job(payload):
+    for key, run in (("analyze_result_id", _analyze_recorded_upload), ("complete_result_id", _complete_stored_result)):
+        if key in payload:
+            record = run(payload[key])
+            return {"result_id": payload[key], "found": record is not None}
+    return _analyze_saved_upload(**payload)
+
+
+def _job_queue():
+    return get_job_queue(_run_analysis_job)
+
+
+def _report_pdf_digest(analysis_result, analysis_type, backend):
+    return report_digest(analysis_result, analysis_type, f"{REPORT_TEMPLATE_VERSION}:{backend}")
+
+
+def _render_report_pdf(analysis_result, analysis_type, backend):
+    """Return the cached report PDF path, rendering it on a miss."""
+    return get_pdf_cache().get_or_render(
+        _report_pdf_digest(analysis_result, analysis_type, backend),
+        lambda path: generate_pdf_report(analysis_result, path, analysis_type, backend=backend),
+    )
+
+
+def _send_report_pdf(analysis_result, analysis_type, backend=None):
+    """Send the report PDF, rendering it only when no cached copy exists."""
+    backend = resolve_pdf_backend(analysis_type, backend)
+    digest = _report_pdf_digest(analysis_result, analysis_type, backend)
+    if request.if_none_match.contains(digest):
+        response = Response(status=304)
+        response.set_etag(digest)
+        return response
+
+    try:
+        pdf_path = _render_report_pdf(analysis_result, analysis_type, backend)
+    except PdfRenderError as exc:
+        current_app.logger.warning("PDF rendering unavailable: %s", exc)
+        response = jsonify({"error": str(exc)})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(exc.retry_after)
+        return response
+    response = send_file(
+        pdf_path,
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=f"evidence_{digest[:16]}.pdf",
+        etag=digest,
+    )
+    response.cache_control.private = True
+    return response
+
+
+@bp.app_errorhandler(RequestEntityTooLarge)
+def _upload_too_large(exc):
+    """Reject a request body over ``MAX_CONTENT_LENGTH`` before any of it is read."""
+    message = f"File is larger than {MAX_TEXT_FILE_SIZE // (1024 * 1024)}MB."
+    if request.path.startswith("/api/"):
+        return jsonify({"error": message}), 413
+    flash(message)
+    return redirect(url_for("main.index"))
 
 
 def _handle_file_upload_and_analysis(analysis_type):
@@ -110,14 +335,19 @@ def _handle_file_upload_and_analysis(analysis_type):
             flash("No file was uploaded.")
             return redirect(url_for("main.index"))
 
-        original_filename, file_extension, file_path = _save_upload(request.files["file"])
-        analysis_result = analyze_file(file_path, analysis_type, file_extension)
-        analysis_result["original_filename"] = original_filename
-        analysis_result["file_path"] = file_path
-        analysis_result["upload_path"] = file_path
-        analysis_result["original_image_path"] = file_path
-        _record_analysis_session(file_path, original_filename, file_extension, analysis_type, analysis_result)
+        original_filename, file_extension, file_path, upload = _save_upload(request.files["file"])
+        result_id = _record_analysis_session(file_path, original_filename, file_extension, analysis_type, upload)
+        get_progress_log().publish(
+            result_id, "upload_hashed", {"sha256": upload["sha256"], "size_bytes": upload["size_bytes"]}
+        )
+        try:
+            # The results page follows the analysis through its progress stream.
+            _job_queue().submit({"analyze_result_id": result_id})
+        except QueueFullError:
+            _analyze_recorded_upload(result_id)
         return redirect(url_for("main.results"))
+    except RequestEntityTooLarge as exc:
+        return _upload_too_large(exc)
     except Exception as exc:
         current_app.logger.exception("Upload analysis failed")
         flash(f"Analysis failed: {exc}")
@@ -154,12 +384,28 @@ def analyze_cyberbullying():
 
 @bp.route("/results")
 def results():
-    analysis_result = session.get("analysis_result")
-    analysis_type = session.get("analysis_type")
-    if not analysis_result:
+    record = _current_analysis_record()
+    if not record:
         flash("No analysis result is available.")
         return redirect(url_for("main.index"))
-    return render_template("results.html", result=analysis_result, analysis_type=analysis_type)
+    if record.get("error"):
+        flash(record["error"])
+        return redirect(url_for("main.index"))
+    if record["analysis_result"] is None:
+        return render_template(
+            "analysis_progress.html",
+            analysis_type=record["analysis_type"],
+            file_extension=record["file_extension"],
+            events_url=url_for("main.api_result_events", result_id=session["result_id"]),
+        )
+    result = record["analysis_result"]
+    return render_template(
+        "results.html",
+        result=result,
+        analysis_type=record["analysis_type"],
+        analysis_table=cyberbullying_table_html(result) if record["analysis_type"] == "cyberbullying" else "",
+        analysis_summary=cyberbullying_summary_text(result),
+    )
 
 
 @bp.route("/evidence")
@@ -179,26 +425,30 @@ def cyberbullying_help():
 
 @bp.route("/download_pdf")
 def download_pdf():
-    analysis_result = session.get("analysis_result")
-    analysis_type = session.get("analysis_type")
-    if not analysis_result:
+    record = _current_analysis_record()
+    if not record:
         flash("No analysis result is available.")
         return redirect(url_for("main.index"))
-
-    pdf_path = str(Path(os.getcwd()) / "tmp" / f"evidence_{uuid.uuid4().hex}.pdf")
-    generate_pdf_report(analysis_result, pdf_path, analysis_type)
-    return send_file(pdf_path, as_attachment=True, download_name=Path(pdf_path).name)
+    if record["analysis_result"] is None:
+        return redirect(url_for("main.results"))
+    try:
+        return _send_report_pdf(record["analysis_result"], record["analysis_type"], request.args.get("backend"))
+    except ValueError as exc:
+        flash(str(exc))
+        return redirect(url_for("main.results"))
 
 
 @bp.route("/reset")
 def reset():
-    for key in ("uploaded_file_path", "static_file_path", "last_analysis_file_path"):
-        file_path = session.get(key)
+    record = _current_analysis_record()
+    if record:
+        file_path = record.get("file_path")
         if file_path and os.path.exists(file_path):
             try:
                 os.remove(file_path)
             except OSError:
                 current_app.logger.warning("Failed to remove temporary file: %s", file_path)
+        get_result_store().delete(session["result_id"])
     session.clear()
     return redirect(url_for("main.index"))
 
@@ -213,14 +463,33 @@ def _api_analyze(analysis_type):
         if "file" not in request.files:
             return jsonify({"error": "No file was uploaded."}), 400
 
-        original_filename, file_extension, file_path = _save_upload(request.files["file"])
-        analysis_result = analyze_file(file_path, analysis_type, file_extension)
-        analysis_result["original_filename"] = original_filename
-        analysis_result["file_path"] = file_path
-        analysis_result["upload_path"] = file_path
-        analysis_result["original_image_path"] = file_path
-        _record_analysis_session(file_path, original_filename, file_extension, analysis_type, analysis_result)
+        # Clients opt in with ``provisional=1`` to get the offline result now and poll for Gemini's.
+        provisional = current_app.config.get("PROVISIONAL_RESULTS_ENABLED", True) and request.values.get(
+            "provisional", ""
+        ).lower() in {"1", "true", "yes"}
+        with request_deadline(current_app.config.get("REQUEST_DEADLINE_SECONDS")):
+            original_filename, file_extension, file_path, upload = _save_upload(request.files["file"])
+            analysis_result = _analyze_saved_upload(
+                analysis_type, original_filename, file_extension, file_path, upload, provisional
+            )
+            result_id = _record_analysis_session(
+                file_path, original_filename, file_extension, analysis_type, upload, analysis_result
+            )
+            if analysis_result.get("provisional"):
+                try:
+                    _job_queue().submit({"complete_result_id": result_id})
+                except QueueFullError:
+                    # No background capacity: finish the analysis in this request instead.
+                    analysis_result = _complete_stored_result(result_id)["analysis_result"]
+        if analysis_result.get("provisional"):
+            links = {
+                "result_url": url_for("main.api_result", result_id=result_id),
+                "events_url": url_for("main.api_result_events", result_id=result_id),
+            }
+            return jsonify(dict(analysis_result, result_id=result_id, **links)), 200
         return jsonify(analysis_result), 200
+    except RequestEntityTooLarge as exc:
+        return _upload_too_large(exc)
     except ValueError as exc:
         return jsonify({"error": str(exc)}), 400
     except Exception as exc:
@@ -228,6 +497,91 @@ def _api_analyze(analysis_type):
         return jsonify({"error": f"Analysis failed: {exc}"}), 500
 
 
+@bp.route("/api/jobs", methods=["POST"])
+def api_create_job():
+    analysis_type = request.form.get("analysis_type", "")
+    if analysis_type not in ANALYSIS_TYPES:
+        return jsonify({"error": "Unsupported analysis type."}), 400
+    if "file" not in request.files:
+        return jsonify({"error": "No file was uploaded."}), 400
+
+    queue = _job_queue()
+    file_path = None
+    try:
+        queue.check_capacity()
+        original_filename, file_extension, file_path, upload = _save_upload(request.files["file"])
+        job_id = queue.submit(
+            {
+                "analysis_type": analysis_type,
+                "original_filename": original_filename,
+                "file_extension": file_extension,
+                "file_path": file_path,
+                "upload": upload,
+            }
+        )
+    except QueueFullError as exc:
+        if file_path:
+            Path(file_path).unlink(missing_ok=True)
+        response = jsonify({"error": str(exc)})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(exc.retry_after)
+        return response
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    status_url = url_for("main.api_job_status", job_id=job_id)
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": status_url}), 202, {"Location": status_url}
+
+
+@bp.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id):
+    job = _job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job), 200
+
+
+@bp.route("/api/results/<result_id>", methods=["GET"])
+def api_result(result_id):
+    """Return a stored result; provisional results are replaced in place once Gemini answers."""
+    record = get_result_store().get(result_id)
+    if record is None:
+        return jsonify({"error": "Result not found."}), 404
+    if record.get("error"):
+        return jsonify({"result_id": result_id, "status": "failed", "error": record["error"]}), 200
+    if record["analysis_result"] is None:
+        response = jsonify({"result_id": result_id, "status": "pending"})
+        response.status_code = 202
+        response.headers["Retry-After"] = "1"
+        return response
+    response = jsonify(dict(record["analysis_result"], result_id=result_id))
+    if record["analysis_result"].get("provisional"):
+        response.headers["Retry-After"] = "1"
+    return response
+
+
+@bp.route("/api/results/<result_id>/events", methods=["GET"])
+def api_result_events(result_id):
+    """Stream a result's stage events as Server-Sent Events until its analysis is complete."""
+    record = get_result_store().get(result_id)
+    if record is None:
+        return jsonify({"error": "Result not found."}), 404
+    analysis_result = record["analysis_result"]
+    settled = bool(record.get("error")) or (analysis_result is not None and not analysis_result.get("provisional"))
+    events = stream_events(
+        get_progress_log(),
+        result_id,
+        last_id=request.headers.get("Last-Event-ID", 0, type=int),
+        settled=settled,
+        max_seconds=current_app.config.get("PROGRESS_STREAM_SECONDS", DEFAULT_STREAM_SECONDS),
+    )
+    response = Response(events, mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Keep reverse proxies from buffering the stream.
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 @bp.route("/api/analyze_deepfake", methods=["POST"])
 def api_analyze_deepfake():
     return _api_analyze("deepfake")
@@ -248,7 +602,7 @@ def api_download_pdf():
         return jsonify({"error": "Client-supplied file paths are not allowed."}), 400
 
     analysis_type = payload.get("analysis_type", analysis_result.get("analysis_type", "unknown"))
-    pdf_path = str(Path(os.getcwd()) / "tmp" / f"evidence_{uuid.uuid4().hex}.pdf")
-    Path(pdf_path).parent.mkdir(parents=True, exist_ok=True)
-    generate_pdf_report(analysis_result, pdf_path, analysis_type)
-    return send_file(pdf_path, mimetype="application/pdf", as_attachment=True, download_name=Path(pdf_path).name)
+    try:
+        return _send_report_pdf(analysis_result, analysis_type, payload.get("backend"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
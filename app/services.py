@@ -1,18 +1,84 @@
 import base64
+import contextvars
 import hashlib
+import itertools
 import json
 import os
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from html import escape
 from pathlib import Path
 
-import requests
-from flask import current_app
-from google import genai
-from google.cloud import vision
+from flask import current_app, has_app_context
 from PIL import Image
-from weasyprint import HTML
+
+from .chunking import (
+    DEFAULT_OVERLAP_MESSAGES,
+    DEFAULT_WINDOW_TOKENS,
+    ConversationWindow,
+    highest_risk,
+    split_conversation_windows,
+)
+from .circuit_breaker import get_circuit_breaker
+from .classifier import DEFAULT_MODEL_PATH, DEFAULT_THRESHOLD, load_classifier
+from .deadline import DeadlineExceeded, budget, current_deadline
+from .fonts import REPORT_FONT_FAMILY, report_font_face_css
+from .kakao import format_message, iter_chat_messages, iter_text_lines, message_datetime
+from .lexicon import CATEGORIES, merge_spans
+from .message_scores import DEFAULT_WINDOW_MINUTES, MESSAGE_SCORES_VERSION, aggregate_scores, score_messages
+from .pdf_renderer import render_pdf
+from .progress import report_progress
+from .providers import get_provider_clients, vision_image
+from .report_images import report_image_path
+from .result_cache import get_result_cache
+from .single_flight import get_single_flight
+
+
+GEMINI_MODEL = "gemini-2.5-flash"
+CYBERBULLYING_PROMPT_VERSION = "cyberbullying-json-v4"
+GEMINI_TIMEOUT_SECONDS = 120
+SIGHTENGINE_TIMEOUT_SECONDS = 30
+VISION_TIMEOUT_SECONDS = 30
+GEMINI_MAX_CONCURRENCY = 4
+TRIAGE_MIN_SIGNALS = 1
+FALLBACK_ANALYZER_VERSION = "keyword-fallback-v6"
+SIGHTENGINE_MODELS = "deepfake,scam,gore"
+# Bump whenever generate_report_html output changes so cached PDFs are not reused.
+REPORT_TEMPLATE_VERSION = "report-html-v5"
+PDF_BACKENDS = {"weasyprint", "fpdf"}
+# Kept out of the report HTML so renderer processes can parse it once and reuse it.
+# report_stylesheet() prepends @font-face rules for the cached common-Hangul font subset.
+REPORT_STYLESHEET = f"""
+body {{ font-family: "{REPORT_FONT_FAMILY}", "{REPORT_FONT_FAMILY} Full", "NanumGothic", Arial, sans-serif; }}
+body {{ line-height: 1.5; color: #1f2937; }}
+h1, h2 {{ color: #111827; }}
+table {{ border-collapse: collapse; width: 100%; margin: 12px 0; }}
+th, td {{ border: 1px solid #d1d5db; padding: 6px; vertical-align: top; }}
+mark.keyword-hit {{ background: #fde68a; }}
+th {{ background: #f3f4f6; }}
+pre {{ white-space: pre-wrap; background: #f9fafb; padding: 12px; }}
+img {{ max-width: 100%; height: auto; }}
+"""
+DEEPFAKE_STAGE_TIMEOUTS = {
+    "metadata": 10,
+    "deepfake_analysis": 35,
+    "extracted_text": 35,
+}
+# Characters of the analyzed conversation kept in a result; longer chats are re-read from the upload.
+EXTRACTED_TEXT_PREVIEW_CHARS = 100_000
+# Fields a cyberbullying analysis stores in the result cache.
+_CONVERSATION_RESULT_KEYS = (
+    "extracted_text",
+    "extracted_text_truncated",
+    "cyberbullying_findings",
+    "cyberbullying_summary",
+    "cyberbullying_risk_line",
+    "keyword_matches",
+    "message_scores",
+    "risk_aggregates",
+    "triage",
+)
 
 
 def convert_markdown_table_to_html(markdown_table):
@@ -29,17 +95,34 @@ def convert_markdown_table_to_html(markdown_table):
         if cells and not all(set(cell) <= {"-", ":"} for cell in cells):
             rows.append(cells)
 
+    return _html_table([[escape(cell) for cell in cells] for cells in rows])
+
+
+def _html_table(rows):
+    """Render rows of already-escaped HTML cells; the first row is the header."""
     if not rows:
         return "<p>No table rows.</p>"
 
     html = ['<table class="analysis-table">']
     for index, cells in enumerate(rows):
         tag = "th" if index == 0 else "td"
-        html.append("<tr>" + "".join(f"<{tag}>{escape(cell)}</{tag}>" for cell in cells) + "</tr>")
+        html.append("<tr>" + "".join(f"<{tag}>{cell}</{tag}>" for cell in cells) + "</tr>")
     html.append("</table>")
     return "\n".join(html)
 
 
+def highlight_spans(text, spans):
+    """Escape ``text`` and wrap each ``(start, end)`` span in a ``<mark>``."""
+    parts = []
+    position = 0
+    for start, end in spans:
+        parts.append(escape(text[position:start]))
+        parts.append(f'<mark class="keyword-hit">{escape(text[start:end])}</mark>')
+        position = end
+    parts.append(escape(text[position:]))
+    return "".join(parts)
+
+
 def get_risk_class(risk_text):
     value = str(risk_text or "").strip().lower()
     if value in {"high", "severe"}:
@@ -66,16 +149,34 @@ def get_image_metadata(filepath):
         return {"error": f"metadata extraction failed: {exc}"}
 
 
-def analyze_file(file_path, analysis_type, file_extension):
+def _hash_file(file_path):
+    digest = hashlib.sha256()
+    size_bytes = 0
     with open(file_path, "rb") as handle:
-        sha256 = hashlib.sha256(handle.read()).hexdigest()
+        for chunk in iter(lambda: handle.read(64 * 1024), b""):
+            digest.update(chunk)
+            size_bytes += len(chunk)
+    return digest.hexdigest(), size_bytes
+
+
+def analyze_file(file_path, analysis_type, file_extension, sha256=None, size_bytes=None, provisional=False):
+    """Analyze an uploaded file.
+
+    Callers that already hashed the upload while writing it pass ``sha256`` and
+    ``size_bytes`` so the file is not read again just to fingerprint it. With
+    ``provisional`` a conversation that would go to Gemini keeps the offline
+    analysis for now and is marked ``provisional``; ``complete_provisional_analysis``
+    replaces it later.
+    """
+    if sha256 is None or size_bytes is None:
+        sha256, size_bytes = _hash_file(file_path)
 
     file_extension = str(file_extension or "").lower()
     result = {
         "file_info": {
             "filename": os.path.basename(file_path),
             "type": file_extension,
-            "size_bytes": os.path.getsize(file_path),
+            "size_bytes": size_bytes,
             "sha256": sha256,
         },
         "analysis_timestamp": datetime.now().isoformat(),
@@ -83,46 +184,296 @@ def analyze_file(file_path, analysis_type, file_extension):
         "analysis_type": analysis_type,
     }
 
+    cache = get_result_cache()
+    cache_key = _result_cache_key(sha256, analysis_type, file_extension)
+    cached = cache.get(cache_key) if cache else None
+    if cached is not None:
+        result.update(cached)
+        result["result_cache"] = "hit"
+        return result
+
+    def analyze():
+        analysis = _analyze_content(file_path, analysis_type, file_extension, provisional)
+        if cache and _is_cacheable(analysis):
+            cache.set(cache_key, analysis)
+        return analysis
+
+    # Identical uploads arriving together wait for one provider call instead of each making their own.
+    flight = get_single_flight()
+    if flight is None:
+        result.update(analyze())
+        return result
+    deadline = current_deadline()
+    # Provisional callers must not hand their offline result to callers waiting for the final one.
+    flight_key = f"{cache_key}|provisional" if provisional else cache_key
+    analysis, shared = flight.run(flight_key, analyze, None if deadline is None else deadline.remaining())
+    result.update(analysis)
+    if shared:
+        result["single_flight"] = "shared"
+    return result
+
+
+def _analyze_content(file_path, analysis_type, file_extension, provisional=False):
     if analysis_type == "deepfake":
         if file_extension not in {"png", "jpg", "jpeg"}:
-            result["error"] = "Deepfake analysis accepts image files only."
-            return result
-
-        result["metadata"] = get_image_metadata(file_path)
-        result["deepfake_analysis"] = analyze_image_with_sightengine(file_path)
-        extracted_text = extract_text_from_image(file_path)
+            return {"error": "Deepfake analysis accepts image files only."}
+
+        stages = _run_stages(
+            {
+                "metadata": (get_image_metadata, file_path),
+                "deepfake_analysis": (analyze_image_with_sightengine, file_path),
+                "extracted_text": (extract_text_from_image, file_path),
+            },
+            DEEPFAKE_STAGE_TIMEOUTS,
+        )
+        analysis = {
+            "metadata": _stage_value(stages["metadata"], "metadata extraction"),
+            "deepfake_analysis": _stage_value(stages["deepfake_analysis"], "Sightengine"),
+        }
+        extracted_text = stages["extracted_text"]
+        if isinstance(extracted_text, BaseException):
+            extracted_text = f"[Google Cloud Vision API error: {_describe_stage_failure(extracted_text)}]"
         if extracted_text.strip() and not extracted_text.startswith("["):
-            result["extracted_text"] = extracted_text
-        return result
+            analysis["extracted_text"] = extracted_text
+        elif extracted_text.startswith("[Google Cloud Vision API error"):
+            analysis["ocr_error"] = extracted_text
+        return analysis
 
     if analysis_type == "cyberbullying":
         if file_extension in {"png", "jpg", "jpeg"}:
             extracted_text = extract_text_from_image(file_path)
+            messages = iter_chat_messages(extracted_text.splitlines())
+
+            def load_text():
+                return _preprocess_kakao_chat_text(extracted_text)
+
         elif file_extension == "txt":
-            extracted_text = read_text_file(file_path)
+            extracted_text = ""
+            messages = iter_chat_messages(iter_text_lines(file_path))
+
+            def load_text():
+                return read_chat_export(file_path)
+
         else:
-            result["error"] = "Cyberbullying analysis accepts text or image files only."
-            return result
-
-        normalized = _preprocess_kakao_chat_text(extracted_text)
-        analysis = analyze_text_with_gemini(normalized)
-        result["extracted_text"] = normalized
-        result["cyberbullying_analysis"] = analysis.get("table", "")
-        result["cyberbullying_analysis_summary"] = analysis.get("summary", "")
-        result["cyberbullying_risk_line"] = extract_risk_line(analysis.get("summary", ""))
+            return {"error": "Cyberbullying analysis accepts text or image files only."}
+
+        # Messages stream from the parser into scoring; only the start of the transcript is kept as text.
+        preview = []
+        lines, moments = itertools.tee(_chat_records(messages, preview))
+        scores = score_messages(
+            (line for line, _ in lines),
+            (moment for _, moment in moments),
+            _triage_classifier(),
+            current_app.config.get("TEXT_CLASSIFIER_THRESHOLD", DEFAULT_THRESHOLD),
+        )
+        text = "\n".join(preview)
+        truncated = len(text) > EXTRACTED_TEXT_PREVIEW_CHARS
+        # A long chat is read again only if Gemini has to see all of it.
+        analysis, triage = analyze_conversation(load_text if truncated else text, scores, provisional)
+        result = {
+            "extracted_text": text[:EXTRACTED_TEXT_PREVIEW_CHARS],
+            **_conversation_fields(analysis),
+            "message_scores": scores.to_json(),
+            "risk_aggregates": aggregate_scores(
+                scores, current_app.config.get("SCORE_WINDOW_MINUTES", DEFAULT_WINDOW_MINUTES)
+            ),
+        }
+        if truncated:
+            result["extracted_text_truncated"] = True
+        if triage:
+            result["triage"] = triage
+        if extracted_text.startswith("[Google Cloud Vision API error"):
+            result["ocr_error"] = extracted_text
+        if analysis.get("provisional"):
+            result["provisional"] = True
         return result
 
-    result["error"] = "Unsupported analysis type."
-    return result
+    return {"error": "Unsupported analysis type."}
 
 
-def read_text_file(file_path):
-    for encoding in ("utf-8", "cp949"):
-        try:
-            return Path(file_path).read_text(encoding=encoding)
-        except UnicodeDecodeError:
-            continue
-    return Path(file_path).read_text(encoding="utf-8", errors="replace")
+def _conversation_fields(analysis):
+    """Result fields that come from a conversation analysis, offline or Gemini."""
+    fields = {
+        "cyberbullying_findings": analysis["findings"],
+        "cyberbullying_summary": analysis["summary"],
+        "cyberbullying_risk_line": analysis["summary"]["overall_risk"],
+    }
+    if "keyword_matches" in analysis:
+        fields["keyword_matches"] = analysis["keyword_matches"]
+    if analysis.get("error"):
+        fields["provider_error"] = analysis["error"]
+    return fields
+
+
+def complete_provisional_analysis(result):
+    """Run the Gemini analysis a provisional result deferred and return the final result.
+
+    Like ``analyze_file``, the final analysis comes from the result cache when
+    the same evidence was already upgraded, and concurrent upgrades of one
+    chat share a single Gemini call. The upgraded analysis is stored in the
+    result cache, so the next upload of the same evidence gets it at once.
+    """
+    if not result.get("provisional"):
+        return result
+    final = {
+        key: value
+        for key, value in result.items()
+        if key not in ("provisional", "keyword_matches", "provider_error", "result_cache", "single_flight")
+    }
+    cache = get_result_cache()
+    cache_key = _result_cache_key(result["sha256"], "cyberbullying", result["file_info"]["type"])
+    cached = cache.get(cache_key) if cache else None
+    if cached is not None:
+        final.update(cached)
+        final["result_cache"] = "hit"
+        return final
+
+    def analyze():
+        text = result["extracted_text"]
+        if result.get("extracted_text_truncated"):
+            text = read_chat_export(result["file_path"])
+        analysis = {key: final[key] for key in _CONVERSATION_RESULT_KEYS if key in final}
+        analysis.update(_conversation_fields(analyze_text_with_gemini(text)))
+        if cache and _is_cacheable(analysis):
+            cache.set(cache_key, analysis)
+        return analysis
+
+    flight = get_single_flight()
+    if flight is None:
+        final.update(analyze())
+        return final
+    analysis, shared = flight.run(cache_key, analyze)
+    final.update(analysis)
+    if shared:
+        final["single_flight"] = "shared"
+    return final
+
+
+def _run_stages(stages, timeouts, max_workers=None):
+    """Run independent analysis stages concurrently and collect results by name.
+
+    ``stages`` maps a name to ``(callable, *args)``. Each stage may take up to
+    ``timeouts[name]`` seconds measured from the common start, so the total wait
+    is the slowest stage rather than the sum. A stage that raises or times out
+    maps to its exception instead of a value. ``max_workers`` bounds how many
+    stages run at once; queued stages share the same deadline. Timeouts are
+    also capped by the request deadline, which the stages inherit.
+    """
+    app = current_app._get_current_object()
+    deadline = current_deadline()
+
+    def call(func, *args):
+        with app.app_context():
+            return func(*args)
+
+    executor = ThreadPoolExecutor(max_workers=min(len(stages), max_workers or len(stages)))
+    started = time.monotonic()
+    # Each stage runs in a copy of this context so it sees the same request deadline.
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, call, *spec) for name, spec in stages.items()
+    }
+    results = {}
+    try:
+        for name, future in futures.items():
+            remaining = max(0.0, timeouts[name] - (time.monotonic() - started))
+            if deadline is not None:
+                remaining = min(remaining, deadline.remaining())
+            try:
+                results[name] = future.result(timeout=remaining)
+            except Exception as exc:
+                if isinstance(exc, TimeoutError) and deadline is not None and deadline.expired():
+                    exc = DeadlineExceeded("Request deadline exceeded.")
+                results[name] = exc
+    finally:
+        # Do not wait for a stage that overran its timeout.
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def _describe_stage_failure(exc):
+    if isinstance(exc, DeadlineExceeded):
+        return "request deadline exceeded"
+    if isinstance(exc, TimeoutError):
+        return "timed out"
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _stage_value(value, label):
+    if isinstance(value, BaseException):
+        status = "timeout" if isinstance(value, TimeoutError) else "error"
+        return {"status": status, "error": f"{label} failed: {_describe_stage_failure(value)}"}
+    return value
+
+
+def _call_provider(provider, func, *args, **kwargs):
+    """Call a provider through its circuit breaker, with retries for transient errors."""
+    breaker = get_circuit_breaker()
+    if breaker is None:
+        return func(*args, **kwargs)
+    return breaker.call(provider, func, *args, **kwargs)
+
+
+def _provider_fingerprint(analysis_type, file_extension):
+    """Describe which providers, models and prompts would produce a result."""
+    vision_enabled = bool(
+        os.environ.get("GOOGLE_SERVICE_ACCOUNT_JSON") or current_app.config.get("GOOGLE_APPLICATION_CREDENTIALS")
+    )
+    ocr = "vision" if vision_enabled and file_extension in {"png", "jpg", "jpeg"} else "none"
+    if analysis_type == "deepfake":
+        sightengine_enabled = bool(
+            current_app.config.get("SIGHTENGINE_API_USER") and current_app.config.get("SIGHTENGINE_API_SECRET")
+        )
+        detector = f"sightengine:{SIGHTENGINE_MODELS}" if sightengine_enabled else "none"
+        return f"{detector}|ocr:{ocr}"
+    if analysis_type == "cyberbullying":
+        if _gemini_api_key():
+            window_tokens = current_app.config.get("GEMINI_WINDOW_TOKENS", DEFAULT_WINDOW_TOKENS)
+            analyzer = f"gemini:{GEMINI_MODEL}:{CYBERBULLYING_PROMPT_VERSION}:w{window_tokens}"
+            if current_app.config.get("TRIAGE_ENABLED", True):
+                min_signals = current_app.config.get("TRIAGE_MIN_SIGNALS", TRIAGE_MIN_SIGNALS)
+                analyzer += f"|triage:offline:{FALLBACK_ANALYZER_VERSION}:{min_signals}"
+                classifier = _triage_classifier()
+                if classifier is not None:
+                    threshold = current_app.config.get("TEXT_CLASSIFIER_THRESHOLD", DEFAULT_THRESHOLD)
+                    analyzer += f"+{classifier.version}:{threshold}"
+        else:
+            analyzer = f"offline:{FALLBACK_ANALYZER_VERSION}"
+        classifier = _triage_classifier()
+        scorer = classifier.version if classifier is not None else "keywords"
+        window = current_app.config.get("SCORE_WINDOW_MINUTES", DEFAULT_WINDOW_MINUTES)
+        return f"{analyzer}|scores:{MESSAGE_SCORES_VERSION}:{scorer}:{window}|ocr:{ocr}"
+    return "none"
+
+
+def _result_cache_key(sha256, analysis_type, file_extension):
+    return "|".join([sha256, analysis_type, file_extension, _provider_fingerprint(analysis_type, file_extension)])
+
+
+def _is_cacheable(analysis):
+    """Only final, successful provider results are reused; failures are retried next time."""
+    if any(key in analysis for key in ("error", "ocr_error", "provider_error", "provisional")):
+        return False
+    return not any(isinstance(value, dict) and value.get("error") for value in analysis.values())
+
+
+def _chat_records(messages, preview=None):
+    """Yield ``(line, datetime)`` per parsed message, one ``speaker: text`` line each.
+
+    Lines are appended to ``preview`` until their joined text is longer than
+    ``EXTRACTED_TEXT_PREVIEW_CHARS``, so a cut transcript is recognisable by its length.
+    """
+    length = -1  # No separator before the first line.
+    for message in messages:
+        line = format_message(message)
+        if preview is not None and length <= EXTRACTED_TEXT_PREVIEW_CHARS:
+            preview.append(line)
+            length += len(line) + 1
+        yield line, message_datetime(message)
+
+
+def read_chat_export(file_path):
+    """Parse a chat export into ``speaker: text`` lines, streaming the file once."""
+    return "\n".join(line for line, _ in _chat_records(iter_chat_messages(iter_text_lines(file_path))))
 
 
 def analyze_image_with_sightengine(file_path):
@@ -135,16 +486,25 @@ def analyze_image_with_sightengine(file_path):
         }
 
     params = {
-        "models": "deepfake,scam,gore",
+        "models": SIGHTENGINE_MODELS,
         "api_user": api_user,
         "api_secret": api_secret,
     }
     url = "https://api.sightengine.com/1.0/check.json"
 
     with open(file_path, "rb") as media:
-        response = requests.post(url, files={"media": media}, data=params, timeout=30)
-    response.raise_for_status()
-    return response.json()
+        content = media.read()
+
+    def post():
+        response = get_provider_clients().http_session().post(
+            url, files={"media": content}, data=params, timeout=budget(SIGHTENGINE_TIMEOUT_SECONDS)
+        )
+        response.raise_for_status()
+        return response.json()
+
+    result = _call_provider("sightengine", post)
+    report_progress("deepfake_scored", deepfake=result.get("type", {}).get("deepfake"))
+    return result
 
 
 def extract_text_from_image(image_path):
@@ -152,24 +512,19 @@ def extract_text_from_image(image_path):
     credentials_path = current_app.config["GOOGLE_APPLICATION_CREDENTIALS"]
 
     try:
-        if service_account_info:
-            from google.oauth2 import service_account
-
-            credentials = service_account.Credentials.from_service_account_info(
-                json.loads(service_account_info)
-            )
-            client = vision.ImageAnnotatorClient(credentials=credentials)
-        elif credentials_path and os.path.exists(credentials_path):
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-            client = vision.ImageAnnotatorClient()
-        else:
+        client = get_provider_clients().vision_client(service_account_info, credentials_path)
+        if client is None:
             return "[Google Cloud credentials are not configured.]"
 
         with open(image_path, "rb") as image_file:
-            image = vision.Image(content=image_file.read())
-        response = client.text_detection(image=image)
+            image = vision_image(image_file.read())
+        response = _call_provider(
+            "vision", lambda: client.text_detection(image=image, timeout=budget(VISION_TIMEOUT_SECONDS))
+        )
         texts = response.text_annotations
-        return texts[0].description.strip() if texts else ""
+        text = texts[0].description.strip() if texts else ""
+        report_progress("ocr_done", characters=len(text))
+        return text
     except Exception as exc:
         return f"[Google Cloud Vision API error: {exc}]"
 
@@ -178,143 +533,331 @@ def _preprocess_kakao_chat_text(raw_text: str) -> str:
     """Normalize OCR chat text into one speaker/content line per message."""
     if not raw_text:
         return ""
+    return "\n".join(line for line, _ in _chat_records(iter_chat_messages(raw_text.splitlines())))
 
-    time_pattern = re.compile(r"^(?:AM|PM|am|pm)?\s?\d{1,2}:\d{2}$")
-    date_time_pattern = re.compile(
-        r"^\d{4}[./-]\s?\d{1,2}[./-]\s?\d{1,2}"
-        r"(?:\s+(?:AM|PM|am|pm)?\s?\d{1,2}:\d{2})?$"
+
+def _gemini_api_key():
+    api_key = os.environ.get("GOOGLE_GEMINI_API_KEY") or current_app.config.get("GOOGLE_GEMINI_API_KEY")
+    if not api_key or api_key.lower().startswith("your_"):
+        return ""
+    return api_key
+
+
+CYBERBULLYING_FINDING_FIELDS = ("sentence", "type", "victim", "offender", "risk", "explanation")
+CYBERBULLYING_RISK_LEVELS = ("none", "low", "medium", "high", "severe")
+CYBERBULLYING_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "findings": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    **{field: {"type": "STRING"} for field in CYBERBULLYING_FINDING_FIELDS},
+                    "risk": {"type": "STRING", "enum": list(CYBERBULLYING_RISK_LEVELS)},
+                },
+                "required": list(CYBERBULLYING_FINDING_FIELDS),
+            },
+        },
+        "overall_risk": {"type": "STRING", "enum": list(CYBERBULLYING_RISK_LEVELS)},
+        "atmosphere": {"type": "STRING"},
+        "potential_risks": {"type": "STRING"},
+    },
+    "required": ["findings", "overall_risk", "atmosphere", "potential_risks"],
+}
+
+
+def _gemini_window_prompt(window):
+    prompt = (
+        "Analyze the following conversation for cyberbullying risk. "
+        "Add one finding per message that shows risk, with the sentence quoted exactly, "
+        "its type, victim, offender, risk level and a short explanation. "
+        "Then give the overall risk, the atmosphere and the potential risks.\n\n"
     )
-    possible_name_pattern = re.compile(r"^[\w가-힣]{1,16}$")
+    if window.context:
+        prompt += (
+            "Earlier messages, for context only (do not add findings for them):\n"
+            + "\n".join(window.context)
+            + "\n\nMessages to analyze:\n"
+        )
+    return prompt + "\n".join(window.lines)
+
+
+def _parse_gemini_analysis(text):
+    """Validate a JSON-mode Gemini response into ``{"findings", "summary"}``; raise ValueError otherwise."""
+    payload = json.loads(text or "")
+    if not isinstance(payload, dict) or not isinstance(payload.get("findings"), list):
+        raise ValueError("Gemini response does not match the analysis schema.")
+    overall_risk = str(payload.get("overall_risk", "")).strip().lower()
+    if overall_risk not in CYBERBULLYING_RISK_LEVELS:
+        raise ValueError(f"Gemini returned an unknown overall risk: {overall_risk!r}")
+
+    findings = []
+    for item in payload["findings"]:
+        if not isinstance(item, dict) or not str(item.get("sentence", "")).strip():
+            raise ValueError("Gemini returned a finding without a sentence.")
+        findings.append({field: str(item.get(field) or "-").strip() for field in CYBERBULLYING_FINDING_FIELDS})
+    return {
+        "findings": findings,
+        "summary": {
+            "overall_risk": overall_risk,
+            "atmosphere": str(payload.get("atmosphere") or "").strip(),
+            "potential_risks": str(payload.get("potential_risks") or "").strip(),
+        },
+    }
 
-    processed = []
-    pending_speaker = None
-    for raw_line in raw_text.splitlines():
-        line = re.sub(r"\s+", " ", raw_line.strip())
-        if not line or time_pattern.match(line) or date_time_pattern.match(line):
-            continue
-        if line.lower() in {"photo", "image"}:
-            continue
 
-        if ":" in line and not line.endswith(":"):
-            speaker, content = [part.strip() for part in line.split(":", 1)]
-            processed.append(f"{speaker or '-'}: {content}")
-            pending_speaker = None
-            continue
+def _analyze_gemini_window(api_key, window):
+    client = get_provider_clients().gemini_client(api_key)
+    limit = current_app.config.get("GEMINI_TIMEOUT_SECONDS", GEMINI_TIMEOUT_SECONDS)
 
-        if possible_name_pattern.match(line):
-            pending_speaker = line
-            continue
+    def generate():
+        # Each retry gets the budget left at the time it starts.
+        return client.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=_gemini_window_prompt(window),
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": CYBERBULLYING_RESPONSE_SCHEMA,
+                "http_options": {"timeout": int(budget(limit) * 1000)},
+            },
+        )
 
-        if pending_speaker:
-            processed.append(f"{pending_speaker}: {line}")
-            pending_speaker = None
-        else:
-            processed.append(f"-: {line}")
+    return _parse_gemini_analysis(_call_provider("gemini", generate).text)
+
+
+def _triage_classifier():
+    """Return the offline message classifier, or ``None`` when it is disabled or cannot be loaded."""
+    if not current_app.config.get("TEXT_CLASSIFIER_ENABLED", True):
+        return None
+    try:
+        return load_classifier(current_app.config.get("TEXT_CLASSIFIER_PATH") or DEFAULT_MODEL_PATH)
+    except (ImportError, OSError, ValueError, KeyError):
+        return None
+
+
+def analyze_conversation(text_content, scores=None, provisional=False):
+    """Triage a conversation offline and only send risky ones to Gemini.
+
+    The keyword analyzer and the local message classifier run first. A
+    message is a risk signal when it has a keyword hit or a classifier score
+    of at least ``TEXT_CLASSIFIER_THRESHOLD``. Conversations with at least
+    ``TRIAGE_MIN_SIGNALS`` signals are escalated to ``analyze_text_with_gemini``;
+    the rest keep the offline result. ``scores`` are the conversation's
+    ``MessageScores`` when the caller already computed them. Returns
+    ``(analysis, triage)`` where ``triage`` records the decision, or is
+    ``None`` when no cascade applies (no Gemini key, or triage disabled).
+    With ``provisional`` a conversation that needs Gemini gets the offline
+    analysis marked ``provisional`` instead of waiting for Gemini.
+    ``text_content`` may also be a function returning the conversation, so a
+    long chat is only loaded when Gemini needs all of it.
+    """
+    if callable(text_content):
+        load_text = text_content
+    else:
 
-    return "\n".join(processed)
+        def load_text():
+            return text_content
+
+    config = current_app.config
+    gemini = bool(_gemini_api_key())
+    triage_enabled = config.get("TRIAGE_ENABLED", True)
+    if gemini and not triage_enabled and not provisional:
+        return analyze_text_with_gemini(load_text()), None
+
+    started = time.monotonic()
+    if scores is None:
+        scores = score_messages(
+            load_text().splitlines(),
+            classifier=_triage_classifier() if gemini and triage_enabled else None,
+            threshold=config.get("TEXT_CLASSIFIER_THRESHOLD", DEFAULT_THRESHOLD),
+        )
+    # The keyword hits were found while scoring, so the lexicon is not matched a second time.
+    offline = _keyword_findings(scores.keyword_hits)
+    if not gemini:
+        return dict(offline, fallback_used=True), None
+    if not triage_enabled:
+        return dict(offline, provisional=True), None
+    min_signals = config.get("TRIAGE_MIN_SIGNALS", TRIAGE_MIN_SIGNALS)
+    keyword_hits = scores.category > 0
+    signals = int(scores.flagged().sum())
+    triage = {"analyzer": f"offline:{FALLBACK_ANALYZER_VERSION}", "keyword_signals": int(keyword_hits.sum())}
+    if scores.scorer != "keywords":
+        triage["analyzer"] += f"+{scores.scorer}"
+        triage["classifier_signals"] = int((scores.score >= scores.threshold).sum())
+    triage.update(
+        {
+            "risk_signals": signals,
+            "min_signals": min_signals,
+            "offline_ms": round((time.monotonic() - started) * 1000, 2),
+        }
+    )
+    if signals >= min_signals:
+        triage["decision"] = "escalated"
+        if provisional:
+            return dict(offline, provisional=True), triage
+        return analyze_text_with_gemini(load_text()), triage
+    triage["decision"] = "resolved_offline"
+    return offline, triage
 
 
 def analyze_text_with_gemini(text_content):
-    api_key = os.environ.get("GOOGLE_GEMINI_API_KEY") or current_app.config.get("GOOGLE_GEMINI_API_KEY")
-    if not api_key or api_key.lower().startswith("your_"):
+    """Analyze a conversation with Gemini, one token-bounded window at a time.
+
+    Windows run concurrently (at most ``GEMINI_MAX_CONCURRENCY`` at once) and
+    their findings and summaries are merged in window order. A window whose
+    call fails or returns an invalid response is covered by the keyword
+    fallback instead of failing the whole conversation. Returns
+    ``{"findings": [...], "summary": {...}}`` plus fallback/error details.
+    """
+    api_key = _gemini_api_key()
+    if not api_key:
         return _fallback_cyberbullying_analysis(text_content)
+    deadline = current_deadline()
+    if deadline is not None and deadline.expired():
+        fallback = _fallback_cyberbullying_analysis(text_content)
+        fallback["error"] = "Gemini skipped: request deadline exceeded"
+        return fallback
 
-    prompt = (
-        "Analyze the following conversation for cyberbullying risk. "
-        "Return a Markdown table with columns: sentence, type, victim, offender, risk, explanation. "
-        "Then return summary labels: overall risk, atmosphere, potential risks.\n\n"
-        f"{text_content}"
+    config = current_app.config
+    windows = split_conversation_windows(
+        text_content.splitlines(),
+        config.get("GEMINI_WINDOW_TOKENS", DEFAULT_WINDOW_TOKENS),
+        config.get("GEMINI_WINDOW_OVERLAP_MESSAGES", DEFAULT_OVERLAP_MESSAGES),
+    ) or [ConversationWindow(0, [], [])]
+    timeout = config.get("GEMINI_TIMEOUT_SECONDS", GEMINI_TIMEOUT_SECONDS)
+    finished = itertools.count(1)
+
+    def analyze_window(window):
+        try:
+            return _analyze_gemini_window(api_key, window)
+        finally:
+            report_progress("llm_window_done", done=next(finished), total=len(windows))
+
+    stages = _run_stages(
+        {index: (analyze_window, window) for index, window in enumerate(windows)},
+        dict.fromkeys(range(len(windows)), timeout),
+        max_workers=config.get("GEMINI_MAX_CONCURRENCY", GEMINI_MAX_CONCURRENCY),
     )
+    results = [stages[index] for index in range(len(windows))]
+    failures = [result for result in results if isinstance(result, BaseException)]
 
-    try:
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
-        text = (response.text or "").strip()
-        table_lines = [line for line in text.splitlines() if line.strip().startswith("|")]
-        summary_lines = [line for line in text.splitlines() if not line.strip().startswith("|")]
-        return {
-            "table": convert_markdown_table_to_html("\n".join(table_lines)),
-            "summary": "\n".join(summary_lines).strip(),
-        }
-    except Exception as exc:
+    if len(failures) == len(results):
         fallback = _fallback_cyberbullying_analysis(text_content)
         fallback["fallback_used"] = True
-        fallback["error"] = f"{type(exc).__name__}: {exc}"
+        fallback["error"] = _describe_stage_failure(failures[0])
         return fallback
+    if len(results) == 1:
+        return results[0]
+    return _merge_window_results(windows, results)
+
+
+def _quoted_lines(window, sentence):
+    """Return the conversation line indexes ``sentence`` quotes, with or without the ``speaker:`` prefix.
+
+    Lines the window analyzes come before its context lines.
+    """
+    key = " ".join(sentence.split())
+    first_context = window.start - len(window.context)
+    candidates = [(window.start + offset, line) for offset, line in enumerate(window.lines)]
+    candidates += [(first_context + offset, line) for offset, line in enumerate(window.context)]
+    return [
+        index
+        for index, line in candidates
+        if key in (" ".join(line.split()), " ".join(line.split(":", 1)[-1].split()))
+    ]
 
 
-def _fallback_cyberbullying_analysis(text_content):
-    normalized = _preprocess_kakao_chat_text(text_content)
-    rows = [
-        ["sentence", "type", "victim", "offender", "risk", "explanation"],
-    ]
+def _merge_window_results(windows, results):
+    """Combine per-window results into one analysis; overall risk is the highest."""
+    findings = []
+    claimed = set()
+    keyword_matches = []
+    risks, atmospheres, potential_risks = [], [], []
+    failures = []
+    for window, result in zip(windows, results):
+        if isinstance(result, BaseException):
+            failures.append(result)
+            result = _keyword_analysis(window.lines, line_offset=window.start)
+            keyword_matches.extend(result["keyword_matches"])
+        for finding in result["findings"]:
+            # Overlapping context sometimes gets analyzed again, so each line keeps its first verdict.
+            # Repeated messages are separate lines, and each keeps its own finding.
+            quoted = _quoted_lines(window, finding["sentence"])
+            if quoted:
+                line = next((index for index in quoted if index not in claimed), None)
+                if line is None:
+                    continue
+                claimed.add(line)
+            findings.append(finding)
+        summary = result["summary"]
+        risks.append(summary["overall_risk"])
+        for values, text in ((atmospheres, summary["atmosphere"]), (potential_risks, summary["potential_risks"])):
+            if text and text not in values:
+                values.append(text)
+
+    merged = {
+        "findings": findings,
+        "summary": {
+            "overall_risk": highest_risk(risks) or "none",
+            "atmosphere": " / ".join(atmospheres),
+            "potential_risks": " / ".join(potential_risks),
+        },
+        "analysis_windows": len(windows),
+    }
+    if failures:
+        merged["fallback_used"] = True
+        merged["keyword_matches"] = keyword_matches
+        merged["error"] = (
+            f"{len(failures)} of {len(windows)} Gemini windows failed: {_describe_stage_failure(failures[0])}"
+        )
+    return merged
+
+
+def _keyword_analysis(lines, line_offset=0):
+    """Run the keyword analyzer over ``speaker: text`` lines."""
+    return _keyword_findings(score_messages(lines).keyword_hits, line_offset)
+
+
+def _keyword_findings(keyword_hits, line_offset=0):
+    """Build the keyword analysis from ``MessageScores.keyword_hits``; only flagged messages become findings."""
+    levels = {category: (risk, explanation) for category, risk, explanation in CATEGORIES}
+    findings = []
+    keyword_matches = []
     risk_count = 0
     severe_count = 0
 
-    severe_keywords = {
-        "kill",
-        "die",
-        "destroy",
-        "threat",
-        "\uc8fd\uc5b4",
-        "\uc8fd\uc778\ub2e4",
-        "\ud611\ubc15",
-        "\ub54c\ub9b0\ub2e4",
-    }
-    insult_keywords = {
-        "stupid",
-        "idiot",
-        "ugly",
-        "hate",
-        "trash",
-        "\ubc14\ubcf4",
-        "\uba4d\uccad",
-        "\ubabb\uc0dd\uacbc",
-        "\uc2eb\uc5b4",
-        "\uaebc\uc838",
-    }
-    exclusion_keywords = {
-        "ignore",
-        "exclude",
-        "leave out",
-        "\ub530\ub3cc",
-        "\ube7c",
-        "\ub07c\uc9c0\ub9c8",
-        "\ubb34\uc2dc",
-    }
-
-    for line in normalized.splitlines():
-        if not line.strip():
-            continue
-        speaker, content = ("-", line)
-        if ":" in line:
-            speaker, content = [part.strip() for part in line.split(":", 1)]
-
-        lowered = content.lower()
-        risk = "none"
-        kind = "-"
-        explanation = "No keyword risk detected."
-
-        if any(word in lowered for word in severe_keywords):
-            risk = "severe"
-            kind = "threat"
-            explanation = "Threat or severe harm keyword detected."
-            risk_count += 1
+    for line, speaker, content, category, matches in keyword_hits:
+        risk, explanation = levels[category]
+        risk_count += 1
+        if risk == "severe":
             severe_count += 1
-        elif any(word in lowered for word in insult_keywords):
-            risk = "medium"
-            kind = "insult"
-            explanation = "Insult or degrading keyword detected."
-            risk_count += 1
-        elif any(word in lowered for word in exclusion_keywords):
-            risk = "low"
-            kind = "exclusion"
-            explanation = "Exclusion-related keyword detected."
-            risk_count += 1
-
-        rows.append([f"{speaker}: {content}", kind, "-", speaker or "-", risk, explanation])
-
-    markdown = "\n".join("| " + " | ".join(row) + " |" for row in rows)
+        for start, end, term, match_category in matches:
+            keyword_matches.append(
+                {
+                    "line": line + line_offset,
+                    "speaker": speaker,
+                    "start": start,
+                    "end": end,
+                    "term": term,
+                    "category": match_category,
+                }
+            )
+
+        # Spans are relative to the message, so shift them past the "speaker: " prefix.
+        prefix = f"{speaker}: "
+        findings.append(
+            {
+                "sentence": prefix + content,
+                "type": category,
+                "victim": "-",
+                "offender": speaker or "-",
+                "risk": risk,
+                "explanation": explanation,
+                "spans": [[start + len(prefix), end + len(prefix)] for start, end in merge_spans(matches)],
+            }
+        )
+
     if severe_count:
         overall = "severe"
     elif risk_count:
@@ -322,35 +865,60 @@ def _fallback_cyberbullying_analysis(text_content):
     else:
         overall = "none"
 
-    summary = (
-        f"overall risk: {overall}\n"
-        f"atmosphere: fallback keyword analysis found {risk_count} risk signal(s).\n"
-        "potential risks: Human review is required before any real-world action."
-    )
     return {
-        "table": convert_markdown_table_to_html(markdown),
-        "summary": summary,
-        "fallback_used": True,
+        "findings": findings,
+        "summary": {
+            "overall_risk": overall,
+            "atmosphere": f"fallback keyword analysis found {risk_count} risk signal(s).",
+            "potential_risks": "Human review is required before any real-world action.",
+        },
+        "keyword_matches": keyword_matches,
     }
 
 
-def extract_risk_line(summary):
-    match = re.search(r"overall risk\s*:\s*([^\n\r]*)", summary or "", re.IGNORECASE)
-    return match.group(1).strip() if match else None
+def _fallback_cyberbullying_analysis(text_content):
+    # Conversations reach the analyzers already normalized into "speaker: text" lines.
+    analysis = _keyword_analysis(text_content.splitlines())
+    analysis["fallback_used"] = True
+    return analysis
 
 
-def extract_conversation_atmosphere(summary):
-    match = re.search(r"atmosphere\s*:\s*(.*?)(?=\n\s*potential risks\s*:|$)", summary or "", re.I | re.S)
-    if match:
-        return re.sub(r"\s+", " ", match.group(1)).strip()
-    return "Analysis pending."
+def findings_table_html(findings):
+    """Render analysis findings as the report table, highlighting matched keyword spans."""
+    if not findings:
+        return "<p>No analysis result.</p>"
+    rows = [[escape(field) for field in CYBERBULLYING_FINDING_FIELDS]]
+    for finding in findings:
+        sentence = str(finding.get("sentence", ""))
+        rows.append(
+            [highlight_spans(sentence, [tuple(span) for span in finding.get("spans", ())])]
+            + [escape(str(finding.get(field, "-"))) for field in CYBERBULLYING_FINDING_FIELDS[1:]]
+        )
+    return _html_table(rows)
+
+
+def summary_text(summary):
+    """Render summary fields as the ``overall risk / atmosphere / potential risks`` lines."""
+    return (
+        f"overall risk: {summary.get('overall_risk', '')}\n"
+        f"atmosphere: {summary.get('atmosphere') or 'Analysis pending.'}\n"
+        f"potential risks: {summary.get('potential_risks') or 'Analysis pending.'}"
+    )
 
 
-def extract_potential_risks(summary):
-    match = re.search(r"potential risks\s*:\s*(.*)", summary or "", re.I | re.S)
-    if match:
-        return re.sub(r"\s+", " ", match.group(1)).strip()
-    return "Analysis pending."
+def cyberbullying_table_html(analysis_result):
+    """Return the analysis table for a stored result, built from findings at render time."""
+    if "cyberbullying_findings" in analysis_result:
+        return findings_table_html(analysis_result["cyberbullying_findings"])
+    # Results stored before findings were kept as data carry pre-rendered HTML or a pipe table.
+    table = str(analysis_result.get("cyberbullying_analysis") or "")
+    return table if table.startswith("<table") else pipe_table_to_html(table)
+
+
+def cyberbullying_summary_text(analysis_result):
+    if "cyberbullying_summary" in analysis_result:
+        return summary_text(analysis_result["cyberbullying_summary"])
+    return str(analysis_result.get("cyberbullying_analysis_summary") or analysis_result.get("summary") or "")
 
 
 def pipe_table_to_html(text):
@@ -359,13 +927,38 @@ def pipe_table_to_html(text):
     return convert_markdown_table_to_html(text)
 
 
-def generate_pdf_report(analysis_result, pdf_path, analysis_type=None):
+def report_stylesheet():
+    return report_font_face_css() + "\n" + REPORT_STYLESHEET
+
+
+def resolve_pdf_backend(analysis_type, requested=None):
+    """Pick the PDF backend: an explicit request, else ``PDF_BACKEND`` from config.
+
+    ``auto`` uses the fpdf2 backend for text-only cyberbullying reports and
+    WeasyPrint for everything else.
+    """
+    backend = requested
+    if not backend:
+        backend = current_app.config.get("PDF_BACKEND", "weasyprint") if has_app_context() else "weasyprint"
+    if backend == "auto":
+        backend = "fpdf" if analysis_type == "cyberbullying" else "weasyprint"
+    if backend not in PDF_BACKENDS:
+        raise ValueError("Unsupported PDF backend.")
+    return backend
+
+
+def generate_pdf_report(analysis_result, pdf_path, analysis_type=None, backend=None):
+    backend = resolve_pdf_backend(analysis_type or analysis_result.get("analysis_type"), backend)
+    if backend == "fpdf":
+        from .fpdf_report import generate_fpdf_report
+
+        return generate_fpdf_report(analysis_result, pdf_path, analysis_type)
+
     html_content = generate_report_html(analysis_result, analysis_type, pdf_path)
-    HTML(string=html_content).write_pdf(pdf_path)
-    return pdf_path
+    return render_pdf(html_content, pdf_path, report_stylesheet())
 
 
-def generate_image_html(original_image_path, analysis_result, original_file):
+def _evidence_image_path(analysis_result, original_image_path=""):
     image_path = (
         analysis_result.get("file_path")
         or analysis_result.get("uploaded_file_path")
@@ -374,15 +967,35 @@ def generate_image_html(original_image_path, analysis_result, original_file):
     )
     if not image_path or not os.path.exists(image_path):
         return ""
+    if Path(image_path).suffix.lower() not in {".png", ".jpg", ".jpeg"}:
+        return ""
+    return image_path
+
+
+def generate_image_html(original_image_path, analysis_result, original_file):
+    image_path = _evidence_image_path(analysis_result, original_image_path)
+    if not image_path:
+        return ""
 
-    suffix = Path(image_path).suffix.lower().lstrip(".") or "png"
-    with open(image_path, "rb") as image_file:
+    sha256 = analysis_result.get("sha256", "")
+    rendition_path = report_image_path(image_path, sha256)
+    suffix = Path(rendition_path).suffix.lower().lstrip(".")
+    mime_type = "jpeg" if suffix in {"jpg", "jpeg"} else suffix
+    with open(rendition_path, "rb") as image_file:
         encoded = base64.b64encode(image_file.read()).decode("ascii")
+    caption = ""
+    if rendition_path != image_path:
+        caption = (
+            '<p class="evidence-image-note">Downscaled copy for this report. '
+            f"The untouched original is {escape(str(original_file or Path(image_path).name))} "
+            f"(SHA-256 {escape(str(sha256))}).</p>"
+        )
     return (
         '<section class="evidence-image">'
         "<h2>Original Evidence Image</h2>"
         f'<img alt="{escape(str(original_file or "uploaded evidence"))}" '
-        f'src="data:image/{suffix};base64,{encoded}" />'
+        f'src="data:image/{mime_type};base64,{encoded}" />'
+        f"{caption}"
         "</section>"
     )
 
@@ -390,15 +1003,14 @@ def generate_image_html(original_image_path, analysis_result, original_file):
 def generate_report_html(analysis_result, analysis_type=None, pdf_path=None):
     analysis_type = analysis_type or analysis_result.get("analysis_type", "unknown")
     file_info = analysis_result.get("file_info", {})
-    summary = analysis_result.get("cyberbullying_analysis_summary") or analysis_result.get("summary") or ""
-    table = analysis_result.get("cyberbullying_analysis") or ""
+    summary = cyberbullying_summary_text(analysis_result)
     deepfake = analysis_result.get("deepfake_analysis")
 
     deepfake_html = ""
     if deepfake:
         deepfake_html = "<pre>" + escape(json.dumps(deepfake, ensure_ascii=False, indent=2)) + "</pre>"
 
-    table_html = table if table.startswith("<table") else pipe_table_to_html(str(table))
+    table_html = cyberbullying_table_html(analysis_result)
     image_html = generate_image_html(
         analysis_result.get("original_image_path", ""),
         analysis_result,
@@ -411,15 +1023,6 @@ def generate_report_html(analysis_result, analysis_type=None, pdf_path=None):
 <head>
   <meta charset="utf-8">
   <title>AnsimTalk Evidence Report</title>
-  <style>
-    body {{ font-family: Arial, sans-serif; line-height: 1.5; color: #1f2937; }}
-    h1, h2 {{ color: #111827; }}
-    table {{ border-collapse: collapse; width: 100%; margin: 12px 0; }}
-    th, td {{ border: 1px solid #d1d5db; padding: 6px; vertical-align: top; }}
-    th {{ background: #f3f4f6; }}
-    pre {{ white-space: pre-wrap; background: #f9fafb; padding: 12px; }}
-    img {{ max-width: 100%; height: auto; }}
-  </style>
 </head>
 <body>
   <h1>AnsimTalk Evidence Report</h1>
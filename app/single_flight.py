@@ -0,0 +1,154 @@
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+from .sqlite_store import SQLiteStore, get_app_store, serializer
+
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_WAIT_SECONDS = 300
+DEFAULT_SHARE_SECONDS = 30
+POLL_INTERVAL_SECONDS = 0.1
+
+
+class SingleFlight(SQLiteStore):
+    """Coalesce identical concurrent analyses across threads and worker processes.
+
+    The first caller for a key takes a lease in a local SQLite file and runs
+    the analysis. Other callers wait for it and reuse its result instead of
+    calling the providers again. Only callers that were already waiting get
+    the shared result, for up to ``share_seconds`` after it is published;
+    later callers rely on the result cache. If the leader fails, its lease
+    is dropped and a waiter takes over. If the leader dies, the lease expires
+    after ``lease_seconds``. A waiter gives up after ``wait_seconds`` and runs
+    the analysis itself.
+    """
+
+    autocommit = True
+
+    def __init__(
+        self,
+        path,
+        lease_seconds=DEFAULT_LEASE_SECONDS,
+        wait_seconds=DEFAULT_WAIT_SECONDS,
+        share_seconds=DEFAULT_SHARE_SECONDS,
+    ):
+        super().__init__(path)
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.share_seconds = share_seconds
+        self.owner = uuid.uuid4().hex
+        # Waiters in this process are woken as soon as a local leader finishes.
+        self._finished = {}
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS flights ("
+                " flight_key TEXT PRIMARY KEY,"
+                " owner TEXT NOT NULL,"
+                " lease_expires_at REAL NOT NULL,"
+                " payload TEXT,"
+                " finished_at REAL)"
+            )
+
+    def _claim(self, key, owner, waiting):
+        """Atomically take the lease for ``key`` or pick up the result a waiter was waiting for.
+
+        Returns ``("leader", None)``, ``("shared", value)`` or ``("wait", None)``.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT lease_expires_at, payload, finished_at FROM flights WHERE flight_key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[2] is None and row[0] >= now:
+                    state = "wait"
+                elif row is not None and row[2] is not None and waiting and row[2] >= now - self.share_seconds:
+                    state = "shared"
+                else:
+                    # A finished flight is only kept for the callers that waited on it; new callers start over.
+                    state = "leader"
+                    conn.execute(
+                        "INSERT OR REPLACE INTO flights (flight_key, owner, lease_expires_at, payload, finished_at)"
+                        " VALUES (?, ?, ?, NULL, NULL)",
+                        (key, owner, now + self.lease_seconds),
+                    )
+                    conn.execute("DELETE FROM flights WHERE finished_at < ?", (now - self.share_seconds,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return state, serializer.loads(row[1]) if state == "shared" else None
+
+    def _finish(self, key, owner, value=None, failed=False):
+        with self._connect() as conn:
+            if failed:
+                conn.execute("DELETE FROM flights WHERE flight_key = ? AND owner = ?", (key, owner))
+            else:
+                conn.execute(
+                    "UPDATE flights SET payload = ?, finished_at = ? WHERE flight_key = ? AND owner = ?",
+                    (serializer.dumps(value), time.time(), key, owner),
+                )
+        with self._lock:
+            event = self._finished.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def run(self, key, compute, wait_seconds=None):
+        """Return ``(value, shared)``: ``compute()``'s result, computed once among concurrent callers.
+
+        ``shared`` is ``True`` when the value was produced by another caller.
+        ``wait_seconds`` shortens how long this caller waits for a leader.
+        """
+        # Each call gets its own owner id so threads of one worker do not share a lease.
+        owner = f"{self.owner}:{uuid.uuid4().hex}"
+        wait_seconds = self.wait_seconds if wait_seconds is None else min(wait_seconds, self.wait_seconds)
+        deadline = time.monotonic() + wait_seconds
+        waiting = False
+        while True:
+            state, value = self._claim(key, owner, waiting)
+            if state == "shared":
+                return value, True
+            if state == "leader":
+                with self._lock:
+                    self._finished[key] = threading.Event()
+                break
+            if time.monotonic() >= deadline:
+                return compute(), False
+            waiting = True
+            with self._lock:
+                event = self._finished.get(key)
+            if event is None:
+                # The leader is in another worker process; poll the lease file.
+                time.sleep(POLL_INTERVAL_SECONDS)
+            else:
+                event.wait(POLL_INTERVAL_SECONDS)
+
+        try:
+            value = compute()
+        except BaseException:
+            self._finish(key, owner, failed=True)
+            raise
+        self._finish(key, owner, value)
+        return value, False
+
+
+def get_single_flight():
+    """Return the app's single-flight coordinator, or ``None`` when coalescing is disabled."""
+    app = current_app._get_current_object()
+    if not app.config.get("SINGLE_FLIGHT_ENABLED", True):
+        return None
+    return get_app_store(
+        "ansimtalk_single_flight",
+        "SINGLE_FLIGHT_PATH",
+        "single_flight.sqlite3",
+        lambda app, path: SingleFlight(
+            path,
+            lease_seconds=app.config.get("SINGLE_FLIGHT_LEASE_SECONDS", DEFAULT_LEASE_SECONDS),
+            wait_seconds=app.config.get("SINGLE_FLIGHT_WAIT_SECONDS", DEFAULT_WAIT_SECONDS),
+        ),
+    )
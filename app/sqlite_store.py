@@ -0,0 +1,54 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+from flask import current_app
+from flask.json.tag import TaggedJSONSerializer
+
+
+# Same serializer Flask uses for sessions, so bytes/tuples in image metadata round-trip.
+serializer = TaggedJSONSerializer()
+
+
+class SQLiteStore:
+    """Base for state kept in a local SQLite file in WAL mode.
+
+    A connection is opened per call so a store is safe to share between threads
+    and forked workers. Each ``_connect`` block runs in one transaction, unless
+    the subclass sets ``autocommit`` and issues ``BEGIN IMMEDIATE`` itself.
+    """
+
+    autocommit = False
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None if self.autocommit else "")
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            if self.autocommit:
+                yield conn
+            else:
+                with conn:
+                    yield conn
+        finally:
+            conn.close()
+
+
+def get_app_store(name, path_setting, filename, factory):
+    """Return ``app.extensions[name]``, creating it with ``factory(app, path)`` on first use.
+
+    ``path`` is the ``path_setting`` config value, or ``filename`` under ``tmp/``
+    in the working directory.
+    """
+    app = current_app._get_current_object()
+    store = app.extensions.get(name)
+    if store is None:
+        path = app.config.get(path_setting) or os.path.join(os.getcwd(), "tmp", filename)
+        store = factory(app, path)
+        app.extensions[name] = store
+    return store
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Report `python -X importtime` totals for importing the WSGI app from run.py."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+# Modules that should only load when a provider call or PDF render needs them.
+HEAVY_MODULES = ("google.genai", "google.cloud.vision", "grpc", "weasyprint", "fpdf", "fontTools", "numpy", "requests")
+PROBE = (
+    "import json, sys\n"
+    "from run import app\n"
+    f"heavy = {HEAVY_MODULES!r}\n"
+    "print(json.dumps(sorted(name for name in heavy if name in sys.modules)))\n"
+)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of run:app.")
+    parser.add_argument("--iterations", type=int, default=5, help="Fresh interpreter runs to average.")
+    parser.add_argument("--top", type=int, default=10, help="Modules with the largest self time to list.")
+    parser.add_argument("--output-json", help="Optional path for the JSON result.")
+    return parser.parse_args(argv)
+
+
+def parse_importtime(stderr: str) -> list[dict[str, Any]]:
+    """Parse `-X importtime` lines into ``{"module", "self_us", "cumulative_us", "depth"}`` rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append(
+            {
+                "module": name.strip(),
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": depth,
+            }
+        )
+    return rows
+
+
+def app_subtree(rows: list[dict[str, Any]]) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    """Return the ``run`` row and the rows it imported (importtime prints children first)."""
+    index = next(i for i, row in enumerate(rows) if row["module"] == "run" and row["depth"] == 0)
+    start = index
+    while start > 0 and rows[start - 1]["depth"] > 0:
+        start -= 1
+    return rows[index], rows[start:index]
+
+
+def measure_once() -> tuple[list[dict[str, Any]], list[str]]:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(completed.stderr), json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    totals = []
+    subtree: list[dict[str, Any]] = []
+    loaded: list[str] = []
+    for _ in range(args.iterations):
+        rows, loaded = measure_once()
+        run_row, subtree = app_subtree(rows)
+        totals.append(run_row["cumulative_us"] / 1000)
+
+    # Self time, so a slow leaf module is not hidden behind the packages that import it.
+    slowest = sorted(subtree, key=lambda row: row["self_us"], reverse=True)
+    return {
+        "schema": "ansimtalk_import_time_benchmark.v1",
+        "target": "run:app",
+        "iterations": args.iterations,
+        "mean_total_ms": round(statistics.mean(totals), 2),
+        "min_total_ms": round(min(totals), 2),
+        "slowest_modules": [
+            {"module": row["module"], "self_ms": round(row["self_us"] / 1000, 2)}
+            for row in slowest[: args.top]
+        ],
+        "heavy_modules_loaded": loaded,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    try:
+        payload = run_benchmark(args)
+    except (subprocess.CalledProcessError, StopIteration, ValueError) as exc:
+        detail = getattr(exc, "stderr", "") or str(exc)
+        print(json.dumps({"status": "FAIL", "error": detail[-2000:]}, ensure_ascii=False), file=sys.stderr)
+        return 1
+
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    if args.output_json:
+        output_path = Path(args.output_json)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Compare WeasyPrint and fpdf2 report rendering on a synthetic cyberbullying fixture."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+DEFAULT_FIXTURE = REPO_ROOT / "examples" / "fixtures" / "cyberbullying_sample.txt"
+BACKENDS = ("weasyprint", "fpdf")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the PDF report backends.")
+    parser.add_argument("--fixture", default=str(DEFAULT_FIXTURE), help="Synthetic .txt fixture path.")
+    parser.add_argument("--iterations", type=int, default=5, help="Timed renders per backend.")
+    parser.add_argument("--backend", action="append", choices=BACKENDS, help="Backend to run (repeatable).")
+    parser.add_argument("--output-json", help="Optional path for the JSON result.")
+    return parser.parse_args(argv)
+
+
+def force_offline_provider_mode() -> None:
+    for name in (
+        "GOOGLE_GEMINI_API_KEY",
+        "SIGHTENGINE_API_USER",
+        "SIGHTENGINE_API_SECRET",
+        "GOOGLE_CLOUD_VISION_API_KEY",
+        "GOOGLE_APPLICATION_CREDENTIALS",
+        "GOOGLE_SERVICE_ACCOUNT_JSON",
+    ):
+        os.environ.pop(name, None)
+
+
+def benchmark_backend(analysis: dict[str, Any], backend: str, iterations: int, output_dir: Path) -> dict[str, Any]:
+    from app.services import generate_pdf_report
+
+    pdf_path = output_dir / f"benchmark_{backend}.pdf"
+    # The first render pays one-off import and font setup costs; report it separately.
+    started = time.perf_counter()
+    generate_pdf_report(analysis, str(pdf_path), "cyberbullying", backend=backend)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        generate_pdf_report(analysis, str(pdf_path), "cyberbullying", backend=backend)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    # tracemalloc slows rendering down considerably, so memory gets its own untimed pass.
+    tracemalloc.start()
+    generate_pdf_report(analysis, str(pdf_path), "cyberbullying", backend=backend)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "backend": backend,
+        "first_render_ms": round(first_ms, 2),
+        "mean_ms": round(statistics.mean(timings), 2),
+        "min_ms": round(min(timings), 2),
+        "python_peak_kib": round(peak_bytes / 1024, 1),
+        "pdf_bytes": pdf_path.stat().st_size,
+    }
+
+
+def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    force_offline_provider_mode()
+
+    from app import create_app
+    from app.services import analyze_file
+
+    fixture_path = Path(args.fixture).resolve()
+    app = create_app()
+    app.config.update(PDF_RENDERER="inline", RESULT_CACHE_ENABLED=False)
+    with app.app_context(), tempfile.TemporaryDirectory() as output_dir:
+        analysis = analyze_file(str(fixture_path), "cyberbullying", "txt")
+        results = [
+            benchmark_backend(analysis, backend, args.iterations, Path(output_dir))
+            for backend in (args.backend or BACKENDS)
+        ]
+
+    return {
+        "schema": "ansimtalk_pdf_backend_benchmark.v1",
+        "fixture": str(fixture_path),
+        "iterations": args.iterations,
+        "results": results,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    try:
+        payload = run_benchmark(args)
+    except Exception as exc:
+        print(json.dumps({"status": "FAIL", "error": str(exc)}, ensure_ascii=False), file=sys.stderr)
+        return 1
+
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    if args.output_json:
+        output_path = Path(args.output_json)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
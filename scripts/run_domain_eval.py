@@ -56,12 +56,12 @@ def load_cases(path: Path) -> list[dict[str, Any]]:
 
 
 def evaluate_case(case: dict[str, Any]) -> dict[str, Any]:
-    from app.services import analyze_text_with_gemini, extract_risk_line
+    from app.services import analyze_text_with_gemini, summary_text
 
     analysis = analyze_text_with_gemini(str(case.get("input_text", "")))
-    table = str(analysis.get("table", ""))
-    summary = str(analysis.get("summary", ""))
-    actual_risk = extract_risk_line(summary)
+    table = json.dumps(analysis.get("findings", []), ensure_ascii=False)
+    summary = summary_text(analysis.get("summary", {}))
+    actual_risk = analysis.get("summary", {}).get("overall_risk")
     expected_risk = str(case.get("expected_overall_risk", "")).strip()
     expected_terms = [str(term) for term in case.get("expected_risk_terms", [])]
     combined_output = table + "\n" + summary
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Train AnsimTalk's offline message classifier from domain eval style cases."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+DEFAULT_TRAINING_CASES = REPO_ROOT / "examples" / "evaluations" / "classifier_training_cases.json"
+DEFAULT_EVAL_CASES = REPO_ROOT / "examples" / "evaluations" / "domain_eval_cases.json"
+DEFAULT_OUTPUT = REPO_ROOT / "app" / "models" / "text_classifier.npz"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train the offline hashed n-gram message classifier.")
+    parser.add_argument(
+        "--cases",
+        action="append",
+        help="Training cases JSON path. Repeat to combine files. Defaults to the bundled synthetic cases.",
+    )
+    parser.add_argument("--eval-cases", default=str(DEFAULT_EVAL_CASES), help="Held-out cases JSON path.")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Serialized model path (.npz).")
+    parser.add_argument("--dimension-bits", type=int, default=18, help="Hash space size as a power of two.")
+    parser.add_argument("--epochs", type=int, default=300, help="Gradient descent epochs.")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Probability counted as harmful.")
+    return parser.parse_args(argv)
+
+
+def load_messages(path: Path) -> tuple[list[str], list[int]]:
+    """Split cases into messages labelled 1 when they contain an expected risk term."""
+    from app.kakao import iter_chat_messages
+    from scripts.run_domain_eval import load_cases
+
+    texts: list[str] = []
+    labels: list[int] = []
+    for case in load_cases(path):
+        terms = [str(term) for term in case.get("expected_risk_terms", [])]
+        for message in iter_chat_messages(str(case.get("input_text", "")).splitlines()):
+            texts.append(message["text"])
+            labels.append(int(any(term in message["text"] for term in terms)))
+    return texts, labels
+
+
+def score(classifier: Any, texts: list[str], labels: list[int], threshold: float) -> dict[str, Any]:
+    predicted = classifier.predict_proba(texts) >= threshold
+    true_positive = sum(1 for flag, label in zip(predicted, labels) if flag and label)
+    false_positive = sum(1 for flag, label in zip(predicted, labels) if flag and not label)
+    false_negative = sum(1 for flag, label in zip(predicted, labels) if not flag and label)
+    correct = sum(1 for flag, label in zip(predicted, labels) if bool(flag) == bool(label))
+    return {
+        "messages": len(texts),
+        "harmful": sum(labels),
+        "accuracy": round(correct / len(texts), 4) if texts else None,
+        "precision": round(true_positive / (true_positive + false_positive), 4) if true_positive + false_positive else None,
+        "recall": round(true_positive / (true_positive + false_negative), 4) if true_positive + false_negative else None,
+    }
+
+
+def train(args: argparse.Namespace) -> dict[str, Any]:
+    from app.classifier import train_classifier
+
+    texts: list[str] = []
+    labels: list[int] = []
+    case_paths = [Path(path).resolve() for path in args.cases or [DEFAULT_TRAINING_CASES]]
+    for path in case_paths:
+        case_texts, case_labels = load_messages(path)
+        texts.extend(case_texts)
+        labels.extend(case_labels)
+
+    started = time.perf_counter()
+    classifier = train_classifier(texts, labels, dimension=1 << args.dimension_bits, epochs=args.epochs)
+    training_seconds = time.perf_counter() - started
+
+    output_path = Path(args.output).resolve()
+    classifier.save(output_path)
+
+    eval_texts, eval_labels = load_messages(Path(args.eval_cases).resolve())
+    started = time.perf_counter()
+    classifier.predict_proba(eval_texts)
+    scoring_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "schema": "ansimtalk_text_classifier_training.v1",
+        "model": output_path.relative_to(REPO_ROOT).as_posix() if output_path.is_relative_to(REPO_ROOT) else str(output_path),
+        "version": classifier.version,
+        "dimension": classifier.dimension,
+        "ngram_range": list(classifier.ngram_range),
+        "epochs": args.epochs,
+        "training_seconds": round(training_seconds, 3),
+        "training": score(classifier, texts, labels, args.threshold),
+        "held_out": score(classifier, eval_texts, eval_labels, args.threshold),
+        "held_out_scoring_ms": round(scoring_ms, 3),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    payload = train(parse_args(argv))
+    print(json.dumps(payload, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
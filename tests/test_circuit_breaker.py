@@ -0,0 +1,101 @@
+import pytest
+import requests
+
+from app import create_app
+from app import services
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker, is_transient
+
+
+class _HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.response = type("Response", (), {"status_code": status})()
+
+
+def _flaky(failures, error=ConnectionError):
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error("connection reset")
+        return "ok"
+
+    return call, calls
+
+
+def test_transient_errors_are_retried_with_backoff(tmp_path):
+    breaker = CircuitBreaker(tmp_path / "circuits.sqlite3", retry_attempts=3, backoff_seconds=0.001)
+    call, calls = _flaky(2)
+
+    assert breaker.call("gemini", call) == "ok"
+    assert len(calls) == 3
+    assert breaker.state("gemini") == ("closed", 0)
+
+
+def test_only_transient_errors_are_retried_and_counted(tmp_path):
+    breaker = CircuitBreaker(tmp_path / "circuits.sqlite3", retry_attempts=3, backoff_seconds=0.001)
+    call, calls = _flaky(5, error=ValueError)
+
+    with pytest.raises(ValueError):
+        breaker.call("gemini", call)
+
+    assert len(calls) == 1
+    assert breaker.state("gemini") == ("closed", 0)
+    assert is_transient(_HttpError(503)) and is_transient(_HttpError(429)) and is_transient(TimeoutError())
+    assert not is_transient(_HttpError(400))
+    assert is_transient(requests.ConnectionError()) and is_transient(requests.Timeout())
+    assert not is_transient(requests.exceptions.JSONDecodeError("Expecting value", "<html>", 0))
+    assert not is_transient(FileNotFoundError())
+
+
+def test_circuit_opens_fails_fast_and_closes_after_a_probe(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.circuit_breaker.time.time", lambda: clock[0])
+    path = tmp_path / "circuits.sqlite3"
+    breaker = CircuitBreaker(path, failure_threshold=2, reset_seconds=30, retry_attempts=1)
+    other_worker = CircuitBreaker(path, failure_threshold=2, reset_seconds=30, retry_attempts=1)
+    failing, failing_calls = _flaky(10, error=TimeoutError)
+
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            breaker.call("vision", failing)
+    with pytest.raises(CircuitOpenError):
+        other_worker.call("vision", failing)
+
+    assert len(failing_calls) == 2
+    assert breaker.state("vision") == ("open", 2)
+
+    clock[0] += 31
+    assert other_worker.call("vision", lambda: "ok") == "ok"
+    assert breaker.state("vision") == ("closed", 0)
+
+
+def test_open_gemini_circuit_falls_back_without_calling_gemini(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "test-key")
+    app = create_app()
+    app.config.update(
+        CIRCUIT_BREAKER_PATH=str(tmp_path / "circuits.sqlite3"),
+        CIRCUIT_BREAKER_FAILURE_THRESHOLD=1,
+        PROVIDER_RETRY_ATTEMPTS=1,
+    )
+    calls = []
+
+    class Models:
+        def generate_content(self, model, contents, config=None):
+            calls.append(contents)
+            raise TimeoutError("read timed out")
+
+    client = type("Client", (), {"models": Models()})()
+    monkeypatch.setattr(services.get_provider_clients(), "gemini_client", lambda api_key: client)
+
+    with app.app_context():
+        first = services.analyze_text_with_gemini("민수: 너 진짜 바보야")
+        second = services.analyze_text_with_gemini("민수: 너 진짜 바보야")
+        state = get_circuit_breaker().state("gemini")
+
+    assert len(calls) == 1
+    assert state == ("open", 1)
+    assert first["fallback_used"] and second["fallback_used"]
+    assert "CircuitOpenError" in second["error"]
+    assert second["summary"]["overall_risk"] == "present"
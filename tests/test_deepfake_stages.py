@@ -0,0 +1,53 @@
+import time
+
+from app import create_app
+from app import services
+
+
+def _png(tmp_path):
+    path = tmp_path / "evidence.png"
+    path.write_bytes(b"\x89PNG\r\n\x1a\nplaceholder")
+    return path
+
+
+def test_deepfake_stages_run_concurrently(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = create_app()
+    app.config["RESULT_CACHE_ENABLED"] = False
+
+    def slow(value):
+        def stage(_path):
+            time.sleep(0.3)
+            return value
+
+        return stage
+
+    monkeypatch.setattr(services, "get_image_metadata", slow({"format": "PNG"}))
+    monkeypatch.setattr(services, "analyze_image_with_sightengine", slow({"type": {"deepfake": 0.1}}))
+    monkeypatch.setattr(services, "extract_text_from_image", slow("hello"))
+
+    started = time.monotonic()
+    with app.app_context():
+        result = services.analyze_file(str(_png(tmp_path)), "deepfake", "png")
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.8
+    assert result["metadata"] == {"format": "PNG"}
+    assert result["deepfake_analysis"] == {"type": {"deepfake": 0.1}}
+    assert result["extracted_text"] == "hello"
+
+
+def test_deepfake_stage_timeout_is_recorded_in_result(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = create_app()
+    app.config["RESULT_CACHE_ENABLED"] = False
+    monkeypatch.setitem(services.DEEPFAKE_STAGE_TIMEOUTS, "deepfake_analysis", 0.05)
+    monkeypatch.setattr(services, "get_image_metadata", lambda _path: {"format": "PNG"})
+    monkeypatch.setattr(services, "analyze_image_with_sightengine", lambda _path: time.sleep(1))
+    monkeypatch.setattr(services, "extract_text_from_image", lambda _path: "")
+
+    with app.app_context():
+        result = services.analyze_file(str(_png(tmp_path)), "deepfake", "png")
+
+    assert result["deepfake_analysis"]["status"] == "timeout"
+    assert "timed out" in result["deepfake_analysis"]["error"]
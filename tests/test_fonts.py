@@ -0,0 +1,43 @@
+import os
+
+from app import create_app
+from app.fonts import COMMON_CHARACTERS, FONT_DIR, FONT_FILES, report_font_face_css, report_font_paths
+
+
+def test_report_fonts_are_cached_subsets(tmp_path):
+    app = create_app()
+    app.config["FONT_CACHE_DIR"] = str(tmp_path)
+
+    with app.app_context():
+        paths = report_font_paths("민수 너 진짜 바보야")
+        again = report_font_paths("민수 너 진짜 바보야")
+
+    assert paths == again
+    for weight, path in paths.items():
+        assert path.startswith(str(tmp_path))
+        assert os.path.getsize(path) < os.path.getsize(FONT_DIR / FONT_FILES[weight]) / 10
+
+
+def test_rare_syllables_get_their_own_subset(tmp_path):
+    app = create_app()
+    app.config["FONT_CACHE_DIR"] = str(tmp_path)
+    rare = "똠"
+    assert rare not in COMMON_CHARACTERS
+
+    with app.app_context():
+        common = report_font_paths("바보야")
+        uncommon = report_font_paths("바보야 " + rare)
+
+    assert common["regular"] != uncommon["regular"]
+    assert uncommon["regular"].startswith(str(tmp_path))
+
+
+def test_font_face_css_falls_back_to_full_font(tmp_path):
+    app = create_app()
+    app.config["FONT_CACHE_DIR"] = str(tmp_path)
+
+    with app.app_context():
+        css = report_font_face_css()
+
+    assert tmp_path.as_uri() in css
+    assert (FONT_DIR / FONT_FILES["regular"]).as_uri() in css
@@ -0,0 +1,82 @@
+from app import create_app
+from app.fpdf_report import generate_fpdf_report, table_rows
+
+
+ANALYSIS = {
+    "analysis_type": "cyberbullying",
+    "sha256": "a" * 64,
+    "analysis_timestamp": "2026-01-01T00:00:00",
+    "file_info": {"filename": "chat.txt"},
+    "cyberbullying_analysis": (
+        '<table class="analysis-table">'
+        "<tr><th>sentence</th><th>risk</th></tr>"
+        "<tr><td>민수: 너 진짜 바보야 &amp; 꺼져</td><td>medium</td></tr>"
+        "</table>"
+    ),
+    "cyberbullying_analysis_summary": "overall risk: present",
+}
+
+
+def test_table_rows_reads_html_and_pipe_tables():
+    assert table_rows(ANALYSIS["cyberbullying_analysis"]) == [
+        ["sentence", "risk"],
+        ["민수: 너 진짜 바보야 & 꺼져", "medium"],
+    ]
+    assert table_rows("| a | b |\n| --- | --- |\n| 1 | 2 |") == [["a", "b"], ["1", "2"]]
+
+
+def test_fpdf_backend_renders_korean_report(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pdf_path = tmp_path / "report.pdf"
+
+    generate_fpdf_report(ANALYSIS, str(pdf_path))
+
+    data = pdf_path.read_bytes()
+    assert data.startswith(b"%PDF")
+    assert b"NanumGothic" in data
+
+
+def test_fpdf_backend_renders_structured_findings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pdf_path = tmp_path / "findings.pdf"
+    analysis = {
+        "analysis_type": "cyberbullying",
+        "file_info": {"filename": "chat.txt"},
+        "sha256": "b" * 64,
+        "cyberbullying_findings": [
+            {
+                "sentence": "민수: 너 진짜 바보야",
+                "type": "insult",
+                "victim": "-",
+                "offender": "민수",
+                "risk": "medium",
+                "explanation": "Insult keyword.",
+                "spans": [[9, 11]],
+            }
+        ],
+        "cyberbullying_summary": {"overall_risk": "present", "atmosphere": "tense", "potential_risks": "review"},
+    }
+
+    generate_fpdf_report(analysis, str(pdf_path))
+
+    assert pdf_path.read_bytes().startswith(b"%PDF")
+
+
+def test_api_download_pdf_accepts_backend_selection(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = create_app()
+    app.config["PDF_CACHE_DIR"] = str(tmp_path / "pdf_cache")
+    client = app.test_client()
+
+    response = client.post(
+        "/api/download_pdf",
+        json={"analysis_type": "cyberbullying", "analysis_result": ANALYSIS, "backend": "fpdf"},
+    )
+    rejected = client.post(
+        "/api/download_pdf",
+        json={"analysis_type": "cyberbullying", "analysis_result": ANALYSIS, "backend": "latex"},
+    )
+
+    assert response.status_code == 200
+    assert response.data.startswith(b"%PDF")
+    assert rejected.status_code == 400
@@ -0,0 +1,175 @@
+import json
+import threading
+import time
+
+from app import create_app
+from app import services
+from app.chunking import highest_risk, split_conversation_windows
+
+
+class _FakeModels:
+    def __init__(self, fail_on=None, delay=0.0):
+        self.fail_on = fail_on
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents, config=None):
+        assert config["response_mime_type"] == "application/json"
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.prompts.append(contents)
+        try:
+            time.sleep(self.delay)
+            analyzed = contents.split("Messages to analyze:\n")[-1].splitlines()[-1]
+            if self.fail_on and self.fail_on in analyzed:
+                raise RuntimeError("quota exceeded")
+            risk = "high" if "바보" in analyzed else "low"
+            text = json.dumps(
+                {
+                    "findings": [
+                        {
+                            "sentence": analyzed,
+                            "type": "-",
+                            "victim": "-",
+                            "offender": "-",
+                            "risk": risk,
+                            "explanation": "-",
+                        }
+                    ],
+                    "overall_risk": risk,
+                    "atmosphere": f"window ending {analyzed}",
+                    "potential_risks": "review",
+                }
+            )
+            return type("Response", (), {"text": text})()
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _app(monkeypatch, tmp_path, models, **config):
+    monkeypatch.chdir(tmp_path)
+    app = create_app()
+    app.config.update(GEMINI_WINDOW_TOKENS=10, GEMINI_WINDOW_OVERLAP_MESSAGES=1, **config)
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "test-key")
+    client = type("Client", (), {"models": models})()
+    monkeypatch.setattr(services.get_provider_clients(), "gemini_client", lambda api_key: client)
+    return app
+
+
+def test_windows_respect_token_budget_and_carry_overlap():
+    lines = [f"a: {'x' * 30}{index}" for index in range(5)]
+
+    windows = split_conversation_windows(lines, max_tokens=20, overlap=1)
+
+    assert [window.lines for window in windows] == [lines[0:2], lines[2:4], lines[4:5]]
+    assert windows[1].context == [lines[1]]
+    assert highest_risk(["low", "매우 높음", "high", None]) == "매우 높음"
+
+
+def test_windows_run_concurrently_with_bounded_parallelism(monkeypatch, tmp_path):
+    models = _FakeModels(delay=0.2)
+    app = _app(monkeypatch, tmp_path, models, GEMINI_MAX_CONCURRENCY=3)
+    text = "\n".join(f"민수: 메시지 {index}" for index in range(6))
+
+    started = time.monotonic()
+    with app.app_context():
+        result = services.analyze_text_with_gemini(text)
+    elapsed = time.monotonic() - started
+
+    assert result["analysis_windows"] == 6
+    assert models.peak == 3
+    assert elapsed < 0.2 * 6
+    assert [finding["sentence"] for finding in result["findings"]] == [f"민수: 메시지 {index}" for index in range(6)]
+    assert result["summary"]["overall_risk"] == "low"
+    assert result["summary"]["potential_risks"] == "review"
+
+
+def test_repeated_messages_keep_a_finding_each_across_windows(monkeypatch, tmp_path):
+    models = _FakeModels()
+    app = _app(monkeypatch, tmp_path, models)
+    text = "\n".join(["민수: 너 바보야"] * 6)
+
+    with app.app_context():
+        result = services.analyze_text_with_gemini(text)
+
+    assert result["analysis_windows"] == 6
+    assert [finding["sentence"] for finding in result["findings"]] == ["민수: 너 바보야"] * 6
+
+
+def test_context_line_reported_again_is_not_duplicated():
+    windows = split_conversation_windows(["민수: 메시지 0", "민수: 메시지 1 바보"], max_tokens=5, overlap=1)
+    findings = [
+        [{"sentence": "민수: 메시지 0"}],
+        [{"sentence": "메시지 0"}, {"sentence": "민수: 메시지 1 바보"}],
+    ]
+    results = [
+        {"findings": items, "summary": {"overall_risk": "high", "atmosphere": "", "potential_risks": ""}}
+        for items in findings
+    ]
+
+    merged = services._merge_window_results(windows, results)
+
+    assert [finding["sentence"] for finding in merged["findings"]] == ["민수: 메시지 0", "민수: 메시지 1 바보"]
+
+
+def test_invalid_json_response_falls_back_to_keywords(monkeypatch, tmp_path):
+    models = _FakeModels()
+    models.generate_content = lambda model, contents, config=None: type("Response", (), {"text": "| not json |"})()
+    app = _app(monkeypatch, tmp_path, models)
+
+    with app.app_context():
+        result = services.analyze_text_with_gemini("민수: 너 진짜 바보야")
+
+    assert result["fallback_used"] is True
+    assert "JSONDecodeError" in result["error"]
+    assert result["summary"]["overall_risk"] == "present"
+
+
+def test_failed_window_falls_back_to_keywords_and_risk_is_maximum(monkeypatch, tmp_path):
+    models = _FakeModels(fail_on="메시지 2")
+    app = _app(monkeypatch, tmp_path, models)
+    text = "민수: 메시지 0\n민수: 메시지 1 바보\n지은: 메시지 2 꺼져"
+
+    with app.app_context():
+        result = services.analyze_text_with_gemini(text)
+
+    assert result["summary"]["overall_risk"] == "high"
+    assert "1 of 3 Gemini windows failed" in result["error"]
+    assert result["findings"][2]["spans"] == [[10, 12]]
+    assert result["keyword_matches"][0]["line"] == 2
+
+
+def test_benign_conversation_is_resolved_offline_without_gemini(monkeypatch, tmp_path):
+    models = _FakeModels()
+    app = _app(monkeypatch, tmp_path, models, RESULT_CACHE_ENABLED=False)
+    chat = tmp_path / "chat.txt"
+    chat.write_text("민수: 오늘 과제 같이 하자\n지은: 좋아", encoding="utf-8")
+
+    with app.app_context():
+        result = services.analyze_file(str(chat), "cyberbullying", "txt")
+
+    assert models.prompts == []
+    assert result["triage"]["decision"] == "resolved_offline"
+    assert result["triage"]["risk_signals"] == 0
+    assert result["cyberbullying_risk_line"] == "none"
+
+
+def test_risky_conversation_is_escalated_to_gemini(monkeypatch, tmp_path):
+    models = _FakeModels()
+    app = _app(monkeypatch, tmp_path, models)
+
+    with app.app_context():
+        analysis, triage = services.analyze_conversation("민수: 너 진짜 바보야")
+        app.config["TRIAGE_ENABLED"] = False
+        _, disabled = services.analyze_conversation("민수: 오늘 과제 같이 하자")
+
+    assert triage["decision"] == "escalated"
+    assert triage["risk_signals"] == 1
+    assert analysis["summary"]["overall_risk"] == "high"
+    assert disabled is None
+    assert len(models.prompts) == 2
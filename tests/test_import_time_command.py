@@ -0,0 +1,31 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+
+def test_app_import_does_not_load_provider_or_renderer_libraries(tmp_path):
+    repo_root = Path(__file__).resolve().parents[1]
+    output_path = tmp_path / "import_time.json"
+    result = subprocess.run(
+        [
+            sys.executable,
+            str(repo_root / "scripts" / "benchmark_import_time.py"),
+            "--iterations",
+            "1",
+            "--output-json",
+            str(output_path),
+        ],
+        cwd=repo_root,
+        text=True,
+        capture_output=True,
+        check=False,
+    )
+
+    assert result.returncode == 0, result.stderr
+
+    summary = json.loads(output_path.read_text(encoding="utf-8"))
+    assert summary["target"] == "run:app"
+    assert summary["mean_total_ms"] > 0
+    assert summary["slowest_modules"]
+    assert summary["heavy_modules_loaded"] == []
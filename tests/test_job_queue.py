@@ -0,0 +1,61 @@
+import io
+import time
+
+from app import create_app
+
+
+def _client(tmp_path, monkeypatch, **config):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GOOGLE_GEMINI_API_KEY", raising=False)
+    app = create_app()
+    app.config.update(
+        GOOGLE_GEMINI_API_KEY="",
+        JOB_STORE_PATH=str(tmp_path / "jobs.sqlite3"),
+        RESULT_CACHE_PATH=str(tmp_path / "cache.sqlite3"),
+        **config,
+    )
+    return app.test_client()
+
+
+def _submit(client, text="민수: 너 진짜 바보야\n"):
+    return client.post(
+        "/api/jobs",
+        data={"analysis_type": "cyberbullying", "file": (io.BytesIO(text.encode("utf-8")), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+
+
+def test_job_is_queued_and_result_is_available_by_id(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+
+    response = _submit(client)
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    assert response.headers["Location"].endswith(f"/api/jobs/{job_id}")
+
+    deadline = time.monotonic() + 10
+    while True:
+        job = client.get(f"/api/jobs/{job_id}").get_json()
+        if job["status"] in {"done", "failed"} or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+
+    assert job["status"] == "done"
+    assert job["result"]["analysis_type"] == "cyberbullying"
+    assert job["result"]["cyberbullying_risk_line"] == "present"
+
+
+def test_full_queue_returns_429_with_retry_after(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch, JOB_QUEUE_MAX_DEPTH=0, JOB_RETRY_AFTER_SECONDS=7)
+
+    response = _submit(client)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    assert not any((tmp_path / "tmp").glob("*.txt"))
+
+
+def test_unknown_job_returns_404(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+
+    assert client.get("/api/jobs/does-not-exist").status_code == 404
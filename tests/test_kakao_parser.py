@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from app.kakao import detect_encoding, iter_chat_messages, iter_text_lines, message_datetime
+from app.services import read_chat_export
+
+
+PC_EXPORT = """민수 님과 카카오톡 대화
+저장한 날짜 : 2024-05-02 10:00:00
+
+--------------- 2024년 5월 1일 수요일 ---------------
+[민수] [오후 3:21] 너 진짜 바보야
+둘째 줄: 계속
+[지은] [오후 3:22] 사진
+[지은] [오후 3:22] 오늘 과제 같이 하자
+"""
+
+MOBILE_EXPORT = """민수 님과 카카오톡 대화
+저장한 날짜 : 2024년 5월 2일 오전 10:00
+
+2024년 5월 1일 수요일
+2024년 5월 1일 오후 3:21, 민수 : 너 진짜 바보야
+2024년 5월 1일 오후 3:22, 지은님이 들어왔습니다.
+2024. 5. 1. 오후 3:23, 지은 : 꺼져
+"""
+
+
+def _pairs(text):
+    return [(message["speaker"], message["text"]) for message in iter_chat_messages(text.splitlines())]
+
+
+def test_pc_export_joins_multiline_messages_and_skips_headers():
+    messages = list(iter_chat_messages(PC_EXPORT.splitlines()))
+
+    assert [(message["speaker"], message["text"]) for message in messages] == [
+        ("민수", "너 진짜 바보야 둘째 줄: 계속"),
+        ("지은", "오늘 과제 같이 하자"),
+    ]
+    assert messages[0]["date"] == "2024년 5월 1일"
+    assert messages[0]["time"] == "오후 3:21"
+    assert messages[0]["line"] == 5
+
+
+def test_mobile_export_skips_system_events():
+    assert _pairs(MOBILE_EXPORT) == [("민수", "너 진짜 바보야"), ("지은", "꺼져")]
+
+
+def test_message_datetime_reads_korean_and_dotted_dates():
+    messages = list(iter_chat_messages(MOBILE_EXPORT.splitlines()))
+
+    assert [message_datetime(message) for message in messages] == [
+        datetime(2024, 5, 1, 15, 21),
+        datetime(2024, 5, 1, 15, 23),
+    ]
+    assert message_datetime({"date": "2024년 5월 1일", "time": "오전 12:05"}) == datetime(2024, 5, 1, 0, 5)
+    assert message_datetime({"date": None, "time": "3:21"}) is None
+
+
+def test_ocr_text_keeps_speaker_heuristics():
+    assert _pairs("민수\n너 진짜 바보야\n오후 3:21\n지은: 꺼져\nphoto") == [
+        ("민수", "너 진짜 바보야"),
+        ("지은", "꺼져"),
+    ]
+
+
+def test_encoding_is_detected_from_prefix(tmp_path):
+    path = tmp_path / "chat.txt"
+    path.write_bytes(PC_EXPORT.encode("cp949"))
+
+    assert detect_encoding("안녕".encode("utf-8")[:-1]) == "utf-8"
+    assert detect_encoding(PC_EXPORT.encode("cp949")) == "cp949"
+    assert next(iter_text_lines(path)).startswith("민수 님과")
+    assert read_chat_export(path).splitlines()[0] == "민수: 너 진짜 바보야 둘째 줄: 계속"
@@ -0,0 +1,82 @@
+from app.lexicon import (
+    KeywordAutomaton,
+    _quick_normalize,
+    classify_message,
+    default_automaton,
+    merge_spans,
+    normalize_for_matching,
+)
+from app.services import _fallback_cyberbullying_analysis, findings_table_html
+
+
+def test_automaton_reports_every_overlapping_match_with_spans():
+    automaton = KeywordAutomaton({"a": ("he", "she", "hers"), "b": ("죽어", "어")})
+
+    matches = automaton.find("uSHErs 너 죽어")
+
+    assert matches == [
+        (1, 4, "she", "a"),
+        (2, 4, "he", "a"),
+        (2, 6, "hers", "a"),
+        (9, 11, "죽어", "b"),
+        (10, 11, "어", "b"),
+    ]
+    assert merge_spans(matches) == [(1, 6), (9, 11)]
+
+
+def test_obfuscated_spellings_match_with_spans_in_the_original_text():
+    automaton = default_automaton()
+
+    assert automaton.find("너 바 보 야") == [(2, 5, "바보", "insult")]
+    assert automaton.find("바\u200b아아보") == [(0, 5, "바보", "insult")]
+    assert automaton.find("바ㅂㅗ") == [(0, 3, "바보", "insult")]
+    assert automaton.find("STUUUPID") == [(0, 8, "stupid", "insult")]
+    assert automaton.find("ㅂㅅ아") == [(0, 2, "병신", "insult")]
+    assert automaton.find("ㅄ") == [(0, 1, "병신", "insult")]
+
+
+def test_normalization_does_not_invent_matches():
+    automaton = default_automaton()
+
+    # Final consonant + initial ("밥솥") and repeated initials ("ㅂㅂ") are not abbreviations.
+    assert automaton.find("밥솥 ㅂㅂ ㅋㅋㅋ") == []
+    # Only listed abbreviations match; other keywords' initials are everyday shorthand.
+    for text in ["ㅈㅇ", "내일 ㅈㅇ", "ㅎㅂ", "ㅅㅇ 고마워", "ㅁㅅ", "ㄸㄷ"]:
+        assert automaton.find(text) == [], text
+    assert automaton.find("ㅅㅂ 진짜") == [(0, 2, "시발", "insult")]
+
+
+def test_keywords_do_not_match_across_ordinary_words():
+    for text in ["what ever you say", "that eats time", "we had ie", "도시 발전", "시 발표 준비하자"]:
+        assert classify_message(text)[:2] == (None, None), text
+
+    # Single letters split apart are still joined, including across a chain of them.
+    assert classify_message("시 발 놈")[0] == "insult"
+    assert classify_message("바.보")[0] == "insult"
+
+
+def test_quick_normalization_agrees_with_offset_tracking():
+    texts = ["바 보", "바아아보", "STUUUPID", "ㅂㅅ아", "leave  out", "죽어어어", "a\u200bb..c", "시 발표", "바 \u200b보"]
+    for text in texts:
+        normalized, offsets = normalize_for_matching(text)
+        assert _quick_normalize(text) == normalized
+        assert len(offsets) == len(normalized)
+
+
+def test_classify_message_prefers_the_most_severe_category():
+    category, risk, _, matches = classify_message("바보 죽어")
+
+    assert (category, risk) == ("threat", "severe")
+    assert {match[3] for match in matches} == {"threat", "insult"}
+    assert classify_message("오늘 과제 같이 하자")[:2] == (None, None)
+
+
+def test_fallback_analysis_highlights_and_returns_keyword_spans():
+    analysis = _fallback_cyberbullying_analysis("민수: 너 진짜 바보야 <b>\n하늘: 오늘 과제 같이 하자")
+
+    assert analysis["findings"][0]["spans"] == [[9, 11]]
+    assert '민수: 너 진짜 <mark class="keyword-hit">바보</mark>야 &lt;b&gt;' in findings_table_html(analysis["findings"])
+    assert analysis["keyword_matches"] == [
+        {"line": 0, "speaker": "민수", "start": 5, "end": 7, "term": "바보", "category": "insult"}
+    ]
+    assert analysis["summary"]["overall_risk"] == "present"
@@ -0,0 +1,97 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from app import create_app
+from app.lexicon import KeywordAutomaton
+from app.message_scores import CATEGORY_NAMES, aggregate_scores, score_messages
+
+
+PC_EXPORT = """--------------- 2024년 5월 1일 수요일 ---------------
+[민수] [오후 3:21] 너 진짜 바보야
+[지은] [오후 3:40] 오늘 과제 같이 하자
+[민수] [오후 4:05] 죽어
+"""
+
+
+def test_keyword_scores_are_aggregated_per_speaker_and_window():
+    lines = ["민수: 너 진짜 바보야", "", "지은: 오늘 과제 같이 하자", "민수: 죽어"]
+    timestamps = [datetime(2024, 5, 1, 15, 21), None, datetime(2024, 5, 1, 15, 40), None]
+
+    scores = score_messages(lines, timestamps)
+    aggregates = aggregate_scores(scores, window_minutes=60)
+
+    assert scores.speakers == ["민수", "지은"]
+    assert scores.speaker_id.tolist() == [0, 1, 0]
+    assert scores.offset.tolist() == [0, 14, 30]
+    assert [CATEGORY_NAMES[category] for category in scores.category] == ["insult", "none", "threat"]
+    assert scores.score.tolist() == pytest.approx([0.66, 0.0, 1.0])
+    assert aggregates["speakers"][0] == {
+        "speaker": "민수",
+        "messages": 2,
+        "flagged": 2,
+        "mean_score": 0.83,
+        "max_score": 1.0,
+        "categories": {"threat": 1, "insult": 1, "exclusion": 0},
+    }
+    assert [(window["start"], window["messages"]) for window in aggregates["windows"]] == [
+        ("2024-05-01T15:00:00", 2)
+    ]
+    assert {key: scores.to_json()[key] for key in ("messages", "index", "offset")} == {
+        "messages": 3,
+        "index": [0, 2],
+        "offset": [0, 30],
+    }
+
+
+def test_api_exposes_message_scores_and_aggregates(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GOOGLE_GEMINI_API_KEY", raising=False)
+    app = create_app()
+    app.config.update(GOOGLE_GEMINI_API_KEY="", RESULT_CACHE_ENABLED=False, SCORE_WINDOW_MINUTES=30)
+
+    response = app.test_client().post(
+        "/api/analyze_cyberbullying",
+        data={"file": (io.BytesIO(PC_EXPORT.encode("utf-8")), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+
+    body = response.get_json()
+    scores = body["message_scores"]
+    assert response.status_code == 200
+    assert scores["speakers"] == ["민수", "지은"]
+    assert scores["messages"] == 3
+    assert len(scores["score"]) == len(scores["offset"]) == len(scores["index"]) < 3
+    position = scores["index"].index(0)
+    assert scores["minute"][position] == (datetime(2024, 5, 1, 15, 21) - datetime(1970, 1, 1)).total_seconds() // 60
+    assert [window["start"] for window in body["risk_aggregates"]["windows"]] == [
+        "2024-05-01T15:00:00",
+        "2024-05-01T15:30:00",
+        "2024-05-01T16:00:00",
+    ]
+    assert body["risk_aggregates"]["speakers"][0]["categories"]["threat"] == 1
+
+
+def test_offline_analysis_matches_the_lexicon_once_per_message(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GOOGLE_GEMINI_API_KEY", raising=False)
+    app = create_app()
+    app.config.update(GOOGLE_GEMINI_API_KEY="", RESULT_CACHE_ENABLED=False)
+    calls = []
+    find = KeywordAutomaton.find
+    monkeypatch.setattr(KeywordAutomaton, "find", lambda self, text: calls.append(text) or find(self, text))
+
+    body = (
+        app.test_client()
+        .post(
+            "/api/analyze_cyberbullying",
+            data={"file": (io.BytesIO(PC_EXPORT.encode("utf-8")), "chat.txt")},
+            content_type="multipart/form-data",
+        )
+        .get_json()
+    )
+
+    assert len(calls) == 3
+    assert [finding["sentence"] for finding in body["cyberbullying_findings"]] == ["민수: 너 진짜 바보야", "민수: 죽어"]
+    assert body["keyword_matches"][1]["line"] == 2
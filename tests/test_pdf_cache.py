@@ -0,0 +1,51 @@
+import os
+from pathlib import Path
+
+from app import create_app
+from app.pdf_cache import PdfCache
+
+
+ANALYSIS = {
+    "analysis_type": "cyberbullying",
+    "sha256": "0" * 64,
+    "cyberbullying_analysis": "<table></table>",
+    "cyberbullying_analysis_summary": "overall risk: none",
+}
+
+
+def test_repeated_download_reuses_rendered_pdf_and_honours_etag(tmp_path, monkeypatch):
+    app = create_app()
+    app.config["PDF_CACHE_DIR"] = str(tmp_path / "pdf_cache")
+    client = app.test_client()
+    renders = []
+
+    def fake_render(_analysis_result, pdf_path, _analysis_type=None, backend=None):
+        renders.append(pdf_path)
+        Path(pdf_path).write_bytes(b"%PDF-1.7 cached report")
+        return pdf_path
+
+    monkeypatch.setattr("app.routes.generate_pdf_report", fake_render)
+    payload = {"analysis_type": "cyberbullying", "analysis_result": ANALYSIS}
+
+    first = client.post("/api/download_pdf", json=payload)
+    second = client.post("/api/download_pdf", json=payload)
+    etag = first.headers["ETag"]
+    unchanged = client.post("/api/download_pdf", json=payload, headers={"If-None-Match": etag})
+
+    assert first.status_code == second.status_code == 200
+    assert second.data == b"%PDF-1.7 cached report"
+    assert second.headers["ETag"] == etag
+    assert unchanged.status_code == 304
+    assert len(renders) == 1
+
+
+def test_pdf_cache_evicts_oldest_files_over_size_budget(tmp_path):
+    cache = PdfCache(tmp_path, max_bytes=10)
+    cache.get_or_render("a", lambda path: Path(path).write_bytes(b"123456"))
+    old = tmp_path / "a.pdf"
+    old_mtime = old.stat().st_mtime - 60
+    os.utime(old, (old_mtime, old_mtime))
+    cache.get_or_render("b", lambda path: Path(path).write_bytes(b"123456"))
+
+    assert not old.exists()
+    assert (tmp_path / "b.pdf").exists()
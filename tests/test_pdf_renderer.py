@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+from app import create_app
+from app.pdf_renderer import PdfRendererPool, RendererUnavailableError
+
+
+def test_renderer_pool_renders_in_warm_worker_process(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pool = PdfRendererPool(processes=1, max_pending=2, timeout=60, stylesheets=("body { color: #111; }",))
+    pdf_path = tmp_path / "report.pdf"
+    try:
+        pool.render("<html><body><h1>Report</h1></body></html>", str(pdf_path), "body { color: #111; }")
+    finally:
+        pool.close()
+
+    assert pdf_path.read_bytes().startswith(b"%PDF")
+
+
+def test_renderer_that_cannot_load_weasyprint_fails_the_render_at_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    broken = tmp_path / "broken" / "weasyprint"
+    broken.mkdir(parents=True)
+    (broken / "__init__.py").write_text("raise ImportError('no pango')\n")
+    # Spawned renderer processes start from this sys.path, so they import the broken package.
+    monkeypatch.syspath_prepend(str(broken.parent))
+    pool = PdfRendererPool(processes=1, max_pending=2, timeout=30)
+    started = time.monotonic()
+    try:
+        with pytest.raises(RendererUnavailableError, match="no pango"):
+            pool.render("<html></html>", str(tmp_path / "report.pdf"))
+    finally:
+        pool.close()
+
+    assert time.monotonic() - started < 20
+
+
+def test_busy_renderer_returns_503_with_retry_after(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = create_app()
+    app.config["PDF_CACHE_DIR"] = str(tmp_path / "pdf_cache")
+    app.config["PDF_RENDER_MAX_PENDING"] = 0
+    client = app.test_client()
+
+    response = client.post(
+        "/api/download_pdf",
+        json={"analysis_type": "cyberbullying", "analysis_result": {"analysis_type": "cyberbullying"}},
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    assert not list((tmp_path / "pdf_cache").glob("*.pdf"))
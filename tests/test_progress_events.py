@@ -0,0 +1,115 @@
+import io
+import threading
+
+from app import create_app
+from app.progress import ProgressLog, get_progress_log, report_progress, stream_events, track_progress
+
+
+def test_stream_replays_after_last_id_and_stops_at_terminal_event(tmp_path):
+    log = ProgressLog(tmp_path / "progress.sqlite3")
+    with track_progress(log, "result-a"):
+        report_progress("upload_hashed", size_bytes=10)
+        report_progress("llm_window_done", done=1, total=2)
+    report_progress("ignored")
+    log.publish("result-b", "complete")
+    log.publish("result-a", "complete")
+    log.publish("result-a", "late")
+
+    first_id = log.events_after("result-a")[0][0]
+    body = "".join(stream_events(log, "result-a", last_id=first_id, max_seconds=5))
+
+    assert body.startswith("retry: ")
+    assert "upload_hashed" not in body
+    assert 'event: llm_window_done\ndata: {"done": 1, "total": 2}' in body
+    assert body.endswith("event: complete\ndata: {}\n\n")
+    assert "late" not in body
+
+
+def test_settled_result_gets_a_closing_complete_event(tmp_path):
+    log = ProgressLog(tmp_path / "progress.sqlite3")
+
+    body = "".join(stream_events(log, "result-a", settled=True, max_seconds=5))
+
+    assert body.endswith("event: complete\ndata: {}\n\n")
+
+
+def test_web_upload_streams_stage_events_to_the_results_page(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GOOGLE_GEMINI_API_KEY", raising=False)
+    app = create_app()
+    app.config.update(
+        GOOGLE_GEMINI_API_KEY="test-key",
+        GEMINI_WINDOW_TOKENS=40,
+        PDF_BACKEND="fpdf",
+        RESULT_CACHE_ENABLED=False,
+    )
+    client = app.test_client()
+    release = threading.Event()
+
+    def analyze_window(api_key, window):
+        release.wait(5)
+        return {"findings": [], "summary": {"overall_risk": "high", "atmosphere": "", "potential_risks": ""}}
+
+    monkeypatch.setattr("app.services._analyze_gemini_window", analyze_window)
+    chat = "\n".join(f"민수: 너 진짜 바보야 {index}" for index in range(20))
+
+    response = client.post(
+        "/analyze_cyberbullying",
+        data={"file": (io.BytesIO(chat.encode("utf-8")), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+    assert response.headers["Location"].endswith("/results")
+    with client.session_transaction() as session:
+        result_id = session["result_id"]
+
+    page = client.get("/results").get_data(as_text=True)
+    assert f"/api/results/{result_id}/events" in page
+    assert client.get(f"/api/results/{result_id}").status_code == 202
+
+    release.set()
+    events = client.get(f"/api/results/{result_id}/events")
+    body = events.get_data(as_text=True)
+
+    assert events.mimetype == "text/event-stream"
+    names = [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("event: ")]
+    windows = names.count("llm_window_done")
+    assert windows > 1
+    assert names == ["upload_hashed"] + ["llm_window_done"] * windows + ["analysis_done", "complete"]
+    assert f'"done": {windows}, "total": {windows}' in body
+    assert "전체 대화 사이버폭력 위험도" in client.get("/results").get_data(as_text=True)
+    assert client.get("/download_pdf").mimetype == "application/pdf"
+
+
+def test_opt_in_pdf_prerender_runs_after_the_complete_event(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GOOGLE_GEMINI_API_KEY", raising=False)
+    app = create_app()
+    app.config.update(GOOGLE_GEMINI_API_KEY="", PDF_BACKEND="fpdf", PDF_PRERENDER_ENABLED=True)
+    client = app.test_client()
+    known, rendered = threading.Event(), threading.Event()
+    seen_at_render = []
+
+    def render(analysis_result, analysis_type, backend):
+        known.wait(5)
+        seen_at_render.extend(event for _, event, _ in get_progress_log().events_after(result_id))
+        rendered.set()
+
+    monkeypatch.setattr("app.routes._render_report_pdf", render)
+    client.post(
+        "/analyze_cyberbullying",
+        data={"file": (io.BytesIO("민수: 너 진짜 바보야".encode("utf-8")), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+    with client.session_transaction() as session:
+        result_id = session["result_id"]
+    known.set()
+
+    assert rendered.wait(10)
+    assert seen_at_render[-2:] == ["analysis_done", "complete"]
+
+
+def test_unknown_result_has_no_event_stream(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = create_app().test_client()
+
+    assert client.get("/api/results/does-not-exist/events").status_code == 404
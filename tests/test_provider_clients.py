@@ -0,0 +1,25 @@
+from google import genai
+
+from app import providers
+from app.providers import ProviderClients
+
+
+def test_provider_clients_are_reused_within_a_process(monkeypatch):
+    created = []
+    monkeypatch.setattr(genai, "Client", lambda api_key: created.append(api_key) or object())
+    clients = ProviderClients()
+
+    assert clients.http_session() is clients.http_session()
+    assert clients.gemini_client("key-a") is clients.gemini_client("key-a")
+    assert clients.gemini_client("key-a") is not clients.gemini_client("key-b")
+    assert created == ["key-a", "key-b"]
+    assert clients.vision_client("", "") is None
+
+
+def test_provider_clients_are_rebuilt_after_fork(monkeypatch):
+    clients = ProviderClients()
+    parent_session = clients.http_session()
+
+    monkeypatch.setattr(providers.os, "getpid", lambda: -1)
+
+    assert clients.http_session() is not parent_session
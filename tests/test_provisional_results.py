@@ -0,0 +1,144 @@
+import io
+import threading
+import time
+
+from app import create_app
+from app.services import analyze_file
+
+
+def _client(tmp_path, monkeypatch, **config):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GOOGLE_GEMINI_API_KEY", raising=False)
+    app = create_app()
+    app.config.update(
+        GOOGLE_GEMINI_API_KEY="test-key",
+        JOB_STORE_PATH=str(tmp_path / "jobs.sqlite3"),
+        RESULT_CACHE_PATH=str(tmp_path / "cache.sqlite3"),
+        RESULT_STORE_PATH=str(tmp_path / "results.sqlite3"),
+        SINGLE_FLIGHT_PATH=str(tmp_path / "flights.sqlite3"),
+        **config,
+    )
+    return app, app.test_client()
+
+
+def _upload(client, query="", chat="민수: 너 진짜 바보야\n"):
+    return client.post(
+        f"/api/analyze_cyberbullying{query}",
+        data={"file": (io.BytesIO(chat.encode("utf-8")), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+
+
+def _gemini_stub(monkeypatch, release=None):
+    calls = []
+
+    def analyze(text):
+        calls.append(text)
+        if release is not None:
+            release.wait(5)
+        return {
+            "findings": [{"sentence": "민수: 너 진짜 바보야", "type": "insult", "risk": "high"}],
+            "summary": {"overall_risk": "high", "atmosphere": "hostile", "potential_risks": "escalation"},
+        }
+
+    monkeypatch.setattr("app.services.analyze_text_with_gemini", analyze)
+    return calls
+
+
+def test_provisional_result_is_upgraded_in_place(tmp_path, monkeypatch):
+    app, client = _client(tmp_path, monkeypatch)
+    release = threading.Event()
+    calls = _gemini_stub(monkeypatch, release)
+
+    response = _upload(client, "?provisional=1")
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body["provisional"] is True
+    assert body["cyberbullying_risk_line"] == "present"
+    assert body["result_url"].endswith(f"/api/results/{body['result_id']}")
+    polled = client.get(body["result_url"])
+    assert polled.get_json()["provisional"] is True
+    assert polled.headers["Retry-After"] == "1"
+
+    release.set()
+    deadline = time.monotonic() + 10
+    while True:
+        final = client.get(body["result_url"]).get_json()
+        if not final.get("provisional") or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+
+    assert "provisional" not in final
+    assert final["cyberbullying_risk_line"] == "high"
+    assert final["result_id"] == body["result_id"]
+    assert len(calls) == 1
+    # A later upload of the same chat gets the upgraded analysis from the result cache.
+    with app.app_context():
+        repeat = analyze_file(
+            "chat.txt", "cyberbullying", "txt", sha256=body["sha256"], size_bytes=body["file_info"]["size_bytes"]
+        )
+    assert repeat["result_cache"] == "hit"
+    assert repeat["cyberbullying_risk_line"] == "high"
+
+
+def test_repeated_provisional_uploads_share_one_gemini_upgrade(tmp_path, monkeypatch):
+    _, client = _client(tmp_path, monkeypatch)
+    release = threading.Event()
+    calls = _gemini_stub(monkeypatch, release)
+
+    bodies = [_upload(client, "?provisional=1").get_json() for _ in range(3)]
+    assert all(body["provisional"] for body in bodies)
+    release.set()
+    deadline = time.monotonic() + 10
+    finals = []
+    for body in bodies:
+        while True:
+            final = client.get(body["result_url"]).get_json()
+            if not final.get("provisional") or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        finals.append(final)
+
+    assert [final["cyberbullying_risk_line"] for final in finals] == ["high"] * 3
+    assert len(calls) == 1
+
+
+def test_long_chat_keeps_a_preview_and_upgrades_from_the_upload(tmp_path, monkeypatch):
+    _, client = _client(tmp_path, monkeypatch)
+    monkeypatch.setattr("app.services.EXTRACTED_TEXT_PREVIEW_CHARS", 40)
+    calls = _gemini_stub(monkeypatch)
+    chat = "".join(f"지은: 오늘 과제 같이 하자 {index}\n" for index in range(20)) + "민수: 너 진짜 바보야\n"
+
+    body = _upload(client, "?provisional=1", chat).get_json()
+
+    assert body["extracted_text"] == chat[:40]
+    assert body["extracted_text_truncated"] is True
+    assert [finding["sentence"] for finding in body["cyberbullying_findings"]] == ["민수: 너 진짜 바보야"]
+    deadline = time.monotonic() + 10
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert calls == [chat.rstrip("\n")]
+
+
+def test_full_queue_completes_the_analysis_in_the_request(tmp_path, monkeypatch):
+    _, client = _client(tmp_path, monkeypatch, JOB_QUEUE_MAX_DEPTH=0)
+    calls = _gemini_stub(monkeypatch)
+
+    body = _upload(client, "?provisional=1").get_json()
+
+    assert "provisional" not in body
+    assert body["cyberbullying_risk_line"] == "high"
+    assert len(calls) == 1
+
+
+def test_results_are_final_unless_the_client_asks_for_provisional(tmp_path, monkeypatch):
+    _, client = _client(tmp_path, monkeypatch)
+    _gemini_stub(monkeypatch)
+
+    body = _upload(client).get_json()
+
+    assert "provisional" not in body
+    assert "result_id" not in body
+    assert body["cyberbullying_risk_line"] == "high"
+    assert client.get("/api/results/does-not-exist").status_code == 404
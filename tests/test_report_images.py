@@ -0,0 +1,47 @@
+from PIL import Image
+
+from app import create_app
+from app.report_images import REPORT_IMAGE_MAX_SIZE, report_image_path
+from app.services import generate_image_html
+
+
+def _large_png(tmp_path):
+    path = tmp_path / "evidence.png"
+    Image.new("RGBA", (3000, 2000), (200, 30, 30, 128)).save(path)
+    return path
+
+
+def test_report_image_is_downscaled_jpeg_cached_by_hash(tmp_path):
+    app = create_app()
+    app.config["REPORT_IMAGE_CACHE_DIR"] = str(tmp_path / "renditions")
+    original = _large_png(tmp_path)
+
+    with app.app_context():
+        rendition = report_image_path(str(original), "f" * 64)
+        again = report_image_path(str(original), "f" * 64)
+
+    assert rendition == again
+    assert rendition.startswith(str(tmp_path / "renditions" / ("f" * 64)))
+    with Image.open(rendition) as image:
+        assert image.format == "JPEG"
+        assert image.width <= REPORT_IMAGE_MAX_SIZE[0]
+
+
+def test_report_html_embeds_rendition_and_keeps_original_hash(tmp_path):
+    app = create_app()
+    app.config["REPORT_IMAGE_CACHE_DIR"] = str(tmp_path / "renditions")
+    original = _large_png(tmp_path)
+
+    with app.app_context():
+        html = generate_image_html("", {"file_path": str(original), "sha256": "e" * 64}, "evidence.png")
+
+    assert "data:image/jpeg;base64," in html
+    assert "e" * 64 in html
+    assert len(html) < original.stat().st_size
+
+
+def test_text_evidence_is_not_embedded_as_image(tmp_path):
+    text_file = tmp_path / "chat.txt"
+    text_file.write_text("hello", encoding="utf-8")
+
+    assert generate_image_html("", {"file_path": str(text_file), "sha256": "d" * 64}, "chat.txt") == ""
@@ -0,0 +1,70 @@
+import io
+import time
+
+import pytest
+
+from app import create_app
+from app import services
+from app.deadline import DeadlineExceeded, budget, request_deadline
+
+
+def test_budget_is_capped_by_the_request_deadline():
+    assert budget(30) == 30
+
+    with request_deadline(0.05):
+        assert budget(30) <= 0.05
+        time.sleep(0.06)
+        with pytest.raises(DeadlineExceeded):
+            budget(30)
+
+
+def test_deepfake_stage_is_cut_off_at_the_request_deadline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = create_app()
+    app.config["RESULT_CACHE_ENABLED"] = False
+    evidence = tmp_path / "evidence.png"
+    evidence.write_bytes(b"\x89PNG\r\n\x1a\nplaceholder")
+    monkeypatch.setattr(services, "get_image_metadata", lambda _path: {"format": "PNG"})
+    monkeypatch.setattr(services, "analyze_image_with_sightengine", lambda _path: time.sleep(1))
+    monkeypatch.setattr(services, "extract_text_from_image", lambda _path: "")
+
+    started = time.monotonic()
+    with app.app_context(), request_deadline(0.2):
+        result = services.analyze_file(str(evidence), "deepfake", "png")
+
+    assert time.monotonic() - started < 0.6
+    assert result["metadata"] == {"format": "PNG"}
+    assert result["deepfake_analysis"]["status"] == "timeout"
+    assert "request deadline exceeded" in result["deepfake_analysis"]["error"]
+
+
+def test_slow_gemini_degrades_to_offline_result_within_the_budget(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "test-key")
+    monkeypatch.chdir(tmp_path)
+    app = create_app()
+    app.config.update(RESULT_CACHE_ENABLED=False, REQUEST_DEADLINE_SECONDS=0.3)
+    timeouts = []
+
+    class SlowModels:
+        def generate_content(self, model, contents, config=None):
+            timeouts.append(config["http_options"]["timeout"])
+            time.sleep(1)
+            raise TimeoutError("read timed out")
+
+    client = type("Client", (), {"models": SlowModels()})()
+    monkeypatch.setattr(services.get_provider_clients(), "gemini_client", lambda api_key: client)
+
+    started = time.monotonic()
+    response = app.test_client().post(
+        "/api/analyze_cyberbullying",
+        data={"file": (io.BytesIO("민수: 너 진짜 바보야\n".encode("utf-8")), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert time.monotonic() - started < 0.9
+    assert timeouts and timeouts[0] <= 300
+    assert body["provider_error"] == "request deadline exceeded"
+    assert body["cyberbullying_risk_line"] == "present"
@@ -0,0 +1,48 @@
+from app import create_app
+from app.result_cache import ResultCache
+from app.services import analyze_file
+
+
+def test_result_cache_expires_and_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.result_cache.time.time", lambda: clock[0])
+    cache = ResultCache(tmp_path / "cache.sqlite3", ttl_seconds=60, max_entries=2)
+
+    cache.set("a", {"value": 1})
+    clock[0] += 1
+    cache.set("b", {"value": 2})
+    clock[0] += 1
+    assert cache.get("a") == {"value": 1}
+    clock[0] += 1
+    cache.set("c", {"value": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"value": 1}
+    clock[0] += 120
+    assert cache.get("c") is None
+
+
+def test_repeat_upload_reuses_cached_analysis(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "test-key")
+    app = create_app()
+    app.config["RESULT_CACHE_PATH"] = str(tmp_path / "cache.sqlite3")
+    evidence = tmp_path / "chat.txt"
+    evidence.write_text("민수: 너 진짜 바보야\n", encoding="utf-8")
+
+    calls = []
+
+    def counting_analyzer(text):
+        calls.append(text)
+        return {"findings": [], "summary": {"overall_risk": "present", "atmosphere": "", "potential_risks": ""}}
+
+    monkeypatch.setattr("app.services.analyze_text_with_gemini", counting_analyzer)
+
+    with app.app_context():
+        first = analyze_file(str(evidence), "cyberbullying", "txt")
+        second = analyze_file(str(evidence), "cyberbullying", "txt")
+
+    assert len(calls) == 1
+    assert "result_cache" not in first
+    assert second["result_cache"] == "hit"
+    assert second["cyberbullying_risk_line"] == first["cyberbullying_risk_line"] == "present"
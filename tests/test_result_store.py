@@ -0,0 +1,40 @@
+import io
+
+from app import create_app
+
+
+def test_session_cookie_only_carries_result_id(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GOOGLE_GEMINI_API_KEY", raising=False)
+    app = create_app()
+    app.config.update(
+        GOOGLE_GEMINI_API_KEY="",
+        RESULT_STORE_PATH=str(tmp_path / "results.sqlite3"),
+        RESULT_CACHE_PATH=str(tmp_path / "cache.sqlite3"),
+    )
+    client = app.test_client()
+    chat = "\n".join(f"민수: 오늘 과제 같이 하자 {index}" for index in range(200))
+
+    response = client.post(
+        "/analyze_cyberbullying",
+        data={"file": (io.BytesIO(chat.encode("utf-8")), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith("/results")
+    cookie = response.headers["Set-Cookie"]
+    assert len(cookie) < 300
+    with client.session_transaction() as session:
+        assert set(session) == {"result_id"}
+        result_id = session["result_id"]
+
+    # The analysis runs in the background; its progress stream ends once the result is ready.
+    assert "event: complete" in client.get(f"/api/results/{result_id}/events").get_data(as_text=True)
+    assert "오늘 과제 같이 하자 199" in client.get("/results").get_data(as_text=True)
+
+    uploads = list((tmp_path / "tmp").glob("*.txt"))
+    assert len(uploads) == 1
+    client.get("/reset")
+    assert not uploads[0].exists()
+    assert client.get("/results").status_code == 302
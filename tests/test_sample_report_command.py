@@ -17,6 +17,19 @@ def test_sample_report_command_generates_json_and_pdf(tmp_path):
         "GOOGLE_SERVICE_ACCOUNT_JSON",
     ):
         env.pop(name, None)
+    # Keep the command's caches and stores out of the repository's tmp/ directory.
+    runtime = tmp_path / "runtime"
+    for name in (
+        "RESULT_CACHE_PATH",
+        "SINGLE_FLIGHT_PATH",
+        "RESULT_STORE_PATH",
+        "PROGRESS_LOG_PATH",
+        "CIRCUIT_BREAKER_PATH",
+        "JOB_STORE_PATH",
+    ):
+        env[f"ANSIMTALK_{name}"] = str(runtime / f"{name.lower()}.sqlite3")
+    for name in ("PDF_CACHE_DIR", "REPORT_IMAGE_CACHE_DIR", "FONT_CACHE_DIR"):
+        env[f"ANSIMTALK_{name}"] = str(runtime / name.lower())
 
     result = subprocess.run(
         [
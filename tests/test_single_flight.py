@@ -0,0 +1,97 @@
+import threading
+import time
+
+from app import create_app
+from app.services import analyze_file
+from app.single_flight import SingleFlight
+
+
+def _run_concurrently(count, target):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        barrier.wait()
+        results[index] = target(index)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_callers_across_workers_share_one_computation(tmp_path):
+    # Separate instances on one file behave like separate gunicorn workers.
+    flights = [SingleFlight(tmp_path / "flights.sqlite3") for _ in range(2)]
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.3)
+        return {"risk": "high"}
+
+    results = _run_concurrently(6, lambda index: flights[index % 2].run("sha", compute))
+
+    assert len(calls) == 1
+    assert all(value == {"risk": "high"} for value, _ in results)
+    assert sorted(shared for _, shared in results) == [False] + [True] * 5
+    assert flights[0].run("sha", lambda: {"risk": "low"}) == ({"risk": "low"}, False)
+
+
+def test_waiter_takes_over_when_the_leader_fails(tmp_path):
+    flight = SingleFlight(tmp_path / "flights.sqlite3")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        if len(calls) == 1:
+            raise RuntimeError("provider down")
+        return "ok"
+
+    def call(_index):
+        try:
+            return flight.run("sha", compute)
+        except RuntimeError:
+            return "failed"
+
+    results = _run_concurrently(3, call)
+
+    assert len(calls) == 2
+    assert results.count("failed") == 1
+    assert sorted(result[1] for result in results if result != "failed") == [False, True]
+
+
+def test_identical_concurrent_uploads_call_the_provider_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "test-key")
+    app = create_app()
+    app.config.update(
+        RESULT_CACHE_PATH=str(tmp_path / "cache.sqlite3"),
+        TRIAGE_ENABLED=False,
+        SINGLE_FLIGHT_PATH=str(tmp_path / "flights.sqlite3"),
+    )
+    evidence = tmp_path / "chat.txt"
+    evidence.write_text("민수: 너 진짜 바보야\n", encoding="utf-8")
+    calls = []
+
+    def slow_analyzer(text):
+        calls.append(text)
+        time.sleep(0.3)
+        return {"findings": [], "summary": {"overall_risk": "present", "atmosphere": "", "potential_risks": ""}}
+
+    monkeypatch.setattr("app.services.analyze_text_with_gemini", slow_analyzer)
+
+    def upload(_index):
+        with app.app_context():
+            return analyze_file(str(evidence), "cyberbullying", "txt")
+
+    results = _run_concurrently(4, upload)
+
+    assert len(calls) == 1
+    # A caller that arrives after the leader finished reads the result cache instead.
+    reused = [result.get("single_flight") or result.get("result_cache") for result in results]
+    assert reused.count(None) == 1
+    assert set(reused) <= {None, "shared", "hit"}
+    assert {result["cyberbullying_risk_line"] for result in results} == {"present"}
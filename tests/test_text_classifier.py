@@ -0,0 +1,73 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from app import create_app
+from app import services
+from app.classifier import TextClassifier, load_classifier, train_classifier
+
+
+def test_classifier_learns_and_round_trips(tmp_path):
+    texts = ["너 진짜 바보야", "꺼져 바보", "오늘 과제 하자", "점심 같이 먹자"]
+    classifier = train_classifier(texts, [1, 1, 0, 0], dimension=1 << 12, epochs=200)
+    model_path = tmp_path / "model.npz"
+
+    classifier.save(model_path)
+    loaded = TextClassifier.load(model_path)
+    scores = loaded.predict_proba(["바.보 같은 애", "과제 언제 하자"])
+
+    assert scores[0] > 0.5 > scores[1]
+    assert loaded.version == classifier.version
+    assert list(loaded.predict_proba(texts)) == list(classifier.predict_proba(texts))
+    assert len(loaded.predict_proba([])) == 0
+    # A NUL inside a message must not split it into two feature rows.
+    assert list(loaded.predict_proba(["너 진짜\x00 바보야", "오늘 과제 하자"])) == list(
+        loaded.predict_proba(["너 진짜 바보야", "오늘 과제 하자"])
+    )
+
+
+def test_bundled_classifier_flags_phrases_missing_from_the_lexicon(monkeypatch):
+    app = create_app()
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(services, "analyze_text_with_gemini", lambda text: {"findings": [], "summary": {}})
+    scores = load_classifier().predict_proba(["너 사진 단톡방에 퍼뜨린다", "주말에 영화 볼래?"])
+
+    with app.app_context():
+        _, triage = services.analyze_conversation("현우: 너 사진 단톡방에 퍼뜨린다\n서연: 하지 마")
+        app.config["TEXT_CLASSIFIER_ENABLED"] = False
+        _, keywords_only = services.analyze_conversation("현우: 너 사진 단톡방에 퍼뜨린다\n서연: 하지 마")
+
+    assert scores[0] > 0.5 > scores[1]
+    assert triage["keyword_signals"] == 0
+    assert triage["classifier_signals"] >= 1
+    assert triage["decision"] == "escalated"
+    assert keywords_only["decision"] == "resolved_offline"
+
+
+def test_training_script_writes_a_loadable_model(tmp_path):
+    repo_root = Path(__file__).resolve().parents[1]
+    model_path = tmp_path / "text_classifier.npz"
+    result = subprocess.run(
+        [
+            sys.executable,
+            str(repo_root / "scripts" / "train_text_classifier.py"),
+            "--output",
+            str(model_path),
+            "--dimension-bits",
+            "14",
+            "--epochs",
+            "100",
+        ],
+        cwd=repo_root,
+        text=True,
+        capture_output=True,
+        check=False,
+    )
+
+    assert result.returncode == 0, result.stderr
+
+    summary = json.loads(result.stdout)
+    assert summary["dimension"] == 1 << 14
+    assert summary["training"]["messages"] > 0
+    assert TextClassifier.load(model_path).version == summary["version"]
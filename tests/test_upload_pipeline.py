@@ -0,0 +1,156 @@
+import hashlib
+import io
+
+from app import create_app
+from app import routes
+
+
+def _offline_client(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GOOGLE_GEMINI_API_KEY", raising=False)
+    app = create_app()
+    app.config["GOOGLE_GEMINI_API_KEY"] = ""
+    return app.test_client()
+
+
+def test_upload_is_hashed_and_sized_while_streaming(monkeypatch, tmp_path):
+    client = _offline_client(monkeypatch, tmp_path)
+    payload = "민수: 오늘 과제 같이 하자\n".encode("utf-8")
+
+    def fail_if_rehashed(*_args, **_kwargs):
+        raise AssertionError("analyze_file should reuse the upload digest")
+
+    monkeypatch.setattr("app.services._hash_file", fail_if_rehashed)
+
+    response = client.post(
+        "/api/analyze_cyberbullying",
+        data={"file": (io.BytesIO(payload), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["sha256"] == hashlib.sha256(payload).hexdigest()
+    assert body["file_info"]["size_bytes"] == len(payload)
+
+
+def test_oversized_upload_is_rejected_without_leaving_partial_file(monkeypatch, tmp_path):
+    client = _offline_client(monkeypatch, tmp_path)
+    monkeypatch.setattr(routes, "MAX_TEXT_FILE_SIZE", 1024)
+    monkeypatch.setattr(routes, "UPLOAD_CHUNK_SIZE", 256)
+
+    response = client.post(
+        "/api/analyze_cyberbullying",
+        data={"file": (io.BytesIO(b"a" * 4096), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 400
+    assert "larger than" in response.get_json()["error"]
+    assert list((tmp_path / "tmp").iterdir()) == []
+
+
+def test_request_body_over_the_content_limit_is_refused_before_it_is_read(monkeypatch, tmp_path):
+    client = _offline_client(monkeypatch, tmp_path)
+    client.application.config["MAX_CONTENT_LENGTH"] = 1024
+
+    def fail_if_streamed(*_args, **_kwargs):
+        raise AssertionError("an oversized body should not reach the upload stream")
+
+    monkeypatch.setattr(routes, "_stream_upload", fail_if_streamed)
+
+    for path, data in (
+        ("/api/analyze_cyberbullying", {}),
+        ("/api/jobs", {"analysis_type": "cyberbullying"}),
+    ):
+        response = client.post(
+            path,
+            data=dict(data, file=(io.BytesIO(b"a" * 4096), "chat.txt")),
+            content_type="multipart/form-data",
+        )
+        assert response.status_code == 413
+        assert "larger than" in response.get_json()["error"]
+
+    response = client.post(
+        "/analyze_cyberbullying",
+        data={"file": (io.BytesIO(b"a" * 4096), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 302
+
+
+def test_default_content_limit_leaves_room_for_the_largest_chat_export(monkeypatch, tmp_path):
+    client = _offline_client(monkeypatch, tmp_path)
+
+    assert client.application.config["MAX_CONTENT_LENGTH"] > routes.MAX_TEXT_FILE_SIZE
+
+
+def test_image_extension_requires_image_signature(monkeypatch, tmp_path):
+    client = _offline_client(monkeypatch, tmp_path)
+
+    response = client.post(
+        "/api/analyze_deepfake",
+        data={"file": (io.BytesIO(b"not really a png"), "photo.png")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "File content does not match its extension."
+
+
+def test_sniff_file_type_detects_magic_numbers():
+    assert routes.sniff_file_type(b"\x89PNG\r\n\x1a\n....") == "png"
+    assert routes.sniff_file_type(b"\xff\xd8\xff\xe0") == "jpeg"
+    assert routes.sniff_file_type("안녕".encode("utf-8")) == "text"
+    assert routes.sniff_file_type("안녕".encode("utf-16")) == "text"
+    assert routes.sniff_file_type(b"\x00\x01\x02") == "binary"
+
+
+def test_utf16_chat_export_is_accepted(monkeypatch, tmp_path):
+    client = _offline_client(monkeypatch, tmp_path)
+
+    response = client.post(
+        "/api/analyze_cyberbullying",
+        data={"file": (io.BytesIO("민수: 너 진짜 바보야\n".encode("utf-16")), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["cyberbullying_findings"][0]["sentence"] == "민수: 너 진짜 바보야"
+
+
+def test_nul_byte_after_the_sniffed_prefix_does_not_break_scoring(monkeypatch, tmp_path):
+    client = _offline_client(monkeypatch, tmp_path)
+    chat = "지은: 오늘 과제 같이 하자\n" * 5000 + "민수: 너 진짜\x00 바보야\n"
+
+    response = client.post(
+        "/api/analyze_cyberbullying",
+        data={"file": (io.BytesIO(chat.encode("utf-8")), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["message_scores"]["messages"] == 5001
+
+
+def test_long_chat_is_analyzed_offline_without_building_the_whole_transcript(monkeypatch, tmp_path):
+    client = _offline_client(monkeypatch, tmp_path)
+    monkeypatch.setattr("app.services.EXTRACTED_TEXT_PREVIEW_CHARS", 40)
+
+    def fail_if_read_whole(_path):
+        raise AssertionError("the offline analysis should stream the export")
+
+    monkeypatch.setattr("app.services.read_chat_export", fail_if_read_whole)
+    chat = "".join(f"지은: 오늘 과제 같이 하자 {index}\n" for index in range(20)) + "민수: 너 진짜 바보야\n"
+
+    response = client.post(
+        "/api/analyze_cyberbullying",
+        data={"file": (io.BytesIO(chat.encode("utf-8")), "chat.txt")},
+        content_type="multipart/form-data",
+    )
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["extracted_text"] == chat[:40]
+    assert body["extracted_text_truncated"] is True
+    assert [finding["sentence"] for finding in body["cyberbullying_findings"]] == ["민수: 너 진짜 바보야"]